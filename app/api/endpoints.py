@@ -1,12 +1,38 @@
 """
 API endpoints for lift simulation.
 """
-from fastapi import APIRouter, HTTPException
+import time
+from collections.abc import AsyncIterator
 
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.protocol import MEDIA_TYPES, encoded_state, negotiate_format
+from app.api.websocket import manager
 from app.core.algorithms import get_available_algorithms
-from app.core.config import DEFAULT_ALGORITHM, MIN_FLOOR
-from app.core.sessions import session_manager
-from app.models.schemas import CreateComparisonRequest, CreateSessionRequest, PassengerRequest
+from app.core.config import (
+    BULK_BATCH_SIZE,
+    DEFAULT_ALGORITHM,
+    DEFAULT_NUM_LIFTS,
+    DEFAULT_TICK_INTERVAL_MS,
+    MAX_MOVE_TICKS,
+    MIN_FLOOR,
+)
+from app.core.dispatch import DEFAULT_DISPATCH, get_available_dispatchers
+from app.core.league import LeagueController
+from app.core.metrics import MOVE_SECONDS
+from app.core.scheduler import tick_scheduler
+from app.core.sessions import Controller, session_manager
+from app.core.snapshot import SNAPSHOT_MEDIA_TYPE
+from app.models.schemas import (
+    AutoplayRequest,
+    BulkPassengerRequest,
+    CreateComparisonRequest,
+    CreateLeagueRequest,
+    CreateSessionRequest,
+    ForkRequest,
+    PassengerRequest,
+)
 
 router = APIRouter()
 
@@ -26,39 +52,147 @@ async def get_algorithms() -> dict:
     return {"algorithms": get_available_algorithms()}
 
 
+@router.get("/dispatchers")
+async def get_dispatchers() -> dict:
+    """Get available hall-call dispatch strategies."""
+    return {"dispatchers": get_available_dispatchers()}
+
+
+@router.get("/scheduler")
+async def get_scheduler_stats() -> dict:
+    """Get autoplay scheduler load and lag."""
+    return tick_scheduler.get_stats()
+
+
+@router.get("/connections")
+async def get_connection_stats() -> dict:
+    """Get WebSocket viewer counts and sent/coalesced/dropped frame totals."""
+    return manager.get_stats()
+
+
+@router.get("/sessions")
+async def get_session_stats(top: int = Query(10, ge=0, le=100)) -> dict:
+    """Get session counts, expiry/eviction totals and the largest sessions by memory."""
+    return session_manager.get_stats(top)
+
+
 @router.post("/create-session")
 async def create_session(request: CreateSessionRequest | None = None) -> dict:
-    """Create a single-building session with 2 lifts."""
+    """Create a single-building session, with 2 lifts unless num_lifts says otherwise."""
     algorithm_name = request.algorithm if request and request.algorithm else DEFAULT_ALGORITHM
     max_floors = request.max_floors if request and request.max_floors else 10
-    session_id = session_manager.create_session(algorithm_name=algorithm_name, max_floors=max_floors)
+    num_lifts = request.num_lifts if request and request.num_lifts else DEFAULT_NUM_LIFTS
+    zones = request.zones if request else None
+    dispatch = request.dispatch if request and request.dispatch else DEFAULT_DISPATCH
+    reassign_every = request.reassign_every if request else 0
+    try:
+        session_id = session_manager.create_session(
+            algorithm_name=algorithm_name,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch=dispatch,
+            reassign_every=reassign_every,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
     return {
         "session_id": session_id,
         "algorithm": algorithm_name,
         "max_floors": max_floors,
+        "num_lifts": num_lifts,
+        "dispatch": dispatch,
+        "reassign_every": reassign_every,
         "type": "single",
     }
 
 
 @router.post("/create-comparison")
 async def create_comparison(request: CreateComparisonRequest | None = None) -> dict:
-    """Create a comparison session with 2 buildings, each with 2 lifts."""
+    """Create a comparison session with 2 buildings, each with the same lifts."""
     algo1 = request.algorithm1 if request and request.algorithm1 else DEFAULT_ALGORITHM
     algo2 = request.algorithm2 if request and request.algorithm2 else DEFAULT_ALGORITHM
     max_floors = request.max_floors if request and request.max_floors else 10
-    print(f"DEBUG: create_comparison max_floors={max_floors}")
-    session_id = session_manager.create_comparison_session(
-        algorithm1=algo1, algorithm2=algo2, max_floors=max_floors
-    )
+    num_lifts = request.num_lifts if request and request.num_lifts else DEFAULT_NUM_LIFTS
+    zones = request.zones if request else None
+    dispatch1 = request.dispatch1 if request and request.dispatch1 else DEFAULT_DISPATCH
+    dispatch2 = request.dispatch2 if request and request.dispatch2 else DEFAULT_DISPATCH
+    reassign_every = request.reassign_every if request else 0
+    try:
+        session_id = session_manager.create_comparison_session(
+            algorithm1=algo1,
+            algorithm2=algo2,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch1=dispatch1,
+            dispatch2=dispatch2,
+            reassign_every=reassign_every,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
     return {
         "session_id": session_id,
         "algorithm1": algo1,
         "algorithm2": algo2,
         "max_floors": max_floors,
+        "num_lifts": num_lifts,
+        "dispatch1": dispatch1,
+        "dispatch2": dispatch2,
+        "reassign_every": reassign_every,
         "type": "comparison",
     }
 
 
+@router.post("/create-league")
+async def create_league(request: CreateLeagueRequest | None = None) -> dict:
+    """
+    Create a K-way comparison session: one building per algorithm and
+    dispatcher pairing, every registered algorithm unless `algorithms` is given.
+    """
+    max_floors = request.max_floors if request and request.max_floors else 10
+    num_lifts = request.num_lifts if request and request.num_lifts else DEFAULT_NUM_LIFTS
+    reassign_every = request.reassign_every if request else 0
+    try:
+        session_id = session_manager.create_league_session(
+            algorithms=request.algorithms if request else None,
+            dispatchers=request.dispatchers if request else None,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=request.zones if request else None,
+            reassign_every=reassign_every,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+    controller = session_manager.get_controller(session_id)
+    buildings = controller.get_state()["buildings"] if controller else []
+    return {
+        "session_id": session_id,
+        "buildings": [
+            {"algorithm": building["algorithm"], "dispatch": building["dispatch"]}
+            for building in buildings
+        ],
+        "max_floors": max_floors,
+        "num_lifts": num_lifts,
+        "reassign_every": reassign_every,
+        "type": "league",
+    }
+
+
+@router.get("/{session_id}/memory")
+async def get_session_memory(session_id: str) -> dict:
+    """Get the approximate memory held by one session."""
+    memory_bytes = session_manager.get_memory(session_id)
+    if memory_bytes is None:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+    return {
+        "session_id": session_id,
+        "memory_bytes": memory_bytes,
+        "spilled": session_manager.is_spilled(session_id),
+    }
+
+
 @router.post("/{session_id}/add-passenger")
 async def add_passenger(session_id: str, request: PassengerRequest) -> dict:
     """Add a passenger request."""
@@ -71,78 +205,225 @@ async def add_passenger(session_id: str, request: PassengerRequest) -> dict:
         from_level=request.from_level,
         to_level=request.to_level,
     )
+    await manager.publish(session_id)
     return {"message": "Request added"}
 
 
-@router.get("/{session_id}/state")
-async def get_state(session_id: str) -> dict:
-    """Get current simulation state."""
+_passenger_list = TypeAdapter(list[BulkPassengerRequest])
+
+
+@router.post("/{session_id}/add-passengers")
+async def add_passengers(session_id: str, request: Request) -> dict:
+    """
+    Add many passengers from a JSON array, or from an NDJSON body
+    (Content-Type: application/x-ndjson) that is parsed as it streams in.
+    Passengers are validated and dispatched in batches; batches before an
+    invalid NDJSON line stay applied. The response counts passengers
+    dispatched now as `added` and those queued for a future tick as
+    `scheduled`, so together they are every passenger accepted.
+    """
     controller = session_manager.get_controller(session_id)
     if not controller:
         raise HTTPException(status_code=404, detail="Invalid session ID")
 
-    session_type = session_manager.get_session_type(session_id)
+    counts = {"added": 0, "scheduled": 0}
+    batch: list[BulkPassengerRequest] = []
+
+    if "ndjson" in request.headers.get("content-type", ""):
+        async for passenger in _iter_ndjson(request, counts):
+            batch.append(passenger)
+            if len(batch) >= BULK_BATCH_SIZE:
+                _dispatch_batch(controller, batch, counts)
+                batch = []
+    else:
+        try:
+            batch = _passenger_list.validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False)) from e
+
+    for start in range(0, len(batch), BULK_BATCH_SIZE):
+        _dispatch_batch(controller, batch[start:start + BULK_BATCH_SIZE], counts)
+
+    await manager.publish(session_id)
+    return {"message": "Requests added", **counts}
+
+
+async def _iter_ndjson(request: Request, counts: dict) -> AsyncIterator[BulkPassengerRequest]:
+    """Yield validated passengers from a streamed NDJSON body."""
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_ndjson_line(line, line_number, counts)
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer, line_number + 1, counts)
+
+
+def _parse_ndjson_line(line: bytes, line_number: int, counts: dict) -> BulkPassengerRequest:
+    try:
+        return BulkPassengerRequest.model_validate_json(line)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"line": line_number, "errors": e.errors(include_url=False), **counts},
+        ) from e
+
+
+def _dispatch_batch(
+    controller: Controller,
+    batch: list[BulkPassengerRequest],
+    counts: dict,
+) -> None:
+    """Add due passengers in one call and queue those with a future arrival tick."""
+    now = [(p.passenger_id, p.from_level, p.to_level) for p in batch if p.tick is None]
+    timed = [(p.tick, p.passenger_id, p.from_level, p.to_level) for p in batch if p.tick is not None]
 
+    deferred = 0
+    if now:
+        controller.add_requests(now)
+    if timed:
+        # Counted before queueing; ticks already reached are dispatched at once
+        deferred = sum(1 for tick, *_ in timed if tick > controller.global_tick)
+        controller.schedule_requests(timed)
+    counts["scheduled"] += deferred
+    counts["added"] += len(batch) - deferred
+
+
+@router.get("/{session_id}/state")
+async def get_state(session_id: str, accept: str | None = Header(None)) -> Response:
+    """Get current simulation state as JSON, or msgpack if the client accepts it."""
+    controller = session_manager.get_controller(session_id)
+    if not controller:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+
+    fmt = negotiate_format(accept)
     try:
-        state = controller.get_state()
-
-        if session_type == "comparison":
-            return {
-                "type": "comparison",
-                "building1": transform_building_state(state["building1"]),
-                "building2": transform_building_state(state["building2"]),
-                "global_tick": state["global_tick"],
-            }
-        else:
-            return {"type": "single", **transform_building_state(state)}
+        state = encoded_state(controller, session_manager.get_session_type(session_id))
+        return Response(content=state.encode(fmt), media_type=MEDIA_TYPES[fmt])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get state: {e!s}") from e
 
 
-def transform_building_state(state: dict) -> dict:
-    """Transform building state for API response."""
+@router.get("/{session_id}/history")
+async def get_history(
+    session_id: str,
+    start: int | None = None,
+    end: int | None = None,
+    max_points: int | None = Query(None, ge=1),
+) -> dict:
+    """Get per-tick lift history, optionally by tick range and downsampled."""
+    controller = session_manager.get_controller(session_id)
+    if not controller:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+
+    return controller.get_history(start=start, end=end, max_points=max_points)
+
+
+@router.post("/{session_id}/move")
+async def move_lift(session_id: str, ticks: int = Query(1, ge=1, le=MAX_MOVE_TICKS)) -> dict:
+    """Advance simulation by one tick, or fast-forward several ticks headlessly."""
+    controller = session_manager.get_controller(session_id)
+    if not controller:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+
+    started = time.perf_counter()
+    if ticks == 1:
+        state = controller.move()
+    elif isinstance(controller, LeagueController):
+        # Leagues may wait on worker processes; keep the event loop free meanwhile
+        state = await controller.run_async(ticks)
+    else:
+        state = controller.run(ticks)
+    MOVE_SECONDS.observe(time.perf_counter() - started, "api" if ticks == 1 else "fast_forward")
+    await manager.publish(session_id)
+    return state
+
+
+@router.post("/{session_id}/autoplay")
+async def set_autoplay(session_id: str, request: AutoplayRequest | None = None) -> dict:
+    """Start or stop server-side ticking of a session."""
+    controller = session_manager.get_controller(session_id)
+    if not controller:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+
+    request = request or AutoplayRequest()
+    if request.enabled:
+        tick_scheduler.schedule(session_id, request.interval_ms or DEFAULT_TICK_INTERVAL_MS)
+    else:
+        tick_scheduler.unschedule(session_id)
+
     return {
-        "algorithm": state.get("algorithm"),
-        "lift_a": transform_lift_state(state.get("lift_a", {})),
-        "lift_b": transform_lift_state(state.get("lift_b", {})),
-        "active_passengers": state.get("active_passengers", []),
-        "global_tick": state.get("global_tick", 0),
-        "stats": state.get("stats", {"avg_wait": 0, "avg_ride": 0, "avg_total": 0, "completed": 0}),
-        "max_floors": state.get("max_floors", 10),
+        "session_id": session_id,
+        "autoplay": request.enabled,
+        "interval_ms": tick_scheduler.get_interval_ms(session_id),
     }
 
 
-def transform_lift_state(state: dict) -> dict:
-    """Transform individual lift state for API response."""
-    pending_stops = state.get("pending_stops", {})
-
-    transformed_stops: dict = {}
-    for level, actions in pending_stops.items():
-        stop_infos = []
-        for action_tuple in actions:
-            action_type = action_tuple[0]
-            passenger_id = action_tuple[1]
-            to_level = action_tuple[2] if len(action_tuple) > 2 else None
-            stop_infos.append({
-                "passenger_id": passenger_id,
-                "type": action_type,
-                "to_level": to_level,
-            })
-        transformed_stops[level] = stop_infos
+@router.get("/{session_id}/snapshot")
+async def get_snapshot(session_id: str) -> Response:
+    """Download the session as a binary snapshot, to restore later with POST /restore."""
+    data = session_manager.snapshot_session(session_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+    return Response(content=data, media_type=SNAPSHOT_MEDIA_TYPE)
 
+
+@router.get("/{session_id}/command-log")
+async def get_command_log(session_id: str) -> Response:
+    """Download the session's command log, for offline replay with lift-replay."""
+    path = session_manager.checkpoint_log(session_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No command log for this session")
+    with open(path, "rb") as f:
+        return Response(content=f.read(), media_type="application/x-ndjson")
+
+
+@router.post("/restore")
+async def restore_session(request: Request) -> dict:
+    """Start a new session from a snapshot sent as the raw request body."""
+    try:
+        session_id = session_manager.restore_session(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    controller = session_manager.get_controller(session_id)
     return {
-        "level": state.get("level", 0),
-        "direction": state.get("direction", "idle"),
-        "passengers": state.get("passengers", []),
-        "stops": transformed_stops,
+        "session_id": session_id,
+        "type": session_manager.get_session_type(session_id),
+        "global_tick": controller.global_tick if controller else 0,
     }
 
 
-@router.post("/{session_id}/move")
-async def move_lift(session_id: str) -> dict:
-    """Advance simulation by one tick."""
-    controller = session_manager.get_controller(session_id)
-    if not controller:
-        raise HTTPException(status_code=404, detail="Invalid session ID")
+@router.post("/{session_id}/fork")
+async def fork_session(session_id: str, request: ForkRequest | None = None) -> dict:
+    """
+    Start a new session continuing from this one's current state, optionally
+    with other algorithms or dispatch strategies. The parent is unaffected.
+    """
+    request = request or ForkRequest()
+    session_type = session_manager.get_session_type(session_id)
+    if session_type == "comparison":
+        fields: tuple[str, ...] = ("algorithm1", "algorithm2", "dispatch1", "dispatch2")
+    elif session_type == "league":
+        # Every building keeps its pairing; a different line-up is a new league
+        fields = ()
+    else:
+        fields = ("algorithm", "dispatch")
+    overrides = {
+        field: value for field in fields if (value := getattr(request, field)) is not None
+    }
 
-    return controller.move()
+    fork_id = session_manager.fork_session(session_id, **overrides)
+    if fork_id is None:
+        raise HTTPException(status_code=404, detail="Invalid session ID")
+    controller = session_manager.get_controller(fork_id)
+    return {
+        "session_id": fork_id,
+        "parent_id": session_id,
+        "type": session_manager.get_session_type(fork_id),
+        "global_tick": controller.global_tick if controller else 0,
+        **overrides,
+    }
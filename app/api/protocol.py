@@ -0,0 +1,255 @@
+"""
+State protocol shared by REST and WebSocket responses.
+Builds the API view of a session's state, computes per-tick deltas between
+two such views and encodes payloads once per controller version so every
+response and viewer shares the same bytes.
+"""
+import json
+import time
+import weakref
+
+from app.core.building import BuildingController
+from app.core.league import LeagueController
+from app.core.metrics import ENCODE_SECONDS, STATE_SECONDS
+from app.core.multi_lift import MultiBuildingController
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - binary format is optional
+    msgpack = None
+
+JSON_FORMAT = "json"
+MSGPACK_FORMAT = "msgpack"
+MEDIA_TYPES: dict[str, str] = {
+    JSON_FORMAT: "application/json",
+    MSGPACK_FORMAT: "application/msgpack",
+}
+# WebSocket subprotocol -> wire format
+WS_SUBPROTOCOLS: dict[str, str] = {
+    "lift.json": JSON_FORMAT,
+    "lift.msgpack": MSGPACK_FORMAT,
+}
+
+# Lists of passenger records diffed by passenger_id instead of replaced wholesale
+PASSENGER_LIST_KEYS: frozenset[str] = frozenset({"active_passengers"})
+# Fixed-length lists of records diffed position by position
+INDEXED_LIST_KEYS: frozenset[str] = frozenset({"lifts", "buildings"})
+
+Controller = BuildingController | MultiBuildingController | LeagueController
+
+
+def api_state(controller: Controller, session_type: str | None) -> dict:
+    """Get the API view of a controller's current state."""
+    state = controller.get_state()
+
+    if session_type == "comparison":
+        return {
+            "type": "comparison",
+            "building1": transform_building_state(state["building1"]),
+            "building2": transform_building_state(state["building2"]),
+            "global_tick": state["global_tick"],
+        }
+    if session_type == "league":
+        return {
+            "type": "league",
+            "buildings": [transform_building_state(building) for building in state["buildings"]],
+            "leaderboard": [dict(entry) for entry in state["leaderboard"]],
+            "global_tick": state["global_tick"],
+        }
+    return {"type": "single", **transform_building_state(state)}
+
+
+def transform_building_state(state: dict) -> dict:
+    """Transform building state for API response."""
+    return {
+        "algorithm": state.get("algorithm"),
+        "dispatch": state.get("dispatch"),
+        "lifts": [transform_lift_state(lift) for lift in state.get("lifts", [])],
+        "active_passengers": [dict(p) for p in state.get("active_passengers", [])],
+        "global_tick": state.get("global_tick", 0),
+        "stats": dict(
+            state.get("stats", {"avg_wait": 0, "avg_ride": 0, "avg_total": 0, "completed": 0})
+        ),
+        "max_floors": state.get("max_floors", 10),
+    }
+
+
+def transform_lift_state(state: dict) -> dict:
+    """Transform individual lift state for API response."""
+    pending_stops = state.get("pending_stops", {})
+
+    transformed_stops: dict = {}
+    for level, actions in pending_stops.items():
+        stop_infos = []
+        for action_tuple in actions:
+            action_type = action_tuple[0]
+            passenger_id = action_tuple[1]
+            to_level = action_tuple[2] if len(action_tuple) > 2 else None
+            stop_infos.append({
+                "passenger_id": passenger_id,
+                "type": action_type,
+                "to_level": to_level,
+            })
+        transformed_stops[level] = stop_infos
+
+    transformed = {
+        "name": state.get("name"),
+        "level": state.get("level", 0),
+        "direction": state.get("direction", "idle"),
+        "passengers": list(state.get("passengers", [])),
+        "stops": transformed_stops,
+    }
+    if "zone" in state:
+        transformed["zone"] = list(state["zone"])
+    if "stats" in state:
+        transformed["stats"] = dict(state["stats"])
+    return transformed
+
+
+def diff_state(old: dict, new: dict) -> dict:
+    """
+    Delta that turns `old` into `new`, in JSON merge-patch style: changed keys
+    carry their new value (nested dicts are diffed recursively) and removed
+    keys map to None. Passenger lists become {"upsert": [...], "removed": [...]}
+    and a same-length lifts list becomes {"<position>": changes}.
+    """
+    changes: dict = {}
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+        elif key in PASSENGER_LIST_KEYS:
+            passenger_changes = _diff_passengers(old[key], value)
+            if passenger_changes:
+                changes[key] = passenger_changes
+        elif key in INDEXED_LIST_KEYS and len(value) == len(old[key]):
+            item_changes = {
+                str(i): item
+                for i, (before, after) in enumerate(zip(old[key], value, strict=True))
+                # Equality is checked in C, far cheaper than diffing unchanged items
+                if before != after and (item := diff_state(before, after))
+            }
+            if item_changes:
+                changes[key] = item_changes
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            nested = diff_state(old[key], value) if value != old[key] else None
+            if nested:
+                changes[key] = nested
+        elif value != old[key]:
+            changes[key] = value
+
+    for key in old.keys() - new.keys():
+        changes[key] = None
+    return changes
+
+
+def _diff_passengers(old: list[dict], new: list[dict]) -> dict:
+    """Passenger records that appeared or changed status, and ids no longer listed."""
+    previous = {p["passenger_id"]: p for p in old}
+    current_ids = {p["passenger_id"] for p in new}
+
+    upsert = [p for p in new if previous.get(p["passenger_id"]) != p]
+    removed = [passenger_id for passenger_id in previous if passenger_id not in current_ids]
+    if not upsert and not removed:
+        return {}
+    return {"upsert": upsert, "removed": removed}
+
+
+# === Encoding ===
+
+def available_formats() -> list[str]:
+    """Wire formats this server can encode."""
+    return [JSON_FORMAT, MSGPACK_FORMAT] if msgpack is not None else [JSON_FORMAT]
+
+
+def encode(message: dict, fmt: str = JSON_FORMAT) -> bytes:
+    """Encode a message as compact JSON or msgpack."""
+    if fmt == MSGPACK_FORMAT:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.packb(message)
+    if orjson is not None:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def negotiate_format(accept: str | None) -> str:
+    """Pick the response format from an HTTP Accept header."""
+    if accept and MEDIA_TYPES[MSGPACK_FORMAT] in accept and msgpack is not None:
+        return MSGPACK_FORMAT
+    return JSON_FORMAT
+
+
+def negotiate_subprotocol(requested: list[str]) -> str | None:
+    """First WebSocket subprotocol the client offered that this server can speak."""
+    formats = available_formats()
+    for subprotocol in requested:
+        if WS_SUBPROTOCOLS.get(subprotocol) in formats:
+            return subprotocol
+    return None
+
+
+class Payload:
+    """A message and its wire encodings, each built at most once."""
+
+    def __init__(self, message: dict) -> None:
+        self.message: dict = message
+        self._encoded: dict[str, bytes] = {}
+        self._text: str | None = None
+
+    def encode(self, fmt: str = JSON_FORMAT) -> bytes:
+        encoded = self._encoded.get(fmt)
+        if encoded is None:
+            started = time.perf_counter()
+            encoded = self._encoded[fmt] = self._encode(fmt)
+            ENCODE_SECONDS.observe(time.perf_counter() - started, fmt)
+        return encoded
+
+    def frame(self, fmt: str = JSON_FORMAT) -> str | bytes:
+        """WebSocket frame body: text for JSON, binary for msgpack."""
+        if fmt != JSON_FORMAT:
+            return self.encode(fmt)
+        if self._text is None:
+            self._text = self.encode(JSON_FORMAT).decode()
+        return self._text
+
+    def _encode(self, fmt: str) -> bytes:
+        return encode(self.message, fmt)
+
+
+class Snapshot(Payload):
+    """Snapshot frame around an already encoded state, spliced rather than re-encoded."""
+
+    def __init__(self, state: Payload, seq: int) -> None:
+        super().__init__({"type": "snapshot", "seq": seq, "data": state.message})
+        self.state: Payload = state
+        self.seq: int = seq
+
+    def _encode(self, fmt: str) -> bytes:
+        header = {"type": "snapshot", "seq": self.seq}
+        if fmt == MSGPACK_FORMAT:
+            # fixmap of 3 entries, then key/value pairs
+            return b"\x83" + b"".join(
+                msgpack.packb(item) for pair in (*header.items(), ("data",)) for item in pair
+            ) + self.state.encode(fmt)
+        return encode(header, fmt)[:-1] + b',"data":' + self.state.encode(fmt) + b"}"
+
+
+# Latest encoded state per controller; entries go away with their session
+_state_cache: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def encoded_state(controller: Controller, session_type: str | None) -> Payload:
+    """API state of a controller, rebuilt only when its version has moved on."""
+    cached = _state_cache.get(controller)
+    if cached is not None and cached[0] == controller.version:
+        return cached[1]
+    started = time.perf_counter()
+    payload = Payload(api_state(controller, session_type))
+    STATE_SECONDS.observe(time.perf_counter() - started, session_type or "")
+    _state_cache[controller] = (controller.version, payload)
+    return payload
@@ -1,41 +1,289 @@
 """
 WebSocket endpoints for real-time lift state updates.
+
+Protocol: on connect a client receives one full
+{"type": "snapshot", "seq", "data"} message, then one
+{"type": "delta", "seq", "base_seq", "tick", "changes"} message per state
+change (see protocol.diff_state). A client whose last seq differs from a
+delta's base_seq has missed a message and sends "resync" for a new snapshot.
+Frames are JSON text by default; a client offering the "lift.msgpack"
+subprotocol gets binary msgpack frames instead. Each frame is encoded once
+per format and the same bytes go to every viewer.
+
+Every connection has its own bounded send queue drained by a writer task,
+so publishing never waits on a socket. A viewer that falls a full queue
+behind has its queued deltas discarded and receives one snapshot of the
+latest state instead.
 """
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+
 from fastapi import WebSocket, WebSocketDisconnect
 
+from app.api.protocol import (
+    JSON_FORMAT,
+    WS_SUBPROTOCOLS,
+    Payload,
+    Snapshot,
+    diff_state,
+    encoded_state,
+    negotiate_subprotocol,
+)
+from app.core.config import WS_SEND_QUEUE_SIZE
+from app.core.league import LeagueBusyError
+from app.core.metrics import MOVE_SECONDS, PUBLISH_SECONDS
 from app.core.sessions import session_manager
 
 
+class StateStream:
+    """Last state sent to a session's viewers and its sequence number."""
+
+    def __init__(self, state: Payload) -> None:
+        self.seq: int = 0
+        self.state: Payload = state
+        self._snapshot: Snapshot | None = None
+
+    def snapshot(self) -> Snapshot:
+        """Snapshot frame of the current state, shared by every viewer that needs one."""
+        if self._snapshot is None or self._snapshot.seq != self.seq:
+            self._snapshot = Snapshot(self.state, self.seq)
+        return self._snapshot
+
+
+class Subscriber:
+    """One viewer's outbound queue and the task that writes it to the socket."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        stream: StateStream,
+        on_dead: Callable[["Subscriber"], None],
+        max_queue: int = WS_SEND_QUEUE_SIZE,
+        fmt: str = JSON_FORMAT,
+    ) -> None:
+        self.websocket: WebSocket = websocket
+        self.stream: StateStream = stream
+        self.max_queue: int = max_queue
+        self.fmt: str = fmt
+        self.queue: deque[Payload] = deque()
+        self.needs_snapshot: bool = True
+        # Seq of the last frame written; older queued deltas are stale
+        self.seq: int = -1
+        self.sent: int = 0
+        self.coalesced: int = 0
+        self.closed: bool = False
+        self._on_dead = on_dead
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self.task: asyncio.Task = asyncio.create_task(self._writer())
+
+    def push(self, message: Payload) -> None:
+        """Queue a delta without waiting; a full queue collapses into one snapshot."""
+        if self.closed:
+            return
+        if len(self.queue) >= self.max_queue:
+            self.coalesced += len(self.queue) + 1
+            self.queue.clear()
+            self.needs_snapshot = True
+        elif not self.needs_snapshot:
+            self.queue.append(message)
+        else:
+            # A snapshot is already owed and will include this change
+            self.coalesced += 1
+        self._wakeup.set()
+
+    def request_snapshot(self) -> None:
+        """Send the latest full state next, replacing anything still queued."""
+        self.coalesced += len(self.queue)
+        self.queue.clear()
+        self.needs_snapshot = True
+        self._wakeup.set()
+
+    def close(self) -> int:
+        """Stop the writer. Returns how many queued frames were never sent."""
+        self.closed = True
+        self.task.cancel()
+        unsent = len(self.queue) + self.needs_snapshot
+        self.queue.clear()
+        self.needs_snapshot = False
+        return unsent
+
+    async def _writer(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while message := self._next_message():
+                frame = message.frame(self.fmt)
+                try:
+                    if isinstance(frame, str):
+                        await self.websocket.send_text(frame)
+                    else:
+                        await self.websocket.send_bytes(frame)
+                except Exception:
+                    self._on_dead(self)
+                    return
+                self.sent += 1
+
+    def _next_message(self) -> Payload | None:
+        if self.needs_snapshot:
+            self.needs_snapshot = False
+            self.coalesced += len(self.queue)
+            self.queue.clear()
+            self.seq = self.stream.seq
+            return self.stream.snapshot()
+        while self.queue:
+            message = self.queue.popleft()
+            if message.message["seq"] > self.seq:
+                self.seq = message.message["seq"]
+                return message
+            self.coalesced += 1
+        return None
+
+
 class ConnectionManager:
-    """Manages WebSocket connections per session."""
+    """Manages WebSocket connections and state streams per session."""
 
     def __init__(self) -> None:
-        self.active_connections: dict[str, list[WebSocket]] = {}
+        self.active_connections: dict[str, dict[WebSocket, Subscriber]] = {}
+        self.streams: dict[str, StateStream] = {}
+
+        # Totals for connections that have already gone away
+        self.frames_sent: int = 0
+        self.frames_coalesced: int = 0
+        self.frames_dropped: int = 0
+        self.reaped: int = 0
 
     async def connect(self, websocket: WebSocket, session_id: str) -> None:
-        """Accept and store a WebSocket connection."""
-        await websocket.accept()
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = []
-        self.active_connections[session_id].append(websocket)
+        """Accept and store a WebSocket connection; its writer sends a snapshot first."""
+        subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+        # Bring existing viewers up to date before the newcomer joins the stream
+        await self.publish(session_id)
+        stream = self._ensure_stream(session_id)
+        if stream is None:
+            await websocket.close(code=1008, reason="Session invalid")
+            return
+        subscriber = Subscriber(
+            websocket,
+            stream,
+            lambda sub: self._reap(session_id, sub),
+            fmt=WS_SUBPROTOCOLS.get(subprotocol or "", JSON_FORMAT),
+        )
+        self.active_connections.setdefault(session_id, {})[websocket] = subscriber
 
     def disconnect(self, websocket: WebSocket, session_id: str) -> None:
-        """Remove a WebSocket connection."""
-        if session_id in self.active_connections:
-            self.active_connections[session_id].remove(websocket)
-            if not self.active_connections[session_id]:
-                del self.active_connections[session_id]
+        """Remove a WebSocket connection and stop its writer."""
+        connections = self.active_connections.get(session_id)
+        if connections is None or websocket not in connections:
+            return
+        subscriber = connections.pop(websocket)
+        self.frames_dropped += subscriber.close()
+        self.frames_sent += subscriber.sent
+        self.frames_coalesced += subscriber.coalesced
+        if not connections:
+            del self.active_connections[session_id]
+            self.streams.pop(session_id, None)
+
+    def _reap(self, session_id: str, subscriber: Subscriber) -> None:
+        """Drop a connection whose socket failed on send."""
+        self.reaped += 1
+        self.disconnect(subscriber.websocket, session_id)
+
+    async def broadcast(self, session_id: str, message: Payload) -> None:
+        """Queue a message for every connection in a session without waiting on sockets."""
+        for subscriber in list(self.active_connections.get(session_id, {}).values()):
+            subscriber.push(message)
+
+    async def send_snapshot(self, websocket: WebSocket, session_id: str) -> None:
+        """Send the full current state to one connection."""
+        await self.publish(session_id)
+        subscriber = self.active_connections.get(session_id, {}).get(websocket)
+        if subscriber is not None:
+            subscriber.request_snapshot()
+
+    async def publish(self, session_id: str) -> None:
+        """Send viewers the delta since the last published state, if anything changed."""
+        stream = self.streams.get(session_id)
+        if stream is None or session_id not in self.active_connections:
+            return
 
-    async def broadcast(self, session_id: str, message: dict) -> None:
-        """Broadcast a message to all connections in a session."""
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                await connection.send_json(message)
+        started = time.perf_counter()
+        state = self._current_state(session_id)
+        if state is None or state is stream.state:
+            return
+        changes = diff_state(stream.state.message, state.message)
+        if not changes:
+            return
+
+        stream.seq += 1
+        stream.state = state
+        await self.broadcast(session_id, Payload({
+            "type": "delta",
+            "seq": stream.seq,
+            "base_seq": stream.seq - 1,
+            "tick": state.message["global_tick"],
+            "changes": changes,
+        }))
+        PUBLISH_SECONDS.observe(time.perf_counter() - started)
+
+    def get_stats(self) -> dict:
+        """Viewer counts and frame totals, including live connections."""
+        live = [sub for conns in self.active_connections.values() for sub in conns.values()]
+        return {
+            "sessions": len(self.active_connections),
+            "connections": len(live),
+            "queued_frames": sum(len(sub.queue) for sub in live),
+            "frames_sent": self.frames_sent + sum(sub.sent for sub in live),
+            "frames_coalesced": self.frames_coalesced + sum(sub.coalesced for sub in live),
+            "frames_dropped": self.frames_dropped,
+            "reaped_connections": self.reaped,
+        }
+
+    def _ensure_stream(self, session_id: str) -> StateStream | None:
+        stream = self.streams.get(session_id)
+        if stream is not None:
+            return stream
+        state = self._current_state(session_id)
+        if state is None:
+            return None
+        stream = self.streams[session_id] = StateStream(state)
+        return stream
+
+    def _current_state(self, session_id: str) -> Payload | None:
+        controller = session_manager.get_controller(session_id, touch=False)
+        if controller is None:
+            return None
+        return encoded_state(controller, session_manager.get_session_type(session_id))
 
 
 manager = ConnectionManager()
 
 
+async def autoplay_tick(session_ids: list[str]) -> list[str]:
+    """
+    Step every due autoplay session once and push the change to its viewers.
+    Ticking counts as use, so autoplaying sessions do not expire.
+    Returns sessions that no longer exist so the scheduler drops them.
+    """
+    expired: list[str] = []
+    for session_id in session_ids:
+        controller = session_manager.get_controller(session_id)
+        if controller is None:
+            expired.append(session_id)
+            continue
+        started = time.perf_counter()
+        try:
+            controller.step()
+        except LeagueBusyError:
+            # Fast-forwarding in the pool; the run's result is published when it ends
+            continue
+        MOVE_SECONDS.observe(time.perf_counter() - started, "autoplay")
+        await manager.publish(session_id)
+    return expired
+
+
 async def websocket_endpoint(websocket: WebSocket) -> None:
     """Handle WebSocket connections for lift state updates."""
     session_id: str | None = websocket.path_params.get("session_id")
@@ -52,19 +300,24 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     await manager.connect(websocket, session_id)
 
     try:
-        await websocket.send_json({
-            "type": "state_update",
-            "data": controller.get_state(),
-        })
-
         while True:
             data = await websocket.receive_text()
+            session_manager.touch(session_id)
             if data == "move":
-                state = controller.move()
-                await manager.broadcast(session_id, {
-                    "type": "state_update",
-                    "data": state,
-                })
+                # Look the controller up each time, since idle sessions may be spilled
+                controller = session_manager.get_controller(session_id)
+                if controller is None:
+                    await websocket.close(code=1008, reason="Session expired")
+                    break
+                try:
+                    controller.step()
+                except LeagueBusyError:
+                    continue
+                await manager.publish(session_id)
+            elif data == "resync":
+                await manager.send_snapshot(websocket, session_id)
 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, session_id)
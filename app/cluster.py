@@ -0,0 +1,377 @@
+"""
+Cluster - runs the API as several single-process shards behind a router.
+Each shard is an ordinary `app.main:app` process listening on a Unix socket
+and owning the sessions whose IDs hash to it (see app/core/ring.py). The
+router holds no session state, so it can run with several uvicorn workers:
+it forwards each session's REST and WebSocket traffic to the owning shard
+and spreads everything else round-robin. GET /metrics gathers every shard's
+metrics into one scrape, labelled by shard.
+
+Example:
+    lift-cluster --shards 4 --workers 2 --port 8000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, MutableMapping
+from typing import Any
+
+import httpx
+import uvicorn
+from websockets.asyncio.client import ClientConnection, unix_connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.core.ring import HashRing
+
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+# Requests carrying this header go to that shard, e.g. to read its /api/sessions stats
+SHARD_HEADER: str = "x-lift-shard"
+SOCKET_DIR_ENV: str = "LIFT_CLUSTER_SOCKET_DIR"
+SHARD_COUNT_ENV: str = "LIFT_SHARD_COUNT"
+SHARD_INDEX_ENV: str = "LIFT_SHARD_INDEX"
+SPILL_PATH_ENV: str = "SESSION_SPILL_PATH"
+SNAPSHOT_SECRET_ENV: str = "SNAPSHOT_SECRET"
+HOP_BY_HOP_HEADERS: frozenset[str] = frozenset(
+    {"connection", "keep-alive", "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade"}
+)
+
+
+def socket_path(socket_dir: str, index: int) -> str:
+    return os.path.join(socket_dir, f"shard-{index}.sock")
+
+
+class ShardRouter:
+    """ASGI app forwarding each request to the shard that owns its session."""
+
+    def __init__(self, socket_paths: list[str]) -> None:
+        self.socket_paths: list[str] = socket_paths
+        self.ring = HashRing(len(socket_paths))
+        self._round_robin = itertools.cycle(range(len(socket_paths)))
+        # One pooled HTTP client per shard, opened on first use
+        self._clients: dict[int, httpx.AsyncClient] = {}
+
+    async def __call__(self, scope: Message, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            await self._proxy_http(scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self._proxy_websocket(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+
+    def shard_for(self, path: str, headers: dict[str, str]) -> int:
+        """
+        Owning shard for session paths (/api/{session_id}/..., /ws/{session_id}).
+        Session creation and global routes go round-robin; a new session is
+        created on whichever shard receives the request, which issues an ID it owns.
+        """
+        pinned = headers.get(SHARD_HEADER, "")
+        if pinned.isdigit() and int(pinned) < len(self.socket_paths):
+            return int(pinned)
+
+        parts = path.strip("/").split("/")
+        if (parts[0] == "api" and len(parts) >= 3) or (parts[0] == "ws" and len(parts) == 2):
+            return self.ring.owner(parts[1])
+        return next(self._round_robin)
+
+    def _client(self, shard: int) -> httpx.AsyncClient:
+        client = self._clients.get(shard)
+        if client is None:
+            transport = httpx.AsyncHTTPTransport(uds=self.socket_paths[shard])
+            client = httpx.AsyncClient(transport=transport, base_url="http://shard", timeout=None)
+            self._clients[shard] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the pooled shard connections."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    # === HTTP ===
+
+    async def _proxy_http(self, scope: Message, receive: Receive, send: Send) -> None:
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]
+        ]
+        header_map = dict(headers)
+        if scope["path"] == "/metrics" and SHARD_HEADER not in header_map:
+            await self._scrape_metrics(send)
+            return
+        client = self._client(self.shard_for(scope["path"], header_map))
+
+        # Stream bodies through, so NDJSON uploads reach the shard as they arrive
+        has_body = "content-length" in header_map or "transfer-encoding" in header_map
+        request = client.build_request(
+            scope["method"],
+            _target(scope),
+            headers=[(name, value) for name, value in headers if name not in HOP_BY_HOP_HEADERS],
+            content=_request_body(receive) if has_body else None,
+        )
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError:
+            await _send_error(send, 502, b"Shard unavailable")
+            return
+
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1"))
+                    for name, value in response.headers.multi_items()
+                    if name.lower() not in HOP_BY_HOP_HEADERS
+                ],
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await response.aclose()
+
+    async def _scrape_metrics(self, send: Send) -> None:
+        """Every shard's /metrics as one response; fails if any shard cannot be read."""
+        try:
+            responses = await asyncio.gather(*(
+                self._client(shard).get("/metrics") for shard in range(len(self.socket_paths))
+            ))
+        except httpx.TransportError:
+            await _send_error(send, 502, b"Shard unavailable")
+            return
+        body = merge_metrics([response.text for response in responses]).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", METRICS_CONTENT_TYPE.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    # === WebSocket ===
+
+    async def _proxy_websocket(self, scope: Message, receive: Receive, send: Send) -> None:
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        shard = self.shard_for(scope["path"], headers)
+        await receive()  # websocket.connect
+
+        try:
+            upstream = await unix_connect(
+                self.socket_paths[shard],
+                uri=f"ws://shard{_target(scope)}",
+                subprotocols=scope.get("subprotocols") or None,
+                compression=None,
+                max_size=None,
+            )
+        except (OSError, InvalidHandshake):
+            # The shard refused (e.g. unknown session); refuse the client the same way
+            await send({"type": "websocket.close", "code": 1008})
+            return
+
+        async with upstream:
+            await send({"type": "websocket.accept", "subprotocol": upstream.subprotocol})
+            to_shard = asyncio.create_task(_client_to_shard(receive, upstream))
+            to_client = asyncio.create_task(_shard_to_client(upstream, send))
+            done, pending = await asyncio.wait(
+                {to_shard, to_client}, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+
+    # === Lifespan ===
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def merge_metrics(texts: list[str]) -> str:
+    """
+    Prometheus text expositions of each shard, in shard order, merged into one
+    with a `shard` label on every sample. Each metric's HELP and TYPE lines
+    appear once, followed by its samples from every shard.
+    """
+    # metric name -> (HELP/TYPE lines, samples from every shard)
+    families: dict[str, tuple[list[str], list[str]]] = {}
+    for shard, text in enumerate(texts):
+        family: tuple[list[str], list[str]] = ([], [])
+        for line in text.splitlines():
+            if line.startswith("#"):
+                family = families.setdefault(line.split(" ", 3)[2], ([], []))
+                if line not in family[0]:
+                    family[0].append(line)
+            elif line:
+                series, value = line.rsplit(" ", 1)
+                label = f'shard="{shard}"'
+                series = f"{series[:-1]},{label}}}" if series.endswith("}") else f"{series}{{{label}}}"
+                family[1].append(f"{series} {value}")
+    lines = [line for headers, samples in families.values() for line in (*headers, *samples)]
+    return "\n".join(lines) + "\n"
+
+
+def _target(scope: Message) -> str:
+    """Path and query string of the incoming request."""
+    path = scope.get("raw_path") or scope["path"].encode()
+    query = scope.get("query_string", b"")
+    return (path + b"?" + query if query else path).decode("latin-1")
+
+
+async def _request_body(receive: Receive) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        yield message.get("body", b"")
+        if not message.get("more_body"):
+            return
+
+
+async def _send_error(send: Send, status: int, body: bytes) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _client_to_shard(receive: Receive, upstream: ClientConnection) -> None:
+    """Relay client frames until the client disconnects."""
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        text = message.get("text")
+        await upstream.send(text if text is not None else message.get("bytes") or b"")
+
+
+async def _shard_to_client(upstream: ClientConnection, send: Send) -> None:
+    """Relay shard frames, then pass the shard's close on to the client."""
+    try:
+        async for data in upstream:
+            if isinstance(data, str):
+                await send({"type": "websocket.send", "text": data})
+            else:
+                await send({"type": "websocket.send", "bytes": data})
+    except ConnectionClosed:
+        pass
+    await send({
+        "type": "websocket.close",
+        "code": upstream.close_code or 1000,
+        "reason": upstream.close_reason or "",
+    })
+
+
+# === Launcher ===
+
+def create_router() -> ShardRouter:
+    """Router for the shards started by main(), found through the environment."""
+    socket_dir = os.environ[SOCKET_DIR_ENV]
+    count = int(os.environ.get(SHARD_COUNT_ENV, "1"))
+    return ShardRouter([socket_path(socket_dir, index) for index in range(count)])
+
+
+def shard_env(index: int, count: int) -> dict[str, str]:
+    """
+    Environment for one shard process. Shards share no state, so a configured
+    spill file becomes one file per shard, e.g. sessions.sqlite3.shard0.
+    """
+    env = {**os.environ, SHARD_INDEX_ENV: str(index), SHARD_COUNT_ENV: str(count)}
+    spill_path = os.environ.get(SPILL_PATH_ENV)
+    if spill_path:
+        env[SPILL_PATH_ENV] = f"{spill_path}.shard{index}"
+    return env
+
+
+def start_shards(count: int, socket_dir: str) -> list[subprocess.Popen]:
+    """Start `count` shard processes, each serving app.main:app on its own socket."""
+    # A snapshot downloaded from one shard may be restored on any other
+    os.environ.setdefault(SNAPSHOT_SECRET_ENV, secrets.token_hex(32))
+    processes = []
+    for index in range(count):
+        env = shard_env(index, count)
+        command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--uds", socket_path(socket_dir, index), "--log-level", "warning",
+        ]
+        processes.append(subprocess.Popen(command, env=env))
+    return processes
+
+
+def wait_for_shards(
+    processes: list[subprocess.Popen], socket_dir: str, timeout: float = 30.0
+) -> None:
+    """Block until every shard's socket exists. Raises RuntimeError if one fails to start."""
+    deadline = time.monotonic() + timeout
+    paths = [socket_path(socket_dir, index) for index in range(len(processes))]
+    while not all(os.path.exists(path) for path in paths):
+        if any(process.poll() is not None for process in processes):
+            raise RuntimeError("A shard process exited during startup")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Shards did not start within {timeout:.0f}s")
+        time.sleep(0.05)
+
+
+def stop_shards(processes: list[subprocess.Popen]) -> None:
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Console entry point."""
+    parser = argparse.ArgumentParser(description="Run the lift API as sharded processes.")
+    parser.add_argument(
+        "--shards", type=int, default=int(os.getenv("LIFT_SHARDS", "0")) or os.cpu_count() or 1
+    )
+    parser.add_argument("--workers", type=int, default=1, help="router worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket-dir", help="directory for shard sockets, default a temp dir")
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    socket_dir = args.socket_dir or tempfile.mkdtemp(prefix="lift-cluster-")
+    processes = start_shards(args.shards, socket_dir)
+    try:
+        wait_for_shards(processes, socket_dir)
+        os.environ[SOCKET_DIR_ENV] = socket_dir
+        os.environ[SHARD_COUNT_ENV] = str(args.shards)
+        uvicorn.run(
+            "app.cluster:create_router",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+        )
+    finally:
+        stop_shards(processes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
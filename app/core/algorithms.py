@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+from app.core.stops import StopIndex
+
 
 class LiftAlgorithm(ABC):
     """Base class for lift scheduling algorithms."""
@@ -15,6 +17,16 @@ class LiftAlgorithm(ABC):
         """
         pass
 
+    def pick_direction(
+        self, current_level: int, current_direction: str, stops: StopIndex
+    ) -> str:
+        """
+        Determine the next direction from a sorted stop index.
+        Override to use the index queries; the default falls back to
+        pick_next_direction with a plain dict copy.
+        """
+        return self.pick_next_direction(current_level, current_direction, stops.to_dict())
+
 
 class ScanAlgorithm(LiftAlgorithm):
     """
@@ -49,6 +61,21 @@ class ScanAlgorithm(LiftAlgorithm):
 
         return "idle"
 
+    def pick_direction(
+        self, current_level: int, current_direction: str, stops: StopIndex
+    ) -> str:
+        if not stops:
+            return "idle"
+
+        if current_direction == "idle":
+            return "down" if current_level > stops.min() else "up"
+        elif current_direction == "up":
+            return "down" if current_level >= stops.max() else "up"
+        elif current_direction == "down":
+            return "up" if current_level <= stops.min() else "down"
+
+        return "idle"
+
 
 class ShortestSeekAlgorithm(LiftAlgorithm):
     """
@@ -72,6 +99,19 @@ class ShortestSeekAlgorithm(LiftAlgorithm):
             return "down"
         return "idle"
 
+    def pick_direction(
+        self, current_level: int, current_direction: str, stops: StopIndex
+    ) -> str:
+        below = stops.next_below(current_level, inclusive=True)
+        above = stops.next_above(current_level, inclusive=True)
+
+        # Ties go to the lower floor, as min() over sorted keys does
+        if below is not None and (above is None or current_level - below <= above - current_level):
+            return "idle" if below == current_level else "down"
+        if above is not None:
+            return "up"
+        return "idle"
+
 
 class NearestNeighborAlgorithm(LiftAlgorithm):
     """
@@ -109,6 +149,28 @@ class NearestNeighborAlgorithm(LiftAlgorithm):
             return "down"
         return "idle"
 
+    def pick_direction(
+        self, current_level: int, current_direction: str, stops: StopIndex
+    ) -> str:
+        if not stops or current_level in stops:
+            return "idle"
+
+        below = stops.next_below(current_level)
+        above = stops.next_above(current_level)
+        if below is None:
+            return "up"
+        if above is None:
+            return "down"
+
+        dist_below = current_level - below
+        dist_above = above - current_level
+        if dist_above < dist_below:
+            return "up"
+        if dist_below < dist_above:
+            return "down"
+        # Equal distance: keep going up if already moving up, otherwise take the lower floor
+        return "up" if current_direction == "up" else "down"
+
 
 # Algorithm Registry - maps name to class
 # New algorithms can be added here
@@ -0,0 +1,312 @@
+"""
+Batch Engine - steps many buildings in lockstep using NumPy struct-of-arrays.
+Every building has the same number of lifts; algorithm and floor count may
+differ per building. Dispatch, pickups, dropoffs, direction choice and
+movement follow BuildingController / LiftController tick for tick, so results
+can be checked against the reference implementation.
+"""
+import numpy as np
+
+from app.core.config import MIN_FLOOR
+from app.core.history import DIRECTION_CODES, DIRECTION_NAMES
+
+IDLE: int = DIRECTION_CODES["idle"]
+UP: int = DIRECTION_CODES["up"]
+DOWN: int = DIRECTION_CODES["down"]
+
+WAITING: int = 0
+MOVING: int = 1
+ARRIVED: int = 2
+
+# Policies implemented as array kernels
+BATCH_ALGORITHMS: tuple[str, ...] = ("scan", "sstf", "nearest")
+
+
+class BatchEngine:
+    """Struct-of-arrays simulation of many buildings with `num_lifts` lifts each."""
+
+    def __init__(
+        self,
+        algorithms: list[str],
+        max_floors: int | list[int] = 10,
+        num_lifts: int = 2,
+    ) -> None:
+        unknown = sorted(set(algorithms) - set(BATCH_ALGORITHMS))
+        if unknown:
+            raise ValueError(f"No batch kernel for algorithms: {', '.join(unknown)}")
+
+        self.num_buildings: int = len(algorithms)
+        self.num_lifts: int = num_lifts
+        self.algorithms: list[str] = list(algorithms)
+        self.algorithm_ids = np.array(
+            [BATCH_ALGORITHMS.index(name) for name in algorithms], dtype=np.int8
+        )
+        self.max_floors = np.broadcast_to(
+            np.asarray(max_floors, dtype=np.int32), (self.num_buildings,)
+        ).copy()
+        self.num_floors: int = int(self.max_floors.max(initial=MIN_FLOOR)) + 1
+        self.global_tick: int = 0
+
+        shape = (self.num_buildings, num_lifts)
+        self.levels = np.full(shape, MIN_FLOOR, dtype=np.int32)
+        self.directions = np.full(shape, IDLE, dtype=np.int8)
+        # Per-floor counts of waiting pickups and of onboard passengers' dropoffs.
+        # Together they are the fulfillable-stop bitmap each policy looks at.
+        self.pickups = np.zeros((*shape, self.num_floors), dtype=np.int32)
+        self.dropoffs = np.zeros((*shape, self.num_floors), dtype=np.int32)
+        self.waiting = np.zeros(shape, dtype=np.int32)
+        self.onboard = np.zeros(shape, dtype=np.int32)
+
+        self.wait_sum = np.zeros(shape, dtype=np.float64)
+        self.ride_sum = np.zeros(shape, dtype=np.float64)
+        self.total_sum = np.zeros(shape, dtype=np.float64)
+        self.picked_up = np.zeros(shape, dtype=np.int64)
+        self.completed = np.zeros(shape, dtype=np.int64)
+
+        # Passenger table, grown by doubling. `_active` indexes rows not yet arrived.
+        self.num_passengers: int = 0
+        self.p_building = np.empty(0, dtype=np.int32)
+        self.p_lift = np.empty(0, dtype=np.int32)
+        self.p_from = np.empty(0, dtype=np.int32)
+        self.p_to = np.empty(0, dtype=np.int32)
+        self.p_status = np.empty(0, dtype=np.int8)
+        self.p_created = np.empty(0, dtype=np.int64)
+        self.p_picked = np.empty(0, dtype=np.int64)
+        self.p_completed = np.empty(0, dtype=np.int64)
+        self._active = np.empty(0, dtype=np.int64)
+
+    # === Request handling ===
+
+    def add_requests(self, buildings, from_levels, to_levels) -> np.ndarray:
+        """
+        Add one passenger per (building, from, to) triple and dispatch each to a lift.
+        Requests for the same building are dispatched in the given order, exactly
+        as repeated BuildingController.add_request calls would. Returns row ids.
+        """
+        buildings = np.asarray(buildings, dtype=np.int32).ravel()
+        from_levels = np.asarray(from_levels, dtype=np.int32).ravel()
+        to_levels = np.asarray(to_levels, dtype=np.int32).ravel()
+        count = buildings.size
+        if not (from_levels.size == to_levels.size == count):
+            raise ValueError("buildings, from_levels and to_levels must have the same length")
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+
+        top = self.max_floors[buildings]
+        if ((from_levels < MIN_FLOOR) | (from_levels > top)
+                | (to_levels < MIN_FLOOR) | (to_levels > top)).any():
+            raise ValueError("Request floor outside building range")
+
+        rows = self._append_passengers(buildings, from_levels, to_levels)
+
+        # Rank of each request among those for the same building; each round
+        # dispatches at most one request per building so loads stay sequential.
+        order = np.argsort(buildings, kind="stable")
+        sorted_buildings = buildings[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_buildings[1:] != sorted_buildings[:-1]])
+        group_sizes = np.diff(np.r_[group_starts, count])
+        rank = np.empty(count, dtype=np.int64)
+        rank[order] = np.arange(count) - np.repeat(group_starts, group_sizes)
+
+        for round_number in range(int(rank.max()) + 1):
+            batch = np.flatnonzero(rank == round_number)
+            b = buildings[batch]
+            distance = np.abs(self.levels[b] - from_levels[batch, None]).astype(np.int64)
+            load = (self.waiting[b] + 2 * self.onboard[b]).astype(np.int64)
+            # Closest lift first, then least loaded, then lowest index
+            lift = np.argmin(distance * (int(load.max()) + 1) + load, axis=1).astype(np.int32)
+
+            self.p_lift[rows[batch]] = lift
+            self.pickups[b, lift, from_levels[batch]] += 1
+            self.waiting[b, lift] += 1
+
+        return rows
+
+    def _append_passengers(self, buildings, from_levels, to_levels) -> np.ndarray:
+        """Append rows to the passenger table, growing it if needed."""
+        start = self.num_passengers
+        end = start + buildings.size
+        if end > self.p_building.size:
+            capacity = max(end, 2 * self.p_building.size, 1024)
+            for name in (
+                "p_building", "p_lift", "p_from", "p_to",
+                "p_status", "p_created", "p_picked", "p_completed",
+            ):
+                column = getattr(self, name)
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:start] = column[:start]
+                setattr(self, name, grown)
+
+        rows = np.arange(start, end, dtype=np.int64)
+        self.p_building[rows] = buildings
+        self.p_from[rows] = from_levels
+        self.p_to[rows] = to_levels
+        self.p_status[rows] = WAITING
+        self.p_created[rows] = self.global_tick
+        self.p_picked[rows] = -1
+        self.p_completed[rows] = -1
+        self.num_passengers = end
+        self._active = np.concatenate([self._active, rows])
+        return rows
+
+    # === Movement ===
+
+    def step(self) -> None:
+        """Advance every building by one tick."""
+        self.global_tick += 1
+        self._process_stops()
+        self._update_directions()
+        self._move_lifts()
+
+    def run(self, ticks: int) -> None:
+        """Advance every building by `ticks` ticks."""
+        for _ in range(ticks):
+            self.step()
+
+    def _process_stops(self) -> None:
+        """Board every waiting passenger on the current floor, then drop off arrivals."""
+        tick = self.global_tick
+        buildings = np.arange(self.num_buildings)[:, None]
+        lifts = np.arange(self.num_lifts)[None, :]
+        active = self._active
+
+        if active.size:
+            b, lift = self.p_building[active], self.p_lift[active]
+            here = self.levels[b, lift]
+
+            boarding = (self.p_status[active] == WAITING) & (self.p_from[active] == here)
+            if boarding.any():
+                rows = active[boarding]
+                at = (b[boarding], lift[boarding])
+                self.p_status[rows] = MOVING
+                self.p_picked[rows] = tick
+                np.add.at(self.wait_sum, at, tick - self.p_created[rows])
+                np.add.at(self.picked_up, at, 1)
+                np.add.at(self.waiting, at, -1)
+                np.add.at(self.onboard, at, 1)
+                np.add.at(self.dropoffs, (*at, self.p_to[rows]), 1)
+
+            leaving = (self.p_status[active] == MOVING) & (self.p_to[active] == here)
+            if leaving.any():
+                rows = active[leaving]
+                at = (b[leaving], lift[leaving])
+                self.p_status[rows] = ARRIVED
+                self.p_completed[rows] = tick
+                np.add.at(self.ride_sum, at, tick - self.p_picked[rows])
+                np.add.at(self.total_sum, at, tick - self.p_created[rows])
+                np.add.at(self.completed, at, 1)
+                np.add.at(self.onboard, at, -1)
+                self._active = active[~leaving]
+
+        self.pickups[buildings, lifts, self.levels] = 0
+        self.dropoffs[buildings, lifts, self.levels] = 0
+
+    def _update_directions(self) -> None:
+        """Apply each building's policy kernel to its lifts' fulfillable stops."""
+        stops = (self.pickups + self.dropoffs) > 0
+        level = self.levels[..., None]
+        floors = np.arange(self.num_floors)
+        current = self.directions
+        has_stops = stops.any(axis=2)
+
+        policy = self.algorithm_ids[:, None]
+        scan = self._scan(stops, current)
+        sstf = self._sstf(stops & (floors <= level), stops & (floors >= level))
+        nearest = self._nearest(
+            stops & (floors < level),
+            stops & (floors > level),
+            np.take_along_axis(stops, level, axis=2)[..., 0],
+            current,
+        )
+
+        chosen = np.select([policy == 0, policy == 1], [scan, sstf], default=nearest)
+        self.directions = np.where(has_stops, chosen, IDLE).astype(np.int8)
+
+    def _scan(self, stops: np.ndarray, current: np.ndarray) -> np.ndarray:
+        """SCAN/LOOK kernel, mirroring ScanAlgorithm."""
+        lowest = _first_true(stops)
+        highest = _last_true(stops)
+        level = self.levels
+        return np.where(
+            current == IDLE,
+            np.where(level > lowest, DOWN, UP),
+            np.where(
+                current == UP,
+                np.where(level >= highest, DOWN, UP),
+                np.where(level <= lowest, UP, DOWN),
+            ),
+        )
+
+    def _sstf(self, at_or_below: np.ndarray, at_or_above: np.ndarray) -> np.ndarray:
+        """SSTF kernel, mirroring ShortestSeekAlgorithm (ties go to the lower floor)."""
+        level = self.levels
+        has_below = at_or_below.any(axis=2)
+        has_above = at_or_above.any(axis=2)
+        below = _last_true(at_or_below)
+        above = _first_true(at_or_above)
+
+        take_below = has_below & (~has_above | (level - below <= above - level))
+        return np.where(
+            take_below,
+            np.where(below == level, IDLE, DOWN),
+            np.where(has_above, UP, IDLE),
+        )
+
+    def _nearest(
+        self, below: np.ndarray, above: np.ndarray, here: np.ndarray, current: np.ndarray
+    ) -> np.ndarray:
+        """Nearest-neighbour kernel, mirroring NearestNeighborAlgorithm."""
+        level = self.levels
+        has_below = below.any(axis=2)
+        has_above = above.any(axis=2)
+        dist_below = level - _last_true(below)
+        dist_above = _first_true(above) - level
+
+        tie = np.where(current == UP, UP, DOWN)
+        choice = np.where(
+            dist_above < dist_below, UP, np.where(dist_below < dist_above, DOWN, tie)
+        )
+        choice = np.where(has_below, np.where(has_above, choice, DOWN), UP)
+        return np.where(here, IDLE, choice)
+
+    def _move_lifts(self) -> None:
+        """Move lifts one floor in their direction, within the building's range."""
+        top = self.max_floors[:, None]
+        up = (self.directions == UP) & (self.levels < top)
+        down = (self.directions == DOWN) & (self.levels > MIN_FLOOR)
+        self.levels += up.astype(np.int32) - down.astype(np.int32)
+
+    # === State ===
+
+    def get_lift_state(self, building: int) -> list[dict]:
+        """Level, direction and passenger count of each lift in one building."""
+        return [
+            {
+                "level": int(self.levels[building, lift]),
+                "direction": DIRECTION_NAMES[int(self.directions[building, lift])],
+                "passenger_count": int(self.onboard[building, lift]),
+            }
+            for lift in range(self.num_lifts)
+        ]
+
+    def get_stats(self) -> dict[str, np.ndarray]:
+        """Per-building stats pooled across lifts the way BuildingController does."""
+        picked_up = self.picked_up.sum(axis=1)
+        completed = self.completed.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "avg_wait": np.where(picked_up > 0, self.wait_sum.sum(axis=1) / picked_up, 0.0),
+                "avg_ride": np.where(completed > 0, self.ride_sum.sum(axis=1) / completed, 0.0),
+                "avg_total": np.where(completed > 0, self.total_sum.sum(axis=1) / completed, 0.0),
+                "completed": completed,
+            }
+
+
+def _first_true(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True along the last axis (0 where none)."""
+    return mask.argmax(axis=-1)
+
+
+def _last_true(mask: np.ndarray) -> np.ndarray:
+    """Index of the last True along the last axis (last index where none)."""
+    return mask.shape[-1] - 1 - mask[..., ::-1].argmax(axis=-1)
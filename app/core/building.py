@@ -1,98 +1,388 @@
 """
-Building Controller - Manages 2 lifts servicing the same building.
+Building Controller - Manages a bank of lifts servicing the same building.
 Uses encapsulated accessors to follow Law of Demeter.
 """
-from app.core.config import DEFAULT_ALGORITHM
-from app.core.lift import LiftController
+import heapq
+import time
+import zlib
+from collections.abc import Callable
+
+from app.core.commands import CommandLog
+from app.core.config import DEFAULT_ALGORITHM, DEFAULT_NUM_LIFTS, HISTORY_SIZE, MIN_FLOOR
+from app.core.dispatch import DEFAULT_DISPATCH, DispatchStrategy, get_dispatcher, lift_name
+from app.core.lift import STOP_ACTION_BYTES, LiftController, summarize_stats
+from app.core.metrics import DISPATCH_SECONDS
+from app.core.reassign import Reassigner
+from app.core.sketch import QuantileSketch
+
+Zone = tuple[int, int]
 
 
 class BuildingController:
-    """A building with 2 lifts working together to service passengers."""
+    """
+    A building with `num_lifts` lifts working together to service passengers.
+    Optional `zones` give each lift the (lowest, highest) floor whose hall
+    calls it answers; together they must cover every floor. `dispatch` names
+    the strategy in DISPATCH_REGISTRY that assigns calls to lifts. With
+    `reassign_every` > 0, calls not yet picked up are re-solved across all
+    lifts every that many ticks.
+    """
 
     def __init__(
-        self, algorithm_name: str = DEFAULT_ALGORITHM, max_floors: int = 10
+        self,
+        algorithm_name: str = DEFAULT_ALGORITHM,
+        max_floors: int = 10,
+        history_size: int = HISTORY_SIZE,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        dispatch: str = DEFAULT_DISPATCH,
+        reassign_every: int = 0,
     ) -> None:
-        self.lift_a = LiftController(algorithm_name=algorithm_name, max_floors=max_floors)
-        self.lift_b = LiftController(algorithm_name=algorithm_name, max_floors=max_floors)
+        if num_lifts < 1:
+            raise ValueError("A building needs at least one lift")
+        if reassign_every < 0:
+            raise ValueError("reassign_every must not be negative")
+        if zones is not None:
+            zones = [(int(low), int(high)) for low, high in zones]
+            _validate_zones(zones, num_lifts, max_floors)
+
+        self.lifts: list[LiftController] = [
+            LiftController(
+                algorithm_name=algorithm_name, max_floors=max_floors, history_size=history_size
+            )
+            for _ in range(num_lifts)
+        ]
+        self.lift_names: list[str] = [lift_name(i) for i in range(num_lifts)]
+        self.zones: list[Zone] | None = zones
         self.algorithm_name: str = algorithm_name
         self.max_floors: int = max_floors
         self.global_tick: int = 0
         self.total_passengers: int = 0
+        # Bumped on every change to the state get_state reports
+        self.version: int = 0
+        self._state: dict | None = None
+        self._state_version: int = -1
+        # (picked_up, completed) over all lifts the memoized pooled stats were built at
+        self._stats: tuple[tuple[int, int], dict] | None = None
+        # Requests waiting for their arrival tick: (tick, seq, passenger_id, from, to)
+        self.scheduled: list[tuple[int, int, str, int, int]] = []
+        self._scheduled_seq: int = 0
+
+        self.dispatcher: DispatchStrategy = get_dispatcher(dispatch, self)
+        self.dispatch_name: str = self.dispatcher.name
+        self.reassign_every: int = reassign_every
+        self.reassigner: Reassigner = Reassigner(self)
+        for i, lift in enumerate(self.lifts):
+            lift.on_change = self._lift_changed(i)
+        # Set by the session manager to record incoming requests (see app/core/commands.py)
+        self.command_log: CommandLog | None = None
+
+    def __getstate__(self) -> dict:
+        # The state memo is rebuilt on demand and the log belongs to the session,
+        # so snapshots leave both out
+        state = self.__dict__.copy()
+        state["_state"] = None
+        state["_state_version"] = -1
+        state["_stats"] = None
+        state["command_log"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        for i, lift in enumerate(self.lifts):
+            lift.on_change = self._lift_changed(i)
+
+    def fork(
+        self, algorithm: str | None = None, dispatch: str | None = None
+    ) -> "BuildingController":
+        """
+        Independent copy that continues from this building's current state,
+        optionally with another algorithm or dispatch strategy. Shares
+        immutable data with this building (see LiftController.fork).
+        """
+        clone = BuildingController.__new__(BuildingController)
+        clone.__dict__.update(self.__dict__)
+        clone.lifts = [lift.fork() for lift in self.lifts]
+        clone.scheduled = list(self.scheduled)
+        # The memo aliases this building's stop lists, so the copy builds its own
+        clone._state = None
+        clone._state_version = -1
+        clone.command_log = None
+        clone.dispatcher = self.dispatcher.fork(clone)
+        clone.reassigner = self.reassigner.fork(clone)
+        for i, lift in enumerate(clone.lifts):
+            lift.on_change = clone._lift_changed(i)
+
+        if algorithm is not None:
+            clone.set_algorithm(algorithm)
+        if dispatch is not None:
+            clone.set_dispatch(dispatch)
+        return clone
+
+    def set_algorithm(self, algorithm_name: str) -> None:
+        """Switch every lift to another algorithm."""
+        for lift in self.lifts:
+            lift.set_algorithm(algorithm_name)
+        self.algorithm_name = algorithm_name
+        self.version += 1
+
+    def set_dispatch(self, dispatch: str) -> None:
+        """Switch to another dispatch strategy for calls from now on."""
+        self.dispatcher = get_dispatcher(dispatch, self)
+        self.dispatch_name = self.dispatcher.name
+        self.version += 1
+
+    @property
+    def lift_a(self) -> LiftController:
+        return self.lifts[0]
+
+    @property
+    def lift_b(self) -> LiftController:
+        """Second lift, kept for two-lift callers; use `lifts` for any size."""
+        if len(self.lifts) < 2:
+            raise AttributeError(f"lift_b needs at least 2 lifts, building has {len(self.lifts)}")
+        return self.lifts[1]
+
+    def _lift_changed(self, i: int) -> Callable[[], None]:
+        def changed() -> None:
+            self.dispatcher.lift_changed(i)
+            self.version += 1
+
+        return changed
+
+    # === Dispatch ===
 
     def add_request(self, passenger_id: str, from_level: int, to_level: int) -> None:
-        """Dispatch request to the most suitable lift."""
-        # Use encapsulated methods instead of accessing internal state
-        dist_a = self.lift_a.get_distance_to(from_level)
-        dist_b = self.lift_b.get_distance_to(from_level)
-        load_a = self.lift_a.get_load()
-        load_b = self.lift_b.get_load()
-
-        # Prefer closer lift, or less loaded if equal distance
-        if dist_a < dist_b:
-            target_lift, suffix = self.lift_a, "_A"
-        elif dist_b < dist_a:
-            target_lift, suffix = self.lift_b, "_B"
-        elif load_a <= load_b:
-            target_lift, suffix = self.lift_a, "_A"
-        else:
-            target_lift, suffix = self.lift_b, "_B"
-
-        target_lift.add_request(f"{passenger_id}{suffix}", from_level, to_level)
+        """Dispatch request to the lift chosen by the building's dispatcher."""
+        if self.command_log is not None:
+            self.command_log.add(self.global_tick, passenger_id, from_level, to_level)
+        started = time.perf_counter()
+        i = self.dispatcher.select(from_level, to_level)
+        DISPATCH_SECONDS.observe(time.perf_counter() - started, self.dispatch_name)
+        self.lifts[i].add_request(f"{passenger_id}_{self.lift_names[i]}", from_level, to_level)
         self.total_passengers += 1
+        self.version += 1
+
+    def add_requests(self, batch: list[tuple[str, int, int]]) -> None:
+        """
+        Dispatch many (passenger_id, from_level, to_level) requests at once.
+        Assigns exactly as repeated add_request calls would, but hands each
+        lift its share in a single add_requests call.
+        """
+        if self.command_log is not None:
+            self.command_log.add_batch(self.global_tick, batch)
+        self._add_requests(batch)
+
+    def _add_requests(self, batch: list[tuple[str, int, int]]) -> None:
+        shares: dict[int, list[tuple[str, int, int]]] = {}
+        started = time.perf_counter()
+        for passenger_id, from_level, to_level in batch:
+            i = self.dispatcher.select(from_level, to_level)
+            shares.setdefault(i, []).append(
+                (f"{passenger_id}_{self.lift_names[i]}", from_level, to_level)
+            )
+            # The lift only sees its share below; let the dispatcher account for it now
+            self.dispatcher.assigned(i, from_level, to_level)
+        if batch:
+            elapsed = time.perf_counter() - started
+            DISPATCH_SECONDS.observe(elapsed / len(batch), self.dispatch_name, len(batch))
+
+        for i, share in shares.items():
+            self.lifts[i].add_requests(share)
+        self.dispatcher.committed()
+        self.total_passengers += len(batch)
+        self.version += 1
+
+    def transfer_request(self, passenger_id: str, source: int, target: int) -> bool:
+        """
+        Move a request lift `source` has not picked up yet to lift `target`,
+        keeping its original wait start. Returns False if it was not waiting.
+        """
+        request = self.lifts[source].remove_request(passenger_id)
+        if request is None:
+            return False
+        # Swap the lift suffix add_request gave it for the new lift's
+        base_id = passenger_id[: -len(self.lift_names[source]) - 1]
+        self.lifts[target].add_request(
+            f"{base_id}_{self.lift_names[target]}",
+            request["from_level"],
+            request["to_level"],
+            created_at=request["created_at"],
+        )
+        return True
+
+    def schedule_requests(self, batch: list[tuple[int, str, int, int]]) -> None:
+        """
+        Queue (tick, passenger_id, from_level, to_level) requests. Each is
+        dispatched once global_tick reaches its tick; past ticks dispatch now.
+        """
+        if self.command_log is not None:
+            self.command_log.schedule(self.global_tick, batch)
+        due: list[tuple[str, int, int]] = []
+        for tick, passenger_id, from_level, to_level in batch:
+            if tick <= self.global_tick:
+                due.append((passenger_id, from_level, to_level))
+            else:
+                heapq.heappush(
+                    self.scheduled, (tick, self._scheduled_seq, passenger_id, from_level, to_level)
+                )
+                self._scheduled_seq += 1
+        if due:
+            self._add_requests(due)
+
+    def _release_scheduled(self) -> None:
+        """Dispatch scheduled requests whose arrival tick has been reached."""
+        due: list[tuple[str, int, int]] = []
+        while self.scheduled and self.scheduled[0][0] <= self.global_tick:
+            _, _, passenger_id, from_level, to_level = heapq.heappop(self.scheduled)
+            due.append((passenger_id, from_level, to_level))
+        if due:
+            self._add_requests(due)
+
+    # === Movement ===
 
     def move(self) -> dict:
-        """Move both lifts one step."""
-        self.global_tick += 1
-        self.lift_a.move()
-        self.lift_b.move()
+        """Move every lift one step."""
+        self.step()
         return self.get_state()
 
+    def step(self) -> None:
+        """Move every lift one step without building a state snapshot."""
+        self.global_tick += 1
+        self.version += 1
+        for lift in self.lifts:
+            lift.step()
+        if self.scheduled:
+            self._release_scheduled()
+        if self.reassign_every and self.global_tick % self.reassign_every == 0:
+            self.reassigner.solve()
+
+    def run(self, ticks: int) -> dict:
+        """Advance every lift headlessly by `ticks` ticks and return the final state."""
+        completed_before = self.get_completed()
+        for _ in range(ticks):
+            self.step()
+
+        return {
+            **self.get_state(),
+            "run": {"ticks": ticks, "completed": self.get_completed() - completed_before},
+        }
+
+    # === State ===
+
+    def get_history(
+        self, start: int | None = None, end: int | None = None, max_points: int | None = None
+    ) -> dict:
+        """Get recorded per-tick samples of every lift."""
+        return {
+            "lifts": [
+                {"name": name, **lift.get_history(start, end, max_points)}
+                for name, lift in zip(self.lift_names, self.lifts, strict=True)
+            ]
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the lifts and the scheduled-request queue."""
+        scheduled = len(self.scheduled) * STOP_ACTION_BYTES * 2
+        return sum(lift.memory_bytes() for lift in self.lifts) + scheduled
+
+    def pending_passengers(self) -> dict[str, int]:
+        """Passengers waiting for a lift, riding one, or scheduled to arrive later."""
+        return {
+            "waiting": sum(len(lift.waiting) for lift in self.lifts),
+            "riding": sum(len(lift.passengers) for lift in self.lifts),
+            "scheduled": len(self.scheduled),
+        }
+
+    def digest(self) -> int:
+        """
+        Checksum of the tick and every lift's position, direction and load,
+        for checking that two runs reached the same state.
+        """
+        value = zlib.crc32(self.global_tick.to_bytes(8, "big"))
+        for lift in self.lifts:
+            key = (lift.current_level, lift.direction, lift.passengers, len(lift.active_requests))
+            value = zlib.crc32(repr(key).encode(), value)
+        return value
+
+    def get_completed(self) -> int:
+        """Get number of passengers delivered by all lifts."""
+        return sum(lift.stats_counts["completed"] for lift in self.lifts)
+
     def get_state(self) -> dict:
-        """Get combined state of both lifts."""
-        state_a = self.lift_a.get_state()
-        state_b = self.lift_b.get_state()
-
-        completed_a = self.lift_a.stats_counts["completed"]
-        completed_b = self.lift_b.stats_counts["completed"]
-        total_completed = completed_a + completed_b
-
-        if total_completed > 0:
-            avg_wait = (
-                state_a["stats"]["avg_wait"] * completed_a
-                + state_b["stats"]["avg_wait"] * completed_b
-            ) / total_completed
-            avg_ride = (
-                state_a["stats"]["avg_ride"] * completed_a
-                + state_b["stats"]["avg_ride"] * completed_b
-            ) / total_completed
-            avg_total = (
-                state_a["stats"]["avg_total"] * completed_a
-                + state_b["stats"]["avg_total"] * completed_b
-            ) / total_completed
-        else:
-            avg_wait = avg_ride = avg_total = 0
+        """
+        Get combined state of all lifts. The snapshot is built on first access
+        after a change and shared by every caller until the next one, so
+        callers must not mutate it.
+        """
+        if self._state is None or self._state_version != self.version:
+            self._state = self._build_state()
+            self._state_version = self.version
+        return self._state
+
+    def get_stats(self) -> dict:
+        """
+        Stats pooled over all lifts: summed running totals and merged sketches,
+        rebuilt only after a pickup or dropoff. Callers must not mutate the result.
+        """
+        counts = {
+            key: sum(lift.stats_counts[key] for lift in self.lifts)
+            for key in ("picked_up", "completed")
+        }
+        key = (counts["picked_up"], counts["completed"])
+        if self._stats is None or self._stats[0] != key:
+            sums = {
+                name: sum(lift.stats_sums[name] for lift in self.lifts)
+                for name in self.lifts[0].stats_sums
+            }
+            sketches = {
+                name: QuantileSketch.merged(lift.sketches[name] for lift in self.lifts)
+                for name in self.lifts[0].sketches
+            }
+            self._stats = (key, summarize_stats(sums, counts, sketches))
+        return self._stats[1]
+
+    def _build_state(self) -> dict:
+        lifts = []
+        active_passengers: list[dict] = []
+        for i, lift in enumerate(self.lifts):
+            lift_state = {
+                "name": self.lift_names[i],
+                "level": lift.current_level,
+                "direction": lift.direction,
+                "passengers": list(lift.passengers),
+                "pending_stops": lift.stops.to_dict(),
+                "stats": lift.get_stats(),
+            }
+            if self.zones is not None:
+                lift_state["zone"] = list(self.zones[i])
+            lifts.append(lift_state)
+            active_passengers.extend(lift.active_requests.values())
+            active_passengers.extend(lift.recent_completed)
 
         return {
             "algorithm": self.algorithm_name,
-            "lift_a": {
-                "level": self.lift_a.current_level,
-                "direction": self.lift_a.direction,
-                "passengers": self.lift_a.passengers,
-                "pending_stops": self.lift_a.stops,
-            },
-            "lift_b": {
-                "level": self.lift_b.current_level,
-                "direction": self.lift_b.direction,
-                "passengers": self.lift_b.passengers,
-                "pending_stops": self.lift_b.stops,
-            },
-            "active_passengers": state_a["active_passengers"] + state_b["active_passengers"],
+            "dispatch": self.dispatch_name,
+            "lifts": lifts,
+            "active_passengers": active_passengers,
             "global_tick": self.global_tick,
-            "stats": {
-                "avg_wait": avg_wait,
-                "avg_ride": avg_ride,
-                "avg_total": avg_total,
-                "completed": total_completed,
-            },
+            "stats": self.get_stats(),
             "max_floors": self.max_floors,
         }
+
+
+def _validate_zones(zones: list[Zone], num_lifts: int, max_floors: int) -> None:
+    """Raise ValueError unless there is one in-range zone per lift covering every floor."""
+    if len(zones) != num_lifts:
+        raise ValueError(f"Expected {num_lifts} zones, one per lift, got {len(zones)}")
+    for low, high in zones:
+        if not MIN_FLOOR <= low <= high <= max_floors:
+            raise ValueError(f"Zone ({low}, {high}) is outside floors {MIN_FLOOR}-{max_floors}")
+
+    covered_to = MIN_FLOOR - 1
+    for low, high in sorted(zones):
+        if low > covered_to + 1:
+            break
+        covered_to = max(covered_to, high)
+    if covered_to < max_floors:
+        raise ValueError(f"No zone serves floor {covered_to + 1}")
@@ -0,0 +1,130 @@
+"""
+Command Log - append-only record of the commands that reached a session.
+Replaying the commands on the session's starting state reproduces the
+session exactly, since the simulation is deterministic. Movement is not
+logged: every command carries the tick it arrived at, so a replay simply
+steps until that tick.
+
+A log is newline-delimited JSON. The first line is a header holding a
+snapshot of the starting state (see app/core/snapshot.py); every other line
+is a compact array starting with the tick:
+
+    [tick, "a", passenger_id, from_level, to_level]    add_request
+    [tick, "b", [[passenger_id, from_level, to_level], ...]]    add_requests
+    [tick, "s", [[at_tick, passenger_id, from_level, to_level], ...]]    schedule_requests
+    [tick, "c", digest]    checkpoint, the controller's digest() at that tick
+"""
+import base64
+import json
+from collections.abc import Iterator
+
+from app.core.config import COMMAND_LOG_BUFFER
+
+COMMAND_LOG_FORMAT: str = "lift-commands"
+COMMAND_LOG_VERSION: int = 1
+
+ADD: str = "a"
+ADD_BATCH: str = "b"
+SCHEDULE: str = "s"
+CHECKPOINT: str = "c"
+# Length of each kind of record
+_ARITY: dict[str, int] = {ADD: 5, ADD_BATCH: 3, SCHEDULE: 3, CHECKPOINT: 3}
+
+
+def _encode(record: object) -> str:
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+class CommandLog:
+    """
+    Buffered writer for one session's log at `path`. The header is written
+    straight away; records are appended every `buffer_size` records, on
+    checkpoint and on flush. The file is only open while writing, so idle
+    sessions hold no file descriptors.
+    """
+
+    def __init__(
+        self, path: str, base: bytes, session_type: str, buffer_size: int = COMMAND_LOG_BUFFER
+    ) -> None:
+        self.path: str = path
+        self.buffer_size: int = buffer_size
+        self.records: int = 0
+        self._buffer: list[str] = []
+        header = {
+            "format": COMMAND_LOG_FORMAT,
+            "version": COMMAND_LOG_VERSION,
+            "type": session_type,
+            "base": base64.b64encode(base).decode("ascii"),
+        }
+        with open(path, "w") as f:
+            f.write(_encode(header))
+
+    def add(self, tick: int, passenger_id: str, from_level: int, to_level: int) -> None:
+        self._append([tick, ADD, passenger_id, from_level, to_level])
+
+    def add_batch(self, tick: int, batch: list[tuple[str, int, int]]) -> None:
+        self._append([tick, ADD_BATCH, batch])
+
+    def schedule(self, tick: int, batch: list[tuple[int, str, int, int]]) -> None:
+        self._append([tick, SCHEDULE, batch])
+
+    def checkpoint(self, tick: int, digest: int) -> None:
+        """Record the state reached at `tick` so a replay can check it, and flush."""
+        self._append([tick, CHECKPOINT, digest])
+        self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        with open(self.path, "a") as f:
+            f.writelines(self._buffer)
+        self._buffer.clear()
+
+    def _append(self, record: list) -> None:
+        self._buffer.append(_encode(record))
+        self.records += 1
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+
+def read_log(path: str) -> tuple[dict, list[list]]:
+    """
+    Header and records of a command log, with the base snapshot decoded to
+    bytes under "base". Raises ValueError if the file is not a command log.
+    """
+    with open(path) as f:
+        lines = iter(f)
+        try:
+            header = json.loads(next(lines))
+        except (StopIteration, json.JSONDecodeError) as e:
+            raise ValueError(f"{path} has no command log header") from e
+        if not isinstance(header, dict) or header.get("format") != COMMAND_LOG_FORMAT:
+            raise ValueError(f"{path} is not a command log")
+        if header.get("version") != COMMAND_LOG_VERSION:
+            raise ValueError(
+                f"Unsupported command log version {header.get('version')}, "
+                f"expected {COMMAND_LOG_VERSION}"
+            )
+        if not isinstance(header.get("base"), str):
+            raise ValueError(f"{path} has no base snapshot")
+        header["base"] = base64.b64decode(header["base"])
+        return header, list(_records(lines, path))
+
+
+def _records(lines: Iterator[str], path: str) -> Iterator[list]:
+    # The header is line 1
+    for line_number, line in enumerate(lines, 2):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # A crash can leave the last line half written; anything earlier is corrupt
+            if line.endswith("\n"):
+                raise ValueError(f"{path}:{line_number}: invalid record") from None
+            return
+        if not isinstance(record, list) or len(record) < 3 or record[1] not in _ARITY:
+            raise ValueError(f"{path}:{line_number}: invalid record")
+        if len(record) != _ARITY[record[1]]:
+            raise ValueError(f"{path}:{line_number}: invalid {record[1]!r} record")
+        yield record
@@ -2,14 +2,60 @@
 Centralized configuration for the lift simulation.
 """
 import os
+import secrets
 
 # Building configuration
 MAX_FLOORS: int = 10
 MIN_FLOOR: int = 0
+DEFAULT_NUM_LIFTS: int = 2
+MAX_LIFTS: int = 32
+MAX_LEAGUE_BUILDINGS: int = 16  # Buildings in one K-way comparison
+
+# Lift-ticks in one run below which league buildings step serially, since
+# shipping a building to a worker costs about as much as a few thousand lift-ticks
+LEAGUE_PARALLEL_MIN_WORK: int = 50_000
 
 # Simulation configuration
 DEFAULT_TICK_INTERVAL_MS: int = 1000  # Server-side tick interval
+SCHEDULER_RESOLUTION_MS: int = 50  # Autoplay timing wheel slot width
+SCHEDULER_WHEEL_SLOTS: int = 512
 SESSION_TIMEOUT_MINUTES: int = 30
+SESSION_CLEANUP_INTERVAL_S: int = 60
+MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", "1000"))  # Least recently used evicted beyond
+# Sessions idle this long are written to disk until next accessed, 0 keeps all in memory
+SESSION_SPILL_AFTER_S: int = int(os.getenv("SESSION_SPILL_AFTER_S", "300"))
+SESSION_SPILL_PATH: str = os.getenv("SESSION_SPILL_PATH", "")  # SQLite file, default a temp file
+# Key signing snapshots handed to clients; the random default only accepts this process's own
+SNAPSHOT_SECRET: bytes = os.getenv("SNAPSHOT_SECRET", "").encode() or secrets.token_bytes(32)
+# Directory for per-session command logs replayable with lift-replay, empty disables
+SESSION_LOG_DIR: str = os.getenv("SESSION_LOG_DIR", "")
+COMMAND_LOG_BUFFER: int = 256  # Log records held in memory before appending to the file
+
+# Sharding: set by the cluster launcher for each shard process (see app/cluster.py)
+SHARD_INDEX: int = int(os.getenv("LIFT_SHARD_INDEX", "0"))
+SHARD_COUNT: int = int(os.getenv("LIFT_SHARD_COUNT", "1"))
+# Processes stepping league buildings in parallel, per shard; shards split the cores
+LEAGUE_WORKERS: int = int(os.getenv("LEAGUE_WORKERS", "0")) or max(
+    (os.cpu_count() or 1) // SHARD_COUNT, 1
+)
+MAX_MOVE_TICKS: int = 100_000  # Upper bound for one fast-forward request
+BULK_BATCH_SIZE: int = 1000  # Passengers validated and dispatched per batch
+HISTORY_SIZE: int = int(os.getenv("HISTORY_SIZE", "3600"))  # Ticks kept per lift, 0 disables
+WS_SEND_QUEUE_SIZE: int = 32  # Deltas buffered per viewer before it is resynced
+# Percentiles of wait, ride and total time reported in stats, e.g. p95_wait
+STAT_PERCENTILES: tuple[int, ...] = (50, 95, 99)
+SKETCH_EXACT_BELOW: int = 128  # Passenger times under this many ticks are counted exactly
+SKETCH_RELATIVE_ACCURACY: float = 0.01  # Worst-case relative error of longer times
+# Upper bounds of the /metrics latency histogram buckets, 10us to 10s
+LATENCY_BUCKETS_S: tuple[float, ...] = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Reassignment of waiting hall calls between lifts
+REASSIGN_MAX_CALLS: int = 64  # Oldest waiting calls re-solved per pass
+REASSIGN_MARGIN: int = 2  # Ticks sooner a lift must arrive to take over a call
+REASSIGN_LOAD_WEIGHT: float = 1.0  # Ticks of cost per request a lift already has
 
 # CORS configuration
 CORS_ORIGINS: list[str] = os.getenv(
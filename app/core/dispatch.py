@@ -0,0 +1,302 @@
+"""
+Dispatch - picks which lift of a building answers a hall call.
+Strategies are pluggable through DISPATCH_REGISTRY:
+- nearest: LiftIndex buckets lifts by floor so the closest, least loaded lift
+  is found from the occupied floors either side of the call.
+- eta: scores each lift by when it would reach the call floor while serving
+  the stops it has already committed to, using cached per-lift route plans.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING
+
+from app.core.config import MIN_FLOOR
+from app.core.stops import StopIndex
+
+if TYPE_CHECKING:
+    from app.core.building import BuildingController, Zone
+    from app.core.lift import LiftController
+
+# Route plans simulate at most this many end-to-end sweeps of the building
+PLAN_SWEEPS: int = 4
+DEFAULT_DISPATCH: str = "nearest"
+
+
+def lift_name(index: int) -> str:
+    """Spreadsheet-style lift name: A..Z, then AA, AB, ..."""
+    name = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord("A") + remainder) + name
+    return name
+
+
+class LiftIndex:
+    """
+    Lifts bucketed by current floor, each bucket sorted by (load, lift index).
+    Kept up to date with update() whenever a lift moves or its load changes.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[int, list[tuple[int, int]]] = {}
+        # Occupied floors in ascending order
+        self._floors: list[int] = []
+        # lift index -> (floor, load) it is filed under
+        self._keys: dict[int, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, index: object) -> bool:
+        return index in self._keys
+
+    def update(self, index: int, floor: int, load: int) -> None:
+        """File lift `index` under its current floor and load."""
+        key = self._keys.get(index)
+        if key == (floor, load):
+            return
+        if key is not None:
+            self._remove(index, *key)
+
+        bucket = self._buckets.get(floor)
+        if bucket is None:
+            bucket = self._buckets[floor] = []
+            insort(self._floors, floor)
+        insort(bucket, (load, index))
+        self._keys[index] = (floor, load)
+
+    def add_load(self, index: int, amount: int = 1) -> None:
+        """Adjust a lift's load without moving it."""
+        floor, load = self._keys[index]
+        self.update(index, floor, load + amount)
+
+    def _remove(self, index: int, floor: int, load: int) -> None:
+        bucket = self._buckets[floor]
+        del bucket[bisect_left(bucket, (load, index))]
+        if not bucket:
+            del self._buckets[floor]
+            del self._floors[bisect_left(self._floors, floor)]
+
+    def best(self, floor: int) -> tuple[int, int, int]:
+        """
+        (distance, load, lift index) of the lift that should answer a call at
+        `floor`: closest first, then least loaded, then lowest index.
+        Raises ValueError if no lift is indexed.
+        """
+        if not self._floors:
+            raise ValueError("No lifts indexed")
+
+        position = bisect_left(self._floors, floor)
+        candidates = []
+        if position < len(self._floors):
+            above = self._floors[position]
+            candidates.append((above - floor, *self._buckets[above][0]))
+        if position > 0:
+            below = self._floors[position - 1]
+            candidates.append((floor - below, *self._buckets[below][0]))
+        return min(candidates)
+
+
+# === Strategies ===
+
+class DispatchStrategy(ABC):
+    """
+    Base class for hall-call dispatch. One instance serves one building and
+    may keep per-lift state; the building reports lift changes and batch
+    assignments through the hooks below.
+    """
+
+    name: str = "base"
+    description: str = "Base dispatcher"
+
+    def __init__(self, building: BuildingController) -> None:
+        self.building = building
+
+    @abstractmethod
+    def select(self, from_level: int, to_level: int) -> int:
+        """Index of the lift that should answer a call from `from_level` to `to_level`."""
+
+    def lift_changed(self, i: int) -> None:
+        """Lift `i` moved or its load or stops changed."""
+        return None
+
+    def assigned(self, i: int, from_level: int, to_level: int) -> None:
+        """A batched call was assigned to lift `i` but not yet handed to it."""
+        return None
+
+    def committed(self) -> None:
+        """Every batched assignment has been handed to its lift."""
+        return None
+
+    def fork(self, building: BuildingController) -> DispatchStrategy:
+        """Fresh dispatcher of the same kind for a forked copy of the building."""
+        return type(self)(building)
+
+    def zone(self, i: int) -> Zone:
+        """Floors whose hall calls lift `i` answers."""
+        zones = self.building.zones
+        return zones[i] if zones is not None else (MIN_FLOOR, self.building.max_floors)
+
+    def serving(self, floor: int) -> list[int]:
+        """Lifts answering calls at `floor`; every lift for out-of-range floors."""
+        lifts = range(len(self.building.lifts))
+        serving = [i for i in lifts if self.zone(i)[0] <= floor <= self.zone(i)[1]]
+        return serving or list(lifts)
+
+
+class NearestDispatcher(DispatchStrategy):
+    """Closest lift serving the floor, then least loaded, then first."""
+
+    name = "nearest"
+    description = "Nearest car - closest lift, least loaded on ties"
+
+    def __init__(self, building: BuildingController) -> None:
+        super().__init__(building)
+        # One index per distinct zone, each with the lifts serving it
+        self.indexes: dict[Zone, LiftIndex] = {}
+        self._lift_index: list[LiftIndex] = []
+        for i in range(len(building.lifts)):
+            index = self.indexes.setdefault(self.zone(i), LiftIndex())
+            self._lift_index.append(index)
+            self.lift_changed(i)
+
+    def select(self, from_level: int, to_level: int) -> int:
+        # Zones cover every floor, so only out-of-range floors fall back to any lift
+        candidates = [
+            index.best(from_level)
+            for (low, high), index in self.indexes.items()
+            if low <= from_level <= high
+        ] or [index.best(from_level) for index in self.indexes.values()]
+        return min(candidates)[2]
+
+    def lift_changed(self, i: int) -> None:
+        lift = self.building.lifts[i]
+        self._lift_index[i].update(i, lift.current_level, lift.get_load())
+
+    def assigned(self, i: int, from_level: int, to_level: int) -> None:
+        self._lift_index[i].add_load(i)
+
+
+class RoutePlan:
+    """
+    Where a lift will be on each coming tick if it only serves its committed
+    stops, simulated with its own algorithm. Valid until the lift's stops
+    change; as the lift follows the plan, queries just move along it.
+    """
+
+    def __init__(
+        self,
+        lift: LiftController,
+        extra_pickups: list[tuple[int, int]],
+        key: tuple[int, int],
+    ) -> None:
+        self.key: tuple[int, int] = key
+        self.start_tick: int = lift.global_tick
+        self.levels: list[int] = []
+        # floor -> plan offsets at which the lift is on that floor, ascending
+        self.visits: dict[int, list[int]] = {}
+
+        pending = StopIndex()
+        pending.extend({floor: list(actions) for floor, actions in lift.fulfillable.items()})
+        for from_level, to_level in extra_pickups:
+            pending.setdefault(from_level, []).append(("pickup", None, to_level))
+
+        level, direction = lift.current_level, lift.direction
+        horizon = PLAN_SWEEPS * 2 * (lift.max_floors - MIN_FLOOR + 1)
+        for offset in range(horizon):
+            self.levels.append(level)
+            self.visits.setdefault(level, []).append(offset)
+            # Mirrors LiftController.step: serve this floor, pick a direction, move
+            for action in pending.get(level, ()):
+                if action[0] == "pickup":
+                    pending.setdefault(action[2], []).append(("dropoff", action[1]))
+            pending.pop(level, None)
+            if not pending:
+                break
+            direction = lift.algorithm.pick_direction(level, direction, pending)
+            if direction == "up" and level < lift.max_floors:
+                level += 1
+            elif direction == "down" and level > MIN_FLOOR:
+                level -= 1
+
+        # The lift parks on its last planned floor once the route is done
+        self.end_offset: int = len(self.levels) - 1
+        self.end_level: int = self.levels[-1]
+
+    def level_at(self, tick: int) -> int:
+        offset = tick - self.start_tick
+        return self.levels[min(offset, self.end_offset)]
+
+    def eta(self, floor: int, tick: int) -> int:
+        """Ticks from `tick` until the lift is on `floor`."""
+        offset = tick - self.start_tick
+        visits = self.visits.get(floor, ())
+        position = bisect_left(visits, offset)
+        if position < len(visits):
+            return visits[position] - offset
+        return max(self.end_offset - offset, 0) + abs(self.end_level - floor)
+
+
+class EtaDispatcher(DispatchStrategy):
+    """Lift that would reach the call floor soonest given its committed stops."""
+
+    name = "eta"
+    description = "ETA - soonest arrival given each lift's committed stops"
+
+    def __init__(self, building: BuildingController) -> None:
+        super().__init__(building)
+        self.plans: list[RoutePlan | None] = [None] * len(building.lifts)
+        # Batched calls assigned to each lift but not yet in its stops
+        self._pending: list[list[tuple[int, int]]] = [[] for _ in building.lifts]
+
+    def __getstate__(self) -> dict:
+        # Route plans are a cache, rebuilt on the next call
+        state = self.__dict__.copy()
+        state["plans"] = [None] * len(self.plans)
+        return state
+
+    def select(self, from_level: int, to_level: int) -> int:
+        best = min(
+            (self.eta(i, from_level), self.building.lifts[i].get_load() + len(self._pending[i]), i)
+            for i in self.serving(from_level)
+        )
+        return best[2]
+
+    def eta(self, i: int, floor: int) -> int:
+        """Ticks until lift `i` reaches `floor`, from its cached route plan."""
+        lift = self.building.lifts[i]
+        key = (lift.stops_version, len(self._pending[i]))
+        plan = self.plans[i]
+        if plan is None or plan.key != key or plan.level_at(lift.global_tick) != lift.current_level:
+            plan = self.plans[i] = RoutePlan(lift, self._pending[i], key)
+        return plan.eta(floor, lift.global_tick)
+
+    def assigned(self, i: int, from_level: int, to_level: int) -> None:
+        self._pending[i].append((from_level, to_level))
+
+    def committed(self) -> None:
+        for pending in self._pending:
+            pending.clear()
+
+
+# Dispatcher Registry - maps name to class
+DISPATCH_REGISTRY: dict[str, type[DispatchStrategy]] = {
+    "nearest": NearestDispatcher,
+    "eta": EtaDispatcher,
+}
+
+
+def get_available_dispatchers() -> list[dict]:
+    """Returns list of available dispatch strategies with their metadata."""
+    return [
+        {"name": dispatcher.name, "description": dispatcher.description}
+        for dispatcher in DISPATCH_REGISTRY.values()
+    ]
+
+
+def get_dispatcher(name: str, building: BuildingController) -> DispatchStrategy:
+    """Get a dispatcher for `building` by name. Defaults to NearestDispatcher if not found."""
+    return DISPATCH_REGISTRY.get(name, NearestDispatcher)(building)
@@ -0,0 +1,134 @@
+"""
+Tick History - bounded, columnar record of a lift's per-tick state.
+Samples live in fixed-size `array` columns used as a ring buffer,
+so memory stays constant no matter how long a session runs.
+"""
+from array import array
+
+from app.core.config import HISTORY_SIZE
+
+DIRECTION_CODES: dict[str, int] = {"idle": 0, "up": 1, "down": -1}
+DIRECTION_NAMES: dict[int, str] = {code: name for name, code in DIRECTION_CODES.items()}
+
+# Event code bits recorded per tick
+EVENT_PICKUP: int = 1
+EVENT_DROPOFF: int = 2
+
+
+class TickHistory:
+    """Ring buffer of per-tick lift samples. A capacity of 0 disables recording."""
+
+    def __init__(self, capacity: int = HISTORY_SIZE) -> None:
+        self.capacity: int = max(capacity, 0)
+        self.ticks = array("q", [0]) * self.capacity
+        self.levels = array("i", [0]) * self.capacity
+        self.directions = array("b", [0]) * self.capacity
+        self.passenger_counts = array("I", [0]) * self.capacity
+        self.events = array("B", [0]) * self.capacity
+        self.recorded: int = 0
+        # Set while the columns are shared with a fork; the first write copies them
+        self._shared: bool = False
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shared"] = False
+        return state
+
+    def fork(self) -> "TickHistory":
+        """Copy that shares the sample columns until either history records again."""
+        clone = TickHistory.__new__(TickHistory)
+        clone.__dict__.update(self.__dict__)
+        self._shared = clone._shared = True
+        return clone
+
+    def _unshare(self) -> None:
+        self.ticks = array(self.ticks.typecode, self.ticks)
+        self.levels = array(self.levels.typecode, self.levels)
+        self.directions = array(self.directions.typecode, self.directions)
+        self.passenger_counts = array(self.passenger_counts.typecode, self.passenger_counts)
+        self.events = array(self.events.typecode, self.events)
+        self._shared = False
+
+    def __len__(self) -> int:
+        return min(self.recorded, self.capacity)
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (
+                self.ticks, self.levels, self.directions, self.passenger_counts, self.events
+            )
+        )
+
+    def record(
+        self, tick: int, level: int, direction: str, passenger_count: int, events: int = 0
+    ) -> None:
+        """Append one sample, overwriting the oldest once the buffer is full."""
+        if not self.capacity:
+            return
+        if self._shared:
+            self._unshare()
+
+        slot = self.recorded % self.capacity
+        self.ticks[slot] = tick
+        self.levels[slot] = level
+        self.directions[slot] = DIRECTION_CODES.get(direction, 0)
+        self.passenger_counts[slot] = passenger_count
+        self.events[slot] = events
+        self.recorded += 1
+
+    def _slot(self, position: int) -> int:
+        """Map a logical position (0 = oldest retained sample) to a ring slot."""
+        return (self.recorded - len(self) + position) % self.capacity
+
+    def _bisect(self, tick: int) -> int:
+        """First logical position whose tick is >= `tick` (ticks are increasing)."""
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.ticks[self._slot(mid)] < tick:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def query(
+        self, start: int | None = None, end: int | None = None, max_points: int | None = None
+    ) -> dict:
+        """
+        Get samples with start <= tick <= end as columns.
+        If more than `max_points` samples match, every n-th sample is kept and
+        the event codes of the skipped samples are OR-ed into it.
+        """
+        first = self._bisect(start) if start is not None else 0
+        last = self._bisect(end + 1) if end is not None else len(self)
+        count = max(last - first, 0)
+        stride = -(-count // max_points) if max_points and count > max_points else 1
+
+        columns: dict[str, list] = {
+            "tick": [], "level": [], "direction": [], "passengers": [], "events": []
+        }
+        for bucket in range(first, last, stride):
+            slot = self._slot(bucket)
+            events = 0
+            for position in range(bucket, min(bucket + stride, last)):
+                events |= self.events[self._slot(position)]
+
+            columns["tick"].append(self.ticks[slot])
+            columns["level"].append(self.levels[slot])
+            columns["direction"].append(DIRECTION_NAMES[self.directions[slot]])
+            columns["passengers"].append(self.passenger_counts[slot])
+            columns["events"].append(events)
+
+        return {
+            **columns,
+            "stride": stride,
+            "retained": len(self),
+            "dropped": self.recorded - len(self),
+        }
@@ -0,0 +1,287 @@
+"""
+League Controller - K-way comparison of any number of identical buildings.
+Each building runs one (algorithm, dispatch) pairing; every request goes to
+all of them, so their stats are directly comparable and ranked in a
+leaderboard. Long headless runs step the buildings concurrently in a process
+pool; single ticks stay on the caller's thread, where pool overhead would
+outweigh the work.
+"""
+import asyncio
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from app.core.algorithms import ALGORITHM_REGISTRY
+from app.core.building import BuildingController, Zone
+from app.core.commands import CommandLog
+from app.core.config import (
+    DEFAULT_NUM_LIFTS,
+    LEAGUE_PARALLEL_MIN_WORK,
+    LEAGUE_WORKERS,
+    MAX_LEAGUE_BUILDINGS,
+)
+from app.core.dispatch import DEFAULT_DISPATCH, DISPATCH_REGISTRY
+from app.core.lift import PERCENTILE_KEYS
+
+# Shared by every league in the process, started on the first parallel run
+_pool: ProcessPoolExecutor | None = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the server process runs an event loop and threads
+        _pool = ProcessPoolExecutor(
+            max_workers=LEAGUE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def _run_building(building: BuildingController, ticks: int) -> BuildingController:
+    """Pool task: advance a building copy and send it back."""
+    for _ in range(ticks):
+        building.step()
+    return building
+
+
+class LeagueBusyError(RuntimeError):
+    """A league was changed while its buildings were away in the process pool."""
+
+
+class LeagueController:
+    """
+    One building per combination of `algorithms` (default: every registered
+    algorithm) and `dispatchers`, all with the same floors, lifts and zones.
+    Raises ValueError for unknown algorithms or dispatchers, or more than
+    MAX_LEAGUE_BUILDINGS buildings.
+    """
+
+    def __init__(
+        self,
+        algorithms: list[str] | None = None,
+        dispatchers: list[str] | None = None,
+        max_floors: int = 10,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        reassign_every: int = 0,
+    ) -> None:
+        algorithms = list(algorithms or ALGORITHM_REGISTRY)
+        dispatchers = list(dispatchers or [DEFAULT_DISPATCH])
+        unknown = sorted(
+            {name for name in algorithms if name not in ALGORITHM_REGISTRY}
+            | {name for name in dispatchers if name not in DISPATCH_REGISTRY}
+        )
+        if unknown:
+            raise ValueError(f"Unknown algorithms or dispatchers: {', '.join(unknown)}")
+        pairings = list(product(algorithms, dispatchers))
+        if len(pairings) > MAX_LEAGUE_BUILDINGS:
+            raise ValueError(f"A league holds at most {MAX_LEAGUE_BUILDINGS} buildings")
+
+        self.buildings: list[BuildingController] = [
+            BuildingController(
+                algorithm_name=algorithm,
+                max_floors=max_floors,
+                num_lifts=num_lifts,
+                zones=zones,
+                dispatch=dispatch,
+                reassign_every=reassign_every,
+            )
+            for algorithm, dispatch in pairings
+        ]
+        self.max_floors = max_floors
+        self.global_tick: int = 0
+        self._state: dict | None = None
+        self._state_version: int = -1
+        self.command_log: CommandLog | None = None
+        # Set while run_async waits for the pool, whose results replace the buildings
+        self.running: bool = False
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_state"] = None
+        state["_state_version"] = -1
+        state["command_log"] = None
+        state["running"] = False
+        return state
+
+    def fork(self) -> "LeagueController":
+        """Independent copy of every building (see BuildingController.fork)."""
+        clone = LeagueController.__new__(LeagueController)
+        clone.__dict__.update(self.__dict__)
+        clone.buildings = [building.fork() for building in self.buildings]
+        clone._state = None
+        clone._state_version = -1
+        clone.command_log = None
+        clone.running = False
+        return clone
+
+    @property
+    def version(self) -> int:
+        """Bumped on every change to the state get_state reports."""
+        return sum(building.version for building in self.buildings)
+
+    # === Requests ===
+
+    def add_request(self, passenger_id: str, from_level: int, to_level: int) -> None:
+        """Add the same passenger request to every building."""
+        self._check_idle()
+        if self.command_log is not None:
+            self.command_log.add(self.global_tick, passenger_id, from_level, to_level)
+        for building in self.buildings:
+            building.add_request(passenger_id, from_level, to_level)
+
+    def add_requests(self, batch: list[tuple[str, int, int]]) -> None:
+        """Add the same batch of requests to every building."""
+        self._check_idle()
+        if self.command_log is not None:
+            self.command_log.add_batch(self.global_tick, batch)
+        for building in self.buildings:
+            building.add_requests(batch)
+
+    def schedule_requests(self, batch: list[tuple[int, str, int, int]]) -> None:
+        """Queue the same timed requests in every building."""
+        self._check_idle()
+        if self.command_log is not None:
+            self.command_log.schedule(self.global_tick, batch)
+        for building in self.buildings:
+            building.schedule_requests(batch)
+
+    # === Movement ===
+
+    def move(self) -> dict:
+        """Move all lifts in every building."""
+        self.step()
+        return self.get_state()
+
+    def step(self) -> None:
+        """Move all lifts in every building without building a state snapshot."""
+        self._check_idle()
+        self.global_tick += 1
+        for building in self.buildings:
+            building.step()
+
+    def run(self, ticks: int) -> dict:
+        """
+        Advance every building headlessly by `ticks` ticks and return the final
+        state. Runs of at least LEAGUE_PARALLEL_MIN_WORK lift-ticks step the
+        buildings in the process pool; results are the same either way.
+        """
+        self._check_idle()
+        completed_before = [building.get_completed() for building in self.buildings]
+        if self._parallel_worthwhile(ticks):
+            pool = _get_pool()
+            self.buildings = list(
+                pool.map(_run_building, self.buildings, [ticks] * len(self.buildings))
+            )
+            self.global_tick += ticks
+        else:
+            for _ in range(ticks):
+                self.step()
+        return self._run_result(ticks, completed_before)
+
+    async def run_async(self, ticks: int) -> dict:
+        """
+        run() for callers on an event loop, which keeps serving other sessions
+        while the pool works. Until the run finishes, changing this league
+        raises LeagueBusyError.
+        """
+        if not self._parallel_worthwhile(ticks):
+            return self.run(ticks)
+        self._check_idle()
+        completed_before = [building.get_completed() for building in self.buildings]
+        pool = _get_pool()
+        self.running = True
+        try:
+            self.buildings = list(await asyncio.gather(*(
+                asyncio.wrap_future(pool.submit(_run_building, building, ticks))
+                for building in self.buildings
+            )))
+        finally:
+            self.running = False
+        self.global_tick += ticks
+        return self._run_result(ticks, completed_before)
+
+    def _run_result(self, ticks: int, completed_before: list[int]) -> dict:
+        completed = [
+            building.get_completed() - before
+            for building, before in zip(self.buildings, completed_before, strict=True)
+        ]
+        return {**self.get_state(), "run": {"ticks": ticks, "completed": completed}}
+
+    def _check_idle(self) -> None:
+        if self.running:
+            raise LeagueBusyError("League is fast-forwarding; retry when the run finishes")
+
+    def _parallel_worthwhile(self, ticks: int) -> bool:
+        if LEAGUE_WORKERS < 2 or len(self.buildings) < 2:
+            return False
+        lifts = sum(len(building.lifts) for building in self.buildings)
+        return ticks * lifts >= LEAGUE_PARALLEL_MIN_WORK
+
+    # === State ===
+
+    def get_history(
+        self, start: int | None = None, end: int | None = None, max_points: int | None = None
+    ) -> dict:
+        """Get recorded per-tick samples of every lift in every building."""
+        return {
+            "type": "league",
+            "buildings": [
+                building.get_history(start, end, max_points) for building in self.buildings
+            ],
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by every building."""
+        return sum(building.memory_bytes() for building in self.buildings)
+
+    def pending_passengers(self) -> dict[str, int]:
+        """Pending passengers of every building (see BuildingController.pending_passengers)."""
+        totals = {"waiting": 0, "riding": 0, "scheduled": 0}
+        for building in self.buildings:
+            for key, count in building.pending_passengers().items():
+                totals[key] += count
+        return totals
+
+    def digest(self) -> int:
+        """Checksum of every building's state (see BuildingController.digest)."""
+        value = 0
+        for building in self.buildings:
+            value = zlib.crc32(building.digest().to_bytes(4, "big"), value)
+        return value
+
+    def leaderboard(self) -> list[dict]:
+        """
+        Buildings ranked by average total journey time, best first. Buildings
+        that have not delivered anyone yet come last.
+        """
+        entries = []
+        for i, building in enumerate(self.buildings):
+            stats = building.get_stats()
+            entries.append({
+                "building": i,
+                "algorithm": building.algorithm_name,
+                "dispatch": building.dispatch_name,
+                "completed": stats["completed"],
+                "avg_wait": stats["avg_wait"],
+                "avg_ride": stats["avg_ride"],
+                "avg_total": stats["avg_total"],
+                **{key: stats[key] for key in PERCENTILE_KEYS},
+            })
+        entries.sort(key=lambda e: (e["completed"] == 0, e["avg_total"], -e["completed"]))
+        for rank, entry in enumerate(entries, 1):
+            entry["rank"] = rank
+        return entries
+
+    def get_state(self) -> dict:
+        """Get every building's state and the leaderboard, memoized like BuildingController."""
+        if self._state is None or self._state_version != self.version:
+            self._state = {
+                "type": "league",
+                "buildings": [building.get_state() for building in self.buildings],
+                "leaderboard": self.leaderboard(),
+                "global_tick": self.global_tick,
+            }
+            self._state_version = self.version
+        return self._state
@@ -1,26 +1,62 @@
 """
 Lift Controller - manages a single lift's state and movement.
 """
+from collections import Counter
+from collections.abc import Callable
+
 from app.core.algorithms import get_algorithm
-from app.core.config import DEFAULT_ALGORITHM, MAX_FLOORS, MIN_FLOOR
+from app.core.config import (
+    DEFAULT_ALGORITHM,
+    HISTORY_SIZE,
+    MAX_FLOORS,
+    MIN_FLOOR,
+    STAT_PERCENTILES,
+)
+from app.core.history import EVENT_DROPOFF, EVENT_PICKUP, TickHistory
+from app.core.sketch import QuantileSketch
+from app.core.stops import StopIndex
+
+# Approximate CPython sizes for memory estimates, measured with tracemalloc
+LIFT_BYTES: int = 4096  # Controller, algorithm and empty containers
+REQUEST_BYTES: int = 440  # Request dict with its passenger ID
+STOP_ACTION_BYTES: int = 48  # Action tuple plus its list slot
+
+# Stats key suffix -> stats_sums / sketches key
+STAT_TIMES: dict[str, str] = {"wait": "wait_time", "ride": "ride_time", "total": "total_time"}
+# Percentile keys stats carry alongside the averages, e.g. p95_wait
+PERCENTILE_KEYS: list[str] = [f"p{p}_{name}" for name in STAT_TIMES for p in STAT_PERCENTILES]
 
 
 class LiftController:
     """Single lift controller with encapsulated state access."""
 
     def __init__(
-        self, algorithm_name: str = DEFAULT_ALGORITHM, max_floors: int = MAX_FLOORS
+        self,
+        algorithm_name: str = DEFAULT_ALGORITHM,
+        max_floors: int = MAX_FLOORS,
+        history_size: int = HISTORY_SIZE,
     ) -> None:
-        self.current_level: int = MIN_FLOOR
+        # Called after the lift's level or load changes, e.g. to re-file it in a dispatch index
+        self.on_change: Callable[[], None] | None = None
+        self._level: int = MIN_FLOOR
         self.max_floors: int = max_floors
         self.direction: str = "idle"
         self.passengers: list[str] = []
-        self.stops: dict[int, list[tuple]] = {}
-        self.history: list[dict] = []
+        self.stops = StopIndex()
+        # Subset of stops the lift can act on right now: every pickup, plus
+        # dropoffs of passengers already inside. Kept in step with pickups/dropoffs.
+        self.fulfillable = StopIndex()
+        # Bumped whenever stops or fulfillable change, so route plans can be cached
+        self.stops_version: int = 0
+        self._onboard: Counter[str] = Counter()
+        self.history = TickHistory(history_size)
+        self._tick_events: int = 0
         self.algorithm = get_algorithm(algorithm_name)
         self.algorithm_name: str = algorithm_name
 
         self.active_requests: dict[str, dict] = {}
+        # Requests not yet picked up, oldest first
+        self.waiting: dict[str, dict] = {}
         self.recent_completed: list[dict] = []
 
         self.stats_sums: dict[str, float] = {
@@ -32,11 +68,74 @@ class LiftController:
             "picked_up": 0,
             "completed": 0,
         }
+        # Distributions behind the sums, for percentiles
+        self.sketches: dict[str, QuantileSketch] = {
+            key: QuantileSketch() for key in STAT_TIMES.values()
+        }
+        # (picked_up, completed) the memoized get_stats result was built at
+        self._stats: tuple[tuple[int, int], dict] | None = None
 
         self.global_tick: int = 0
 
+    def __getstate__(self) -> dict:
+        # on_change is a closure owned by the building, which re-installs it on load
+        state = self.__dict__.copy()
+        state["on_change"] = None
+        state["_stats"] = None
+        return state
+
+    def fork(self) -> "LiftController":
+        """
+        Independent copy for a branched session. Containers and in-flight
+        requests are copied; action tuples, finished requests, the algorithm
+        and, until either lift records again, the history columns are shared.
+        """
+        clone = LiftController.__new__(LiftController)
+        clone.__dict__.update(self.__dict__)
+        clone.on_change = None
+        clone.passengers = list(self.passengers)
+        clone.stops = self.stops.copy()
+        clone.fulfillable = self.fulfillable.copy()
+        clone._onboard = self._onboard.copy()
+        clone.history = self.history.fork()
+
+        # Requests change as they progress; copy each once so waiting still aliases active
+        copies: dict[int, dict] = {}
+
+        def own(request: dict) -> dict:
+            copied = copies.get(id(request))
+            if copied is None:
+                copied = copies[id(request)] = dict(request)
+            return copied
+
+        clone.active_requests = {pid: own(request) for pid, request in self.active_requests.items()}
+        clone.waiting = {pid: own(request) for pid, request in self.waiting.items()}
+        clone.recent_completed = list(self.recent_completed)
+        clone.stats_sums = dict(self.stats_sums)
+        clone.stats_counts = dict(self.stats_counts)
+        clone.sketches = {key: sketch.copy() for key, sketch in self.sketches.items()}
+        return clone
+
+    def set_algorithm(self, algorithm_name: str) -> None:
+        """Switch to another algorithm from ALGORITHM_REGISTRY (scan if unknown)."""
+        self.algorithm = get_algorithm(algorithm_name)
+        self.algorithm_name = algorithm_name
+        self.stops_version += 1
+        if self.on_change is not None:
+            self.on_change()
+
     # === Law of Demeter: Encapsulated accessors ===
 
+    @property
+    def current_level(self) -> int:
+        return self._level
+
+    @current_level.setter
+    def current_level(self, level: int) -> None:
+        self._level = level
+        if self.on_change is not None:
+            self.on_change()
+
     def get_load(self) -> int:
         """Get total load: passengers inside + pending requests."""
         return len(self.passengers) + len(self.active_requests)
@@ -49,37 +148,122 @@ class LiftController:
         """Get number of passengers currently inside the lift."""
         return len(self.passengers)
 
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the lift's history, requests and stops."""
+        actions = sum(map(len, self.stops.values())) + sum(map(len, self.fulfillable.values()))
+        requests = len(self.active_requests) + len(self.recent_completed)
+        return (
+            LIFT_BYTES
+            + self.history.nbytes
+            + requests * REQUEST_BYTES
+            + (actions + len(self.passengers)) * STOP_ACTION_BYTES
+            + sum(sketch.nbytes for sketch in self.sketches.values())
+        )
+
     # === Request handling ===
 
-    def add_request(self, passenger_id: str, from_level: int, to_level: int) -> None:
-        """Add a passenger request."""
+    def add_request(
+        self, passenger_id: str, from_level: int, to_level: int, created_at: int | None = None
+    ) -> None:
+        """Add a passenger request, waiting since `created_at` (default: now)."""
         self.stops.setdefault(from_level, []).append(("pickup", passenger_id, to_level))
         self.stops.setdefault(to_level, []).append(("dropoff", passenger_id))
-        self.stops = dict(sorted(self.stops.items()))
-
-        self.active_requests[passenger_id] = {
+        self.fulfillable.setdefault(from_level, []).append(("pickup", passenger_id, to_level))
+        self._register_request(passenger_id, from_level, to_level, created_at)
+
+    def add_requests(self, batch: list[tuple[str, int, int]]) -> None:
+        """Add many (passenger_id, from_level, to_level) requests with one index update."""
+        stops: dict[int, list[tuple]] = {}
+        pickups: dict[int, list[tuple]] = {}
+        for passenger_id, from_level, to_level in batch:
+            pickup = ("pickup", passenger_id, to_level)
+            stops.setdefault(from_level, []).append(pickup)
+            stops.setdefault(to_level, []).append(("dropoff", passenger_id))
+            pickups.setdefault(from_level, []).append(pickup)
+            self._register_request(passenger_id, from_level, to_level)
+
+        self.stops.extend(stops)
+        self.fulfillable.extend(pickups)
+
+    def _register_request(
+        self, passenger_id: str, from_level: int, to_level: int, created_at: int | None = None
+    ) -> None:
+        """Track a new request as WAITING, from the current tick unless `created_at` is given."""
+        request = {
             "passenger_id": passenger_id,
             "from_level": from_level,
             "to_level": to_level,
             "status": "WAITING",
-            "created_at": self.global_tick,
+            "created_at": self.global_tick if created_at is None else created_at,
             "picked_up_at": None,
             "completed_at": None,
         }
+        self.active_requests[passenger_id] = request
+        self.waiting[passenger_id] = request
+        self.stops_version += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def remove_request(self, passenger_id: str) -> dict | None:
+        """
+        Withdraw a request that has not been picked up yet, so another lift can
+        take it. Returns the request, or None if it is unknown or already aboard.
+        """
+        request = self.waiting.pop(passenger_id, None)
+        if request is None:
+            return None
+        del self.active_requests[passenger_id]
+
+        from_level, to_level = request["from_level"], request["to_level"]
+        pickup = ("pickup", passenger_id, to_level)
+        _remove_action(self.stops, from_level, pickup)
+        _remove_action(self.fulfillable, from_level, pickup)
+        _remove_action(self.stops, to_level, ("dropoff", passenger_id))
+
+        self.stops_version += 1
+        if self.on_change is not None:
+            self.on_change()
+        return request
 
     # === Movement ===
 
     def move(self) -> dict:
         """Advance simulation by one tick."""
+        events = self.step()
+
+        state = self.get_state()
+        state["events"] = events
+        return state
+
+    def step(self) -> list[str]:
+        """Advance simulation by one tick without building a state snapshot."""
         self.global_tick += 1
+        self._tick_events = 0
 
         events = self._process_stops()
         self._update_direction()
         self._move_lift()
 
+        self.history.record(
+            self.global_tick,
+            self.current_level,
+            self.direction,
+            len(self.passengers),
+            self._tick_events,
+        )
+        return events
+
+    def run(self, ticks: int) -> dict:
+        """Advance simulation headlessly by `ticks` ticks and return the final state."""
+        completed_before = self.stats_counts["completed"]
+        for _ in range(ticks):
+            self.step()
+
         state = self.get_state()
-        state["events"] = events
-        self.history.append(state)
+        state["run"] = {
+            "ticks": ticks,
+            "completed": self.stats_counts["completed"] - completed_before,
+        }
         return state
 
     def _process_stops(self) -> list[str]:
@@ -108,29 +292,43 @@ class LiftController:
             self.stops[self.current_level] = remaining_actions
         else:
             del self.stops[self.current_level]
+        # Everything actionable on this floor has just been handled
+        self.fulfillable.pop(self.current_level, None)
 
         return events
 
     def _handle_pickup(self, passenger_id: str, to_level: int) -> list[str]:
         """Handle passenger pickup."""
         self.passengers.append(passenger_id)
-
+        self._onboard[passenger_id] += 1
+        self.fulfillable.setdefault(to_level, []).append(("dropoff", passenger_id))
+        self._tick_events |= EVENT_PICKUP
+        self.stops_version += 1
+        if self.on_change is not None:
+            self.on_change()
+
+        self.waiting.pop(passenger_id, None)
         if passenger_id in self.active_requests:
             self.active_requests[passenger_id]["status"] = "MOVING"
             self.active_requests[passenger_id]["picked_up_at"] = self.global_tick
 
             wait_time = self.global_tick - self.active_requests[passenger_id]["created_at"]
             self.stats_sums["wait_time"] += wait_time
+            self.sketches["wait_time"].add(wait_time)
             self.stats_counts["picked_up"] += 1
 
         return [f"Picked up {passenger_id}"]
 
     def _handle_dropoff(self, passenger_id: str) -> list[str] | None:
         """Handle passenger dropoff. Returns None if passenger not in lift."""
-        if passenger_id not in self.passengers:
+        if not self._onboard[passenger_id]:
             return None
 
+        self._onboard[passenger_id] -= 1
+        if not self._onboard[passenger_id]:
+            del self._onboard[passenger_id]
         self.passengers.remove(passenger_id)
+        self._tick_events |= EVENT_DROPOFF
 
         if passenger_id in self.active_requests:
             p_data = self.active_requests[passenger_id]
@@ -142,6 +340,8 @@ class LiftController:
 
             self.stats_sums["ride_time"] += ride_time
             self.stats_sums["total_time"] += total_time
+            self.sketches["ride_time"].add(ride_time)
+            self.sketches["total_time"].add(total_time)
             self.stats_counts["completed"] += 1
 
             self.recent_completed.append(p_data)
@@ -150,24 +350,15 @@ class LiftController:
 
             del self.active_requests[passenger_id]
 
+        self.stops_version += 1
+        if self.on_change is not None:
+            self.on_change()
         return [f"Dropped off {passenger_id}"]
 
     def _update_direction(self) -> None:
-        """Update direction using the algorithm."""
-        # Filter stops to only include fulfillable actions:
-        # 1. Any pickup
-        # 2. Dropoff for someone already in the lift
-        fulfillable_stops = {}
-        for level, actions in self.stops.items():
-            valid_actions = [
-                a for a in actions
-                if a[0] == "pickup" or (a[0] == "dropoff" and a[1] in self.passengers)
-            ]
-            if valid_actions:
-                fulfillable_stops[level] = valid_actions
-
-        self.direction = self.algorithm.pick_next_direction(
-            self.current_level, self.direction, fulfillable_stops
+        """Update direction using the algorithm on the fulfillable stops."""
+        self.direction = self.algorithm.pick_direction(
+            self.current_level, self.direction, self.fulfillable
         )
 
     def _move_lift(self) -> None:
@@ -179,36 +370,61 @@ class LiftController:
 
     # === State ===
 
+    def get_history(
+        self, start: int | None = None, end: int | None = None, max_points: int | None = None
+    ) -> dict:
+        """Get recorded per-tick samples, optionally by tick range and downsampled."""
+        return self.history.query(start=start, end=end, max_points=max_points)
+
+    def get_stats(self) -> dict:
+        """
+        Averages and percentiles of wait, ride and total time, rebuilt only
+        after a pickup or dropoff. Callers must not mutate the result.
+        """
+        key = (self.stats_counts["picked_up"], self.stats_counts["completed"])
+        if self._stats is None or self._stats[0] != key:
+            self._stats = (key, summarize_stats(self.stats_sums, self.stats_counts, self.sketches))
+        return self._stats[1]
+
     def get_state(self) -> dict:
         """Get current lift state."""
-        avg_wait = (
-            self.stats_sums["wait_time"] / self.stats_counts["picked_up"]
-            if self.stats_counts["picked_up"] > 0
-            else 0
-        )
-        avg_ride = (
-            self.stats_sums["ride_time"] / self.stats_counts["completed"]
-            if self.stats_counts["completed"] > 0
-            else 0
-        )
-        avg_total = (
-            self.stats_sums["total_time"] / self.stats_counts["completed"]
-            if self.stats_counts["completed"] > 0
-            else 0
-        )
-
         all_visible = list(self.active_requests.values()) + self.recent_completed
 
         return {
             "level": self.current_level,
             "direction": self.direction,
             "passengers": self.passengers.copy(),
-            "pending_stops": self.stops,
+            "pending_stops": self.stops.to_dict(),
             "active_passengers": all_visible,
             "global_tick": self.global_tick,
-            "stats": {
-                "avg_wait": avg_wait,
-                "avg_ride": avg_ride,
-                "avg_total": avg_total,
-            },
+            "stats": dict(self.get_stats()),
         }
+
+
+def summarize_stats(
+    sums: dict[str, float], counts: dict[str, int], sketches: dict[str, QuantileSketch]
+) -> dict:
+    """
+    Stats payload from running sums, counts and sketches: waits average over
+    pickups, ride and total times over completed journeys.
+    """
+    picked_up, completed = counts["picked_up"], counts["completed"]
+    stats: dict = {
+        "avg_wait": sums["wait_time"] / picked_up if picked_up else 0,
+        "avg_ride": sums["ride_time"] / completed if completed else 0,
+        "avg_total": sums["total_time"] / completed if completed else 0,
+        "completed": completed,
+    }
+    for name, key in STAT_TIMES.items():
+        values = sketches[key].quantiles([p / 100 for p in STAT_PERCENTILES])
+        for percentile, value in zip(STAT_PERCENTILES, values, strict=True):
+            stats[f"p{percentile}_{name}"] = value
+    return stats
+
+
+def _remove_action(stops: StopIndex, floor: int, action: tuple) -> None:
+    """Remove one occurrence of `action` from `floor`, dropping the floor once empty."""
+    actions = stops[floor]
+    actions.remove(action)
+    if not actions:
+        del stops[floor]
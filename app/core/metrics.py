@@ -0,0 +1,174 @@
+"""
+Metrics - in-process latency histograms and scrape-time gauges rendered in
+the Prometheus text format, without a client library or external service.
+Histograms are updated on hot paths, so observing is one bisect and a few
+additions; gauges are computed from live objects only when scraped.
+"""
+import math
+from bisect import bisect_left
+from collections.abc import Callable, Mapping
+
+from app.core.config import LATENCY_BUCKETS_S
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A gauge or counter callback returns one value, or values keyed by label value
+Sample = float | Mapping[str, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Latency distribution in seconds, optionally split by one label. Buckets
+    are stored per bucket and summed into Prometheus' cumulative form when
+    rendered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label: str | None = None,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS_S,
+    ) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.label: str | None = label
+        self.buckets: tuple[float, ...] = buckets
+        # label value -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: dict[str, list] = {}
+
+    def observe(self, seconds: float, label_value: str = "", count: int = 1) -> None:
+        """
+        Record `count` observations of `seconds`. Batched work records its
+        average per item with the item count.
+        """
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, seconds)] += count
+        series[1] += seconds * count
+        series[2] += count
+
+    def count(self, label_value: str = "") -> int:
+        series = self._series.get(label_value)
+        return series[2] if series is not None else 0
+
+    def reset(self) -> None:
+        self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total, count) in sorted(self._series.items()):
+            labels = f'{self.label}="{_escape(label_value)}",' if self.label else ""
+            cumulative = 0
+            for bound, bucket in zip((*self.buckets, math.inf), counts, strict=True):
+                cumulative += bucket
+                lines.append(
+                    f'{self.name}_bucket{{{labels}le="{_number(bound)}"}} {cumulative}'
+                )
+            suffix = f"{{{labels[:-1]}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_number(total)}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    A value read when scraped. `kind` is "gauge", or "counter" for totals
+    that only grow (their names end in _total).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Sample],
+        label: str | None = None,
+        kind: str = "gauge",
+    ) -> None:
+        self.name: str = name
+        self.help: str = help
+        self.collect: Callable[[], Sample] = collect
+        self.label: str | None = label
+        self.kind: str = kind
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.collect()
+        if isinstance(value, Mapping):
+            for label_value, sample in sorted(value.items()):
+                lines.append(
+                    f'{self.name}{{{self.label}="{_escape(label_value)}"}} {_number(sample)}'
+                )
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+
+class Registry:
+    """Metrics in exposition order; names must be unique."""
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Histogram | Gauge] = {}
+
+    def register(self, metric: Histogram | Gauge) -> None:
+        """Add a metric, replacing any earlier one of the same name."""
+        self.metrics[metric.name] = metric
+
+    def histogram(self, name: str, help: str, label: str | None = None) -> Histogram:
+        histogram = Histogram(name, help, label)
+        self.register(histogram)
+        return histogram
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Sample],
+        label: str | None = None,
+        kind: str = "gauge",
+    ) -> Gauge:
+        gauge = Gauge(name, help, collect, label, kind)
+        self.register(gauge)
+        return gauge
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+# Global registry instance
+registry = Registry()
+
+# === Timers ===
+
+MOVE_SECONDS = registry.histogram(
+    "lift_move_seconds",
+    "Time to advance a session: one tick via the API or autoplay, or a whole fast-forward",
+    "source",
+)
+DISPATCH_SECONDS = registry.histogram(
+    "lift_dispatch_seconds",
+    "Time to choose a lift for one hall call; batches record their average per call",
+    "dispatch",
+)
+STATE_SECONDS = registry.histogram(
+    "lift_state_build_seconds", "Time to rebuild a session's API state after a change", "type"
+)
+ENCODE_SECONDS = registry.histogram(
+    "lift_encode_seconds", "Time to serialize a state or WebSocket frame", "format"
+)
+PUBLISH_SECONDS = registry.histogram(
+    "lift_publish_seconds", "Time to diff a session's state and queue the delta for its viewers"
+)
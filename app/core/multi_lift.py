@@ -1,15 +1,21 @@
 """
 Multi-Building Controller for comparing different algorithms.
-Each building has 2 lifts working together.
+Each building has a bank of lifts working together.
 Same passengers go to both buildings for fair comparison.
 """
-from app.core.building import BuildingController
+import zlib
+
+from app.core.building import BuildingController, Zone
+from app.core.commands import CommandLog
+from app.core.config import DEFAULT_NUM_LIFTS
+from app.core.dispatch import DEFAULT_DISPATCH
 
 
 class MultiBuildingController:
     """
     Comparison testbed with 2 buildings.
-    Each building has 2 lifts using the same algorithm.
+    Each building has the same lifts and zones, all using the building's
+    algorithm and dispatch strategy.
     Same passenger requests sent to both buildings for fair comparison.
     """
 
@@ -18,32 +24,134 @@ class MultiBuildingController:
         algorithm1: str = "scan",
         algorithm2: str = "scan",
         max_floors: int = 10,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        dispatch1: str = DEFAULT_DISPATCH,
+        dispatch2: str = DEFAULT_DISPATCH,
+        reassign_every: int = 0,
     ) -> None:
-        self.building1 = BuildingController(algorithm_name=algorithm1, max_floors=max_floors)
-        self.building2 = BuildingController(algorithm_name=algorithm2, max_floors=max_floors)
+        self.building1 = BuildingController(
+            algorithm_name=algorithm1,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch=dispatch1,
+            reassign_every=reassign_every,
+        )
+        self.building2 = BuildingController(
+            algorithm_name=algorithm2,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch=dispatch2,
+            reassign_every=reassign_every,
+        )
         self.max_floors = max_floors
         self.global_tick: int = 0
+        self._state: dict | None = None
+        self._state_version: int = -1
+        self.command_log: CommandLog | None = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_state"] = None
+        state["_state_version"] = -1
+        state["command_log"] = None
+        return state
+
+    def fork(
+        self,
+        algorithm1: str | None = None,
+        algorithm2: str | None = None,
+        dispatch1: str | None = None,
+        dispatch2: str | None = None,
+    ) -> "MultiBuildingController":
+        """Independent copy of both buildings, optionally with other algorithms or dispatch."""
+        clone = MultiBuildingController.__new__(MultiBuildingController)
+        clone.__dict__.update(self.__dict__)
+        clone.building1 = self.building1.fork(algorithm1, dispatch1)
+        clone.building2 = self.building2.fork(algorithm2, dispatch2)
+        clone._state = None
+        clone._state_version = -1
+        clone.command_log = None
+        return clone
+
+    @property
+    def version(self) -> int:
+        """Bumped on every change to the state get_state reports."""
+        return self.building1.version + self.building2.version
 
     def add_request(self, passenger_id: str, from_level: int, to_level: int) -> None:
         """Add the same passenger request to both buildings."""
+        if self.command_log is not None:
+            self.command_log.add(self.global_tick, passenger_id, from_level, to_level)
         self.building1.add_request(passenger_id, from_level, to_level)
         self.building2.add_request(passenger_id, from_level, to_level)
 
+    def add_requests(self, batch: list[tuple[str, int, int]]) -> None:
+        """Add the same batch of requests to both buildings."""
+        if self.command_log is not None:
+            self.command_log.add_batch(self.global_tick, batch)
+        self.building1.add_requests(batch)
+        self.building2.add_requests(batch)
+
+    def schedule_requests(self, batch: list[tuple[int, str, int, int]]) -> None:
+        """Queue the same timed requests in both buildings."""
+        if self.command_log is not None:
+            self.command_log.schedule(self.global_tick, batch)
+        self.building1.schedule_requests(batch)
+        self.building2.schedule_requests(batch)
+
     def move(self) -> dict:
         """Move all lifts in both buildings."""
-        self.global_tick += 1
-        self.building1.move()
-        self.building2.move()
+        self.step()
         return self.get_state()
 
-    def get_state(self) -> dict:
-        """Get combined state of both buildings."""
-        state1 = self.building1.get_state()
-        state2 = self.building2.get_state()
+    def step(self) -> None:
+        """Move all lifts in both buildings without building a state snapshot."""
+        self.global_tick += 1
+        self.building1.step()
+        self.building2.step()
+
+    def run(self, ticks: int) -> dict:
+        """Advance both buildings headlessly by `ticks` ticks and return the final state."""
+        for _ in range(ticks):
+            self.step()
 
+        return {**self.get_state(), "run": {"ticks": ticks}}
+
+    def get_history(
+        self, start: int | None = None, end: int | None = None, max_points: int | None = None
+    ) -> dict:
+        """Get recorded per-tick samples of every lift in both buildings."""
         return {
             "type": "comparison",
-            "building1": state1,
-            "building2": state2,
-            "global_tick": self.global_tick,
+            "building1": self.building1.get_history(start, end, max_points),
+            "building2": self.building2.get_history(start, end, max_points),
         }
+
+    def digest(self) -> int:
+        """Checksum of both buildings' states (see BuildingController.digest)."""
+        return zlib.crc32(self.building2.digest().to_bytes(4, "big"), self.building1.digest())
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by both buildings."""
+        return self.building1.memory_bytes() + self.building2.memory_bytes()
+
+    def pending_passengers(self) -> dict[str, int]:
+        """Pending passengers of both buildings (see BuildingController.pending_passengers)."""
+        first = self.building1.pending_passengers()
+        second = self.building2.pending_passengers()
+        return {key: first[key] + second[key] for key in first}
+
+    def get_state(self) -> dict:
+        """Get combined state of both buildings, memoized like BuildingController.get_state."""
+        if self._state is None or self._state_version != self.version:
+            self._state = {
+                "type": "comparison",
+                "building1": self.building1.get_state(),
+                "building2": self.building2.get_state(),
+                "global_tick": self.global_tick,
+            }
+            self._state_version = self.version
+        return self._state
@@ -0,0 +1,181 @@
+"""
+Reassignment - periodically moves hall calls that have not been picked up yet
+to the lift now best placed to answer them. Each solve scores a bounded batch
+of waiting calls against every lift in one NumPy cost matrix and finds the
+minimum-cost assignment of the whole batch, where each further call given to
+the same lift costs `load_weight` more than the last.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from app.core.config import REASSIGN_LOAD_WEIGHT, REASSIGN_MARGIN, REASSIGN_MAX_CALLS
+
+if TYPE_CHECKING:
+    from app.core.building import BuildingController
+
+# Cost of giving a call to a lift outside its zone; finite so the solve stays exact
+_FORBIDDEN: float = 1e9
+
+
+def min_cost_assignment(cost: np.ndarray) -> np.ndarray:
+    """
+    Column for each row of a rows x columns cost matrix (rows <= columns),
+    no column used twice, with the smallest total cost. Hungarian method with
+    shortest augmenting paths, O(rows^2 * columns), vectorised over columns.
+    """
+    rows, cols = cost.shape
+    # Row and column potentials; index 0 is the virtual start column
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    owner = np.zeros(cols + 1, dtype=np.intp)  # 1-based row holding each column, 0 = free
+    way = np.zeros(cols + 1, dtype=np.intp)
+    for row in range(1, rows + 1):
+        owner[0] = row
+        col = 0
+        minv = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+        while owner[col]:
+            used[col] = True
+            held = owner[col]
+            reduced = cost[held - 1] - u[held] - v[1:]
+            free = ~used[1:]
+            improved = free & (reduced < minv[1:])
+            minv[1:][improved] = reduced[improved]
+            way[1:][improved] = col
+            candidates = np.where(free, minv[1:], np.inf)
+            nxt = int(np.argmin(candidates)) + 1
+            delta = candidates[nxt - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            col = nxt
+        # Flip the augmenting path back to the start column
+        while col:
+            prev = way[col]
+            owner[col] = owner[prev]
+            col = prev
+
+    assigned = np.empty(rows, dtype=np.intp)
+    taken = np.flatnonzero(owner[1:])
+    assigned[owner[1:][taken] - 1] = taken
+    return assigned
+
+
+class Reassigner:
+    """
+    Re-solves the assignment of up to `max_calls` of a building's oldest
+    waiting calls as one minimum-cost assignment. A call only moves if its new lift is expected to reach it
+    at least `margin` ticks sooner, so calls do not bounce between lifts.
+    """
+
+    def __init__(
+        self,
+        building: BuildingController,
+        max_calls: int = REASSIGN_MAX_CALLS,
+        margin: int = REASSIGN_MARGIN,
+        load_weight: float = REASSIGN_LOAD_WEIGHT,
+    ) -> None:
+        self.building = building
+        self.max_calls: int = max_calls
+        self.margin: int = margin
+        self.load_weight: float = load_weight
+        self.solves: int = 0
+        self.moved: int = 0
+
+    def fork(self, building: BuildingController) -> Reassigner:
+        """Reassigner with the same settings and totals for a forked copy of the building."""
+        clone = Reassigner(building, self.max_calls, self.margin, self.load_weight)
+        clone.solves = self.solves
+        clone.moved = self.moved
+        return clone
+
+    def solve(self) -> int:
+        """Reassign the batch of oldest waiting calls. Returns how many moved."""
+        calls = self._oldest_waiting()
+        self.solves += 1
+        if not calls:
+            return 0
+
+        lifts = self.building.lifts
+        current = np.array([i for i, _ in calls], dtype=np.intp)
+        floors = np.array([request["from_level"] for _, request in calls], dtype=np.int32)
+        eta = self._eta_matrix(floors)
+
+        # Loads without the calls being re-solved; each assignment adds its own back
+        load = np.array([lift.get_load() for lift in lifts], dtype=np.float64)
+        load -= np.bincount(current, minlength=len(lifts))
+        cost = eta + self.load_weight * load
+        cost[~self._serves(floors)] = _FORBIDDEN
+
+        # One column per (lift, slot): a lift's k-th call of the batch costs k loads more
+        slots = self.load_weight * np.arange(len(calls), dtype=np.float64)
+        columns = min_cost_assignment((cost[:, :, None] + slots).reshape(len(calls), -1))
+        chosen = columns // len(calls)
+
+        rows = np.arange(len(calls))
+        stay = eta[rows, current]
+        move = eta[rows, chosen]
+        better = (chosen != current) & (move + self.margin <= stay)
+
+        for w in np.flatnonzero(better):
+            passenger_id = calls[w][1]["passenger_id"]
+            self.building.transfer_request(passenger_id, int(current[w]), int(chosen[w]))
+        moved = int(better.sum())
+        self.moved += moved
+        return moved
+
+    def _oldest_waiting(self) -> list[tuple[int, dict]]:
+        """
+        Up to max_calls (lift index, request) pairs, longest waiting first.
+        Transferred calls keep their wait start but join the end of their new
+        lift's queue, so every waiting call is ranked by `created_at`.
+        """
+        candidates = (
+            (request["created_at"], i, request)
+            for i, lift in enumerate(self.building.lifts)
+            for request in lift.waiting.values()
+        )
+        oldest = heapq.nsmallest(self.max_calls, candidates, key=lambda item: item[:2])
+        return [(i, request) for _, i, request in oldest]
+
+    def _eta_matrix(self, floors: np.ndarray) -> np.ndarray:
+        """
+        Ticks for each lift (columns) to reach each call floor (rows). A lift
+        reaches floors ahead of it directly; floors behind it only after
+        running out to its furthest stop in its direction of travel.
+        """
+        lifts = self.building.lifts
+        levels = np.array([lift.current_level for lift in lifts], dtype=np.int32)
+        up = np.array([lift.direction == "up" for lift in lifts])
+        down = np.array([lift.direction == "down" for lift in lifts])
+        # Furthest stops either side of each lift, or the lift itself when there are none
+        highest = np.maximum(
+            levels, [lift.fulfillable.max() if lift.fulfillable else 0 for lift in lifts]
+        )
+        lowest = np.minimum(
+            levels,
+            [lift.fulfillable.min() if lift.fulfillable else lift.current_level for lift in lifts],
+        )
+
+        call = floors[:, None]
+        direct = np.abs(call - levels)
+        via_top = (highest - levels) + (highest - call)
+        via_bottom = (levels - lowest) + (call - lowest)
+        eta = np.where(up & (call < levels), via_top, direct)
+        return np.where(down & (call > levels), via_bottom, eta).astype(np.float64)
+
+    def _serves(self, floors: np.ndarray) -> np.ndarray:
+        """Calls x lifts mask of which lifts answer hall calls on each floor."""
+        zones = self.building.zones
+        if zones is None:
+            return np.ones((len(floors), len(self.building.lifts)), dtype=bool)
+        low, high = np.array(zones, dtype=np.int32).T
+        call = floors[:, None]
+        serves = (low <= call) & (call <= high)
+        # Out-of-range floors fall back to any lift, as in dispatch
+        serves[~serves.any(axis=1)] = True
+        return serves
@@ -0,0 +1,39 @@
+"""
+Hash Ring - consistent hashing of session IDs onto shards.
+Each shard owns many points on a ring of 64-bit hashes; a key belongs to the
+shard owning the first point at or after the key's hash. Adding a shard only
+moves the keys that now land on its points. Hashes come from blake2b, so
+every process agrees on the owner without coordinating.
+"""
+from bisect import bisect_left
+from hashlib import blake2b
+
+# Points per shard; more points spread keys more evenly
+RING_REPLICAS: int = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring over shards numbered 0..num_shards-1."""
+
+    def __init__(self, num_shards: int, replicas: int = RING_REPLICAS) -> None:
+        if num_shards < 1:
+            raise ValueError("A hash ring needs at least one shard")
+        self.num_shards: int = num_shards
+        points = sorted(
+            (_hash(f"shard-{shard}#{replica}"), shard)
+            for shard in range(num_shards)
+            for replica in range(replicas)
+        )
+        self._hashes: list[int] = [point for point, _ in points]
+        self._shards: list[int] = [shard for _, shard in points]
+
+    def owner(self, key: str) -> int:
+        """Shard that owns `key`."""
+        if self.num_shards == 1:
+            return 0
+        position = bisect_left(self._hashes, _hash(key))
+        return self._shards[position % len(self._shards)]
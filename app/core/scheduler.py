@@ -0,0 +1,139 @@
+"""
+Tick Scheduler - drives autoplay sessions from a single asyncio task.
+Jobs sit in a hashed timing wheel; every wake-up advances the wheel and hands
+all jobs that fell due to one handler call, so cost per wake-up tracks the
+number of due sessions rather than the number of scheduled ones.
+"""
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+
+from app.core.config import (
+    DEFAULT_TICK_INTERVAL_MS,
+    SCHEDULER_RESOLUTION_MS,
+    SCHEDULER_WHEEL_SLOTS,
+)
+
+# Receives the keys due this pass; returns keys that should be unscheduled
+TickHandler = Callable[[list[str]], Awaitable[Iterable[str]]]
+
+
+class TickScheduler:
+    """Hashed timing wheel of periodic jobs keyed by session id."""
+
+    def __init__(
+        self,
+        resolution_ms: int = SCHEDULER_RESOLUTION_MS,
+        slots: int = SCHEDULER_WHEEL_SLOTS,
+    ) -> None:
+        self.resolution_ms: int = resolution_ms
+        self.slots: int = slots
+        # slot -> {key: remaining full wheel turns before the job is due}
+        self.wheel: list[dict[str, int]] = [{} for _ in range(slots)]
+        self.cursor: int = 0
+        # key -> (interval in slots, slot the job currently sits in)
+        self.jobs: dict[str, tuple[int, int]] = {}
+
+        self.passes: int = 0
+        self.ticks_run: int = 0
+        self.skipped_ticks: int = 0
+        self.overruns: int = 0
+        self.lag_ms: float = 0.0
+        self.max_lag_ms: float = 0.0
+
+    # === Job management ===
+
+    def schedule(self, key: str, interval_ms: int = DEFAULT_TICK_INTERVAL_MS) -> int:
+        """Run `key` every `interval_ms` (rounded to the wheel resolution). Returns the interval used."""
+        self.unschedule(key)
+        interval = max(1, round(interval_ms / self.resolution_ms))
+        self.jobs[key] = (interval, -1)
+        self._insert(key, interval)
+        return interval * self.resolution_ms
+
+    def unschedule(self, key: str) -> None:
+        """Stop running `key`."""
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            self.wheel[job[1]].pop(key, None)
+
+    def get_interval_ms(self, key: str) -> int | None:
+        """Interval of a scheduled job, or None if it is not scheduled."""
+        job = self.jobs.get(key)
+        return job[0] * self.resolution_ms if job else None
+
+    def _insert(self, key: str, delay: int) -> None:
+        slot = (self.cursor + delay) % self.slots
+        self.wheel[slot][key] = (delay - 1) // self.slots
+        self.jobs[key] = (self.jobs[key][0], slot)
+
+    def advance(self) -> list[str]:
+        """Move the wheel one slot and return the keys that fell due."""
+        self.cursor = (self.cursor + 1) % self.slots
+        bucket = self.wheel[self.cursor]
+        due: list[str] = []
+        for key, turns in list(bucket.items()):
+            if turns:
+                bucket[key] = turns - 1
+            else:
+                del bucket[key]
+                due.append(key)
+                self._insert(key, self.jobs[key][0])
+        return due
+
+    # === Driving loop ===
+
+    async def run(self, handler: TickHandler) -> None:
+        """
+        Advance the wheel every `resolution_ms` forever, calling `handler` once
+        per pass with every due key. When a pass overruns, the missed slots are
+        swept in the next pass and each job runs at most once per pass. Every
+        pass yields to the event loop, even when running behind.
+        """
+        resolution = self.resolution_ms / 1000
+        next_slot_at = time.monotonic() + resolution
+
+        while True:
+            # Sleep even when late, so other tasks still run while autoplay is overloaded
+            await asyncio.sleep(max(next_slot_at - time.monotonic(), 0))
+
+            now = time.monotonic()
+            # How long the earliest due slot has waited, before the sweep catches up
+            self._record_lag(now - next_slot_at)
+            due: dict[str, None] = {}
+            while next_slot_at <= now:
+                for key in self.advance():
+                    if key in due:
+                        self.skipped_ticks += 1
+                    due[key] = None
+                next_slot_at += resolution
+
+            if due:
+                for key in await handler(list(due)):
+                    self.unschedule(key)
+                self.ticks_run += len(due)
+            self.passes += 1
+
+    def _record_lag(self, lag_seconds: float) -> None:
+        """A pass more than one slot late has missed at least one slot: an overrun."""
+        self.lag_ms = max(lag_seconds * 1000, 0.0)
+        self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+        if self.lag_ms > self.resolution_ms:
+            self.overruns += 1
+
+    def get_stats(self) -> dict:
+        """Scheduler load and how far it is running behind."""
+        return {
+            "jobs": len(self.jobs),
+            "resolution_ms": self.resolution_ms,
+            "passes": self.passes,
+            "ticks_run": self.ticks_run,
+            "skipped_ticks": self.skipped_ticks,
+            "overruns": self.overruns,
+            "lag_ms": round(self.lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+        }
+
+
+# Global scheduler instance
+tick_scheduler = TickScheduler()
@@ -1,68 +1,400 @@
 """
 Session management for lift simulation.
+Sessions are kept in least-recently-used order. With one shared timeout that
+is also expiry order, so expiry and eviction only ever touch the oldest end.
+Sessions nobody has accessed for a while are spilled to a SpillStore and
+loaded back the next time they are asked for. With a log directory, each
+session's incoming requests are also recorded there for offline replay.
 """
+import heapq
+import os
+import time
 import uuid
-from datetime import datetime, timedelta
+from collections import OrderedDict
 
-from app.core.building import BuildingController
+from app.core import snapshot
+from app.core.building import BuildingController, Zone
+from app.core.commands import CommandLog
+from app.core.config import (
+    DEFAULT_NUM_LIFTS,
+    MAX_SESSIONS,
+    SESSION_LOG_DIR,
+    SESSION_SPILL_AFTER_S,
+    SESSION_TIMEOUT_MINUTES,
+    SHARD_COUNT,
+    SHARD_INDEX,
+    SNAPSHOT_SECRET,
+)
+from app.core.dispatch import DEFAULT_DISPATCH
+from app.core.league import LeagueController
 from app.core.multi_lift import MultiBuildingController
+from app.core.ring import HashRing
+from app.core.spill import SpillStore
+
+Controller = BuildingController | MultiBuildingController | LeagueController
 
 
 class SessionManager:
-    """Manages simulation sessions."""
+    """
+    Manages simulation sessions, capped at `max_sessions` with LRU eviction.
+    A session not accessed for `spill_after_s` seconds, by any caller, is
+    written to the spill store; 0 keeps every session in memory. As shard
+    `shard_index` of `shard_count`, it only issues session IDs that hash to
+    itself, so a router can find a session's shard from its ID alone.
+    With `log_dir` set, every session writes a command log to
+    `{log_dir}/{session_id}.log` (see app/core/commands.py). Snapshots given
+    out are signed with `snapshot_key`, and only those are restored.
+    """
 
-    def __init__(self) -> None:
-        self.sessions: dict[str, dict] = {}
-        self.session_timeout: timedelta = timedelta(minutes=30)
+    def __init__(
+        self,
+        max_sessions: int = MAX_SESSIONS,
+        session_timeout_s: float = SESSION_TIMEOUT_MINUTES * 60,
+        spill_after_s: float = SESSION_SPILL_AFTER_S,
+        spill_store: SpillStore | None = None,
+        shard_index: int = SHARD_INDEX,
+        shard_count: int = SHARD_COUNT,
+        log_dir: str = SESSION_LOG_DIR,
+        snapshot_key: bytes = SNAPSHOT_SECRET,
+    ) -> None:
+        # session_id -> session data, least recently touched first
+        self.sessions: OrderedDict[str, dict] = OrderedDict()
+        # session_id -> last access of sessions held in memory, least recent first
+        self._resident: OrderedDict[str, float] = OrderedDict()
+        self.max_sessions: int = max_sessions
+        self.session_timeout_s: float = session_timeout_s
+        self.spill_after_s: float = spill_after_s
+        # Opened on first spill so processes that never spill never create a file
+        self._spill_store: SpillStore | None = spill_store
+        self.expired: int = 0
+        self.evicted: int = 0
+        self.spilled: int = 0
+        self.rehydrated: int = 0
+        self.shard_index: int = shard_index
+        self.ring: HashRing = HashRing(shard_count)
+        self.log_dir: str = log_dir
+        self.snapshot_key: bytes = snapshot_key
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
 
-    def create_session(self, algorithm_name: str = "scan", max_floors: int = 10) -> str:
-        """Create a single-building session with 2 lifts."""
-        session_id = str(uuid.uuid4())
-        self.sessions[session_id] = {
-            "type": "single",
-            "controller": BuildingController(algorithm_name=algorithm_name, max_floors=max_floors),
-            "last_activity": datetime.now(),
-        }
-        return session_id
+    def create_session(
+        self,
+        algorithm_name: str = "scan",
+        max_floors: int = 10,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        dispatch: str = DEFAULT_DISPATCH,
+        reassign_every: int = 0,
+    ) -> str:
+        """Create a single-building session. Raises ValueError for invalid zones."""
+        controller = BuildingController(
+            algorithm_name=algorithm_name,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch=dispatch,
+            reassign_every=reassign_every,
+        )
+        return self._add("single", controller)
 
     def create_comparison_session(
-        self, algorithm1: str = "scan", algorithm2: str = "scan", max_floors: int = 10
+        self,
+        algorithm1: str = "scan",
+        algorithm2: str = "scan",
+        max_floors: int = 10,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        dispatch1: str = DEFAULT_DISPATCH,
+        dispatch2: str = DEFAULT_DISPATCH,
+        reassign_every: int = 0,
     ) -> str:
-        """Create a comparison session with 2 buildings, each having 2 lifts."""
-        session_id = str(uuid.uuid4())
+        """Create a comparison session with 2 identical buildings. Raises ValueError for invalid zones."""
+        controller = MultiBuildingController(
+            algorithm1=algorithm1,
+            algorithm2=algorithm2,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            dispatch1=dispatch1,
+            dispatch2=dispatch2,
+            reassign_every=reassign_every,
+        )
+        return self._add("comparison", controller)
+
+    def create_league_session(
+        self,
+        algorithms: list[str] | None = None,
+        dispatchers: list[str] | None = None,
+        max_floors: int = 10,
+        num_lifts: int = DEFAULT_NUM_LIFTS,
+        zones: list[Zone] | None = None,
+        reassign_every: int = 0,
+    ) -> str:
+        """
+        Create a K-way comparison session, one building per algorithm and
+        dispatcher pairing. Raises ValueError for unknown names or invalid zones.
+        """
+        controller = LeagueController(
+            algorithms=algorithms,
+            dispatchers=dispatchers,
+            max_floors=max_floors,
+            num_lifts=num_lifts,
+            zones=zones,
+            reassign_every=reassign_every,
+        )
+        return self._add("league", controller)
+
+    def _add(self, session_type: str, controller: Controller) -> str:
+        """Store a new session, evicting the least recently used ones to make room."""
+        while self.sessions and len(self.sessions) >= self.max_sessions:
+            self._remove(next(iter(self.sessions)))
+            self.evicted += 1
+
+        session_id = self._new_session_id()
+        now = time.monotonic()
         self.sessions[session_id] = {
-            "type": "comparison",
-            "controller": MultiBuildingController(
-                algorithm1=algorithm1, algorithm2=algorithm2, max_floors=max_floors
-            ),
-            "last_activity": datetime.now(),
+            "type": session_type,
+            "controller": controller,
+            "last_activity": now,
         }
+        if self.log_dir:
+            # The log starts from the session's initial state, so forks and restores replay too
+            controller.command_log = CommandLog(
+                self.log_path(session_id), snapshot.dumps(controller), session_type
+            )
+        self._resident[session_id] = now
         return session_id
 
+    def _new_session_id(self) -> str:
+        """Random session ID owned by this shard; takes shard_count tries on average."""
+        while True:
+            session_id = str(uuid.uuid4())
+            if self.ring.owner(session_id) == self.shard_index:
+                return session_id
+
+    def _remove(self, session_id: str) -> None:
+        data = self.sessions.pop(session_id)
+        if data["controller"] is None:
+            if self._spill_store is not None:
+                self._spill_store.delete(session_id)
+            log = data.get("log")
+            if log is not None:
+                log.flush()
+        else:
+            _checkpoint(data["controller"])
+        self._resident.pop(session_id, None)
+
     def get_controller(
-        self, session_id: str
-    ) -> BuildingController | MultiBuildingController | None:
-        """Get controller for a session."""
-        if session_id in self.sessions:
-            self.sessions[session_id]["last_activity"] = datetime.now()
-            return self.sessions[session_id]["controller"]
-        return None
+        self, session_id: str, touch: bool = True
+    ) -> Controller | None:
+        """
+        Get controller for a session, loading it back if it was spilled.
+        Background callers pass touch=False so they do not keep it from expiring.
+        """
+        data = self.sessions.get(session_id)
+        if data is None:
+            return None
+        now = time.monotonic()
+        if data["controller"] is None:
+            data["controller"] = self._rehydrate(session_id)
+        self._resident[session_id] = now
+        self._resident.move_to_end(session_id)
+        if touch:
+            data["last_activity"] = now
+            self.sessions.move_to_end(session_id)
+        return data["controller"]
+
+    def touch(self, session_id: str) -> None:
+        """Count a session as used now without loading it, e.g. while viewers watch it."""
+        data = self.sessions.get(session_id)
+        if data is not None:
+            data["last_activity"] = time.monotonic()
+            self.sessions.move_to_end(session_id)
+
+    def _rehydrate(self, session_id: str) -> Controller:
+        data = self.spill_store.take(session_id)
+        if data is None:
+            raise KeyError(f"Spilled session {session_id} is missing from the spill store")
+        self.rehydrated += 1
+        controller = _load_session(data)
+        controller.command_log = self.sessions[session_id].pop("log", None)
+        return controller
+
+    def snapshot_session(self, session_id: str) -> bytes | None:
+        """
+        Signed snapshot of a session (see app/core/snapshot.py), or None if it
+        does not exist.
+        """
+        controller = self.get_controller(session_id)
+        if controller is None:
+            return None
+        return snapshot.sign(snapshot.dumps(controller), self.snapshot_key)
+
+    def restore_session(self, data: bytes) -> str:
+        """
+        Start a new session from a snapshot signed with this manager's key.
+        Raises ValueError for unsigned, foreign or invalid snapshots.
+        """
+        controller = _load_session(snapshot.verify(data, self.snapshot_key))
+        if isinstance(controller, LeagueController):
+            return self._add("league", controller)
+        if isinstance(controller, MultiBuildingController):
+            return self._add("comparison", controller)
+        return self._add("single", controller)
+
+    def fork_session(self, session_id: str, **overrides: str) -> str | None:
+        """
+        Start a new session continuing from the current state of another, which
+        is left untouched. `overrides` are passed to the controller's fork(),
+        e.g. algorithm="sstf". Returns None if the session does not exist.
+        """
+        controller = self.get_controller(session_id)
+        if controller is None:
+            return None
+        return self._add(self.sessions[session_id]["type"], controller.fork(**overrides))
 
     def get_session_type(self, session_id: str) -> str | None:
-        """Get the type of session (single or comparison)."""
+        """Get the type of session (single, comparison or league)."""
         if session_id in self.sessions:
             return self.sessions[session_id].get("type", "single")
         return None
 
-    def cleanup_sessions(self) -> None:
-        """Remove expired sessions."""
-        expired: list[str] = []
-        for session_id, data in self.sessions.items():
-            if datetime.now() - data["last_activity"] > self.session_timeout:
-                expired.append(session_id)
+    def cleanup_sessions(self, now: float | None = None) -> int:
+        """
+        Remove expired sessions, then spill idle ones. Both walk from the least
+        recently used end and stop at the first session that is still live.
+        Returns the number of sessions removed.
+        """
+        now = time.monotonic() if now is None else now
+        deadline = now - self.session_timeout_s
+        removed = 0
+        while self.sessions:
+            session_id = next(iter(self.sessions))
+            if self.sessions[session_id]["last_activity"] > deadline:
+                break
+            self._remove(session_id)
+            removed += 1
+        self.expired += removed
+
+        if self.spill_after_s > 0:
+            self.spill_idle(now - self.spill_after_s)
+        return removed
+
+    def spill_idle(self, idle_since: float) -> int:
+        """Write sessions last accessed at or before `idle_since` to the spill store."""
+        spilled = 0
+        while self._resident:
+            session_id, last_access = next(iter(self._resident.items()))
+            if last_access > idle_since:
+                break
+            del self._resident[session_id]
+            data = self.sessions[session_id]
+            controller = data["controller"]
+            self.spill_store.put(session_id, snapshot.dumps(controller))
+            _checkpoint(controller)
+            data["log"] = controller.command_log
+            data["controller"] = None
+            spilled += 1
+        self.spilled += spilled
+        return spilled
+
+    @property
+    def spill_store(self) -> SpillStore:
+        if self._spill_store is None:
+            self._spill_store = SpillStore()
+        return self._spill_store
+
+    def log_path(self, session_id: str) -> str:
+        return os.path.join(self.log_dir, f"{session_id}.log")
+
+    def checkpoint_log(self, session_id: str) -> str | None:
+        """
+        Checkpoint and flush a session's command log. Returns its path, or None
+        if the session does not exist or is not being logged.
+        """
+        controller = self.get_controller(session_id, touch=False)
+        if controller is None or controller.command_log is None:
+            return None
+        _checkpoint(controller)
+        return controller.command_log.path
+
+    def close(self) -> None:
+        """Checkpoint command logs and close the spill store; spilled sessions are lost."""
+        for session_id in self._resident:
+            _checkpoint(self.sessions[session_id]["controller"])
+        if self._spill_store is not None:
+            self._spill_store.close()
+            self._spill_store = None
+
+    def get_memory(self, session_id: str) -> int | None:
+        """Approximate bytes a session holds in memory; 0 while it is spilled."""
+        data = self.sessions.get(session_id)
+        if data is None:
+            return None
+        controller = data["controller"]
+        return controller.memory_bytes() if controller is not None else 0
+
+    def is_spilled(self, session_id: str) -> bool:
+        data = self.sessions.get(session_id)
+        return data is not None and data["controller"] is None
+
+    def resident_controllers(self) -> list[Controller]:
+        """Controllers of sessions held in memory, without touching or loading any."""
+        return [self.sessions[session_id]["controller"] for session_id in self._resident]
+
+    def count_by_type(self) -> dict[str, int]:
+        """Live sessions per session type, resident or spilled."""
+        counts = dict.fromkeys(("single", "comparison", "league"), 0)
+        for data in self.sessions.values():
+            counts[data["type"]] = counts.get(data["type"], 0) + 1
+        return counts
+
+    def get_stats(self, top: int = 10) -> dict:
+        """
+        Session counts, expiry/eviction/spill totals and approximate memory of
+        resident sessions, largest first.
+        """
+        sizes = [
+            (self.sessions[session_id]["controller"].memory_bytes(), session_id)
+            for session_id in self._resident
+        ]
+        store = self._spill_store
+        return {
+            "shard": self.shard_index,
+            "shards": self.ring.num_shards,
+            "sessions": len(self.sessions),
+            "resident": len(self._resident),
+            "spilled": len(self.sessions) - len(self._resident),
+            "max_sessions": self.max_sessions,
+            "timeout_s": self.session_timeout_s,
+            "spill_after_s": self.spill_after_s,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "spills": self.spilled,
+            "rehydrations": self.rehydrated,
+            "memory_bytes": sum(size for size, _ in sizes),
+            "spilled_bytes": store.nbytes if store is not None else 0,
+            "largest": [
+                {
+                    "session_id": session_id,
+                    "type": self.sessions[session_id]["type"],
+                    "memory_bytes": size,
+                }
+                for size, session_id in heapq.nlargest(top, sizes)
+            ],
+        }
+
+
+def _checkpoint(controller: Controller) -> None:
+    if controller.command_log is not None:
+        controller.command_log.checkpoint(controller.global_tick, controller.digest())
+
 
-        for session_id in expired:
-            del self.sessions[session_id]
+def _load_session(data: bytes) -> Controller:
+    controller = snapshot.loads(data)
+    if not isinstance(controller, Controller):
+        raise ValueError("Snapshot holds a single lift, not a building")
+    return controller
 
 
 # Global session manager instance
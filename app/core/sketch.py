@@ -0,0 +1,81 @@
+"""
+Quantile Sketch - mergeable streaming percentiles of passenger times.
+Times are whole ticks: those below SKETCH_EXACT_BELOW are counted exactly,
+longer ones in logarithmic buckets each SKETCH_RELATIVE_ACCURACY wide, so a
+sketch's size depends on the longest time seen, never on how many were
+added. Sketches of different lifts or buildings merge by adding bucket
+counts, giving the same percentiles as one sketch fed every value.
+"""
+import math
+from bisect import bisect_left
+from collections.abc import Iterable
+from itertools import accumulate, zip_longest
+
+from app.core.config import SKETCH_EXACT_BELOW, SKETCH_RELATIVE_ACCURACY
+
+# Ratio between consecutive logarithmic bucket bounds
+_GAMMA: float = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA: float = math.log(_GAMMA)
+
+
+def _bucket(value: float) -> int:
+    if value < SKETCH_EXACT_BELOW:
+        return max(int(value), 0)
+    return SKETCH_EXACT_BELOW + math.ceil(math.log(value / SKETCH_EXACT_BELOW) / _LOG_GAMMA)
+
+
+def _estimate(bucket: int) -> float:
+    """Value reported for a bucket: exact, or within the relative accuracy."""
+    if bucket < SKETCH_EXACT_BELOW:
+        return bucket
+    upper = SKETCH_EXACT_BELOW * _GAMMA ** (bucket - SKETCH_EXACT_BELOW)
+    return round(2 * upper / (1 + _GAMMA), 2)
+
+
+class QuantileSketch:
+    """Counts of tick durations per bucket, indexed by bucket number."""
+
+    def __init__(self) -> None:
+        self.buckets: list[int] = []
+        self.count: int = 0
+
+    def add(self, value: float) -> None:
+        bucket = _bucket(value)
+        if bucket >= len(self.buckets):
+            self.buckets.extend([0] * (bucket + 1 - len(self.buckets)))
+        self.buckets[bucket] += 1
+        self.count += 1
+
+    def copy(self) -> "QuantileSketch":
+        clone = QuantileSketch()
+        clone.buckets = list(self.buckets)
+        clone.count = self.count
+        return clone
+
+    @classmethod
+    def merged(cls, sketches: Iterable["QuantileSketch"]) -> "QuantileSketch":
+        """One sketch holding every value added to any of `sketches`."""
+        sketches = list(sketches)
+        result = cls()
+        result.buckets = [
+            sum(counts) for counts in zip_longest(*(s.buckets for s in sketches), fillvalue=0)
+        ]
+        result.count = sum(s.count for s in sketches)
+        return result
+
+    def quantiles(self, qs: Iterable[float]) -> list[float]:
+        """
+        Nearest-rank quantile for each of `qs` (0 < q <= 1), or 0 for every q
+        while the sketch is empty.
+        """
+        if not self.count:
+            return [0 for _ in qs]
+        cumulative = list(accumulate(self.buckets))
+        return [
+            _estimate(bisect_left(cumulative, max(math.ceil(q * self.count), 1))) for q in qs
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the bucket list."""
+        return 8 * len(self.buckets)
@@ -0,0 +1,114 @@
+"""
+Snapshot - compact, versioned binary encoding of simulation controllers.
+A snapshot is a short header (magic, format version) followed by the
+zlib-compressed pickle of the controller. Derived data such as memoized
+state and change hooks is dropped on save and rebuilt on load.
+Snapshots handed to clients are signed with an HMAC of the server's secret,
+and only snapshots carrying a valid signature are loaded back from them.
+Loading also only resolves the simulation classes listed below and refuses
+anything else a pickle could name.
+"""
+import array as array_module
+import hashlib
+import hmac
+import io
+import pickle
+import struct
+import zlib
+from collections import Counter
+
+from app.core.algorithms import ALGORITHM_REGISTRY
+from app.core.building import BuildingController
+from app.core.dispatch import DISPATCH_REGISTRY, LiftIndex
+from app.core.history import TickHistory
+from app.core.league import LeagueController
+from app.core.lift import LiftController
+from app.core.multi_lift import MultiBuildingController
+from app.core.reassign import Reassigner
+from app.core.sketch import QuantileSketch
+from app.core.stops import StopIndex
+
+SNAPSHOT_MAGIC: bytes = b"LIFT"
+SNAPSHOT_VERSION: int = 2  # 2: lifts carry quantile sketches
+SNAPSHOT_MEDIA_TYPE: str = "application/vnd.lift-snapshot"
+MAX_SNAPSHOT_BYTES: int = 256 * 1024 * 1024  # Decompressed size limit
+_HEADER = struct.Struct(">4sH")
+_SIGNATURE_SIZE: int = hashlib.sha256().digest_size
+
+Controller = LiftController | BuildingController | MultiBuildingController | LeagueController
+
+_ALLOWED_CLASSES: tuple[type, ...] = (
+    LiftController,
+    BuildingController,
+    MultiBuildingController,
+    LeagueController,
+    TickHistory,
+    StopIndex,
+    LiftIndex,
+    Reassigner,
+    QuantileSketch,
+    Counter,
+    array_module.array,
+    *ALGORITHM_REGISTRY.values(),
+    *DISPATCH_REGISTRY.values(),
+)
+_ALLOWED_GLOBALS: dict[tuple[str, str], object] = {
+    (cls.__module__, cls.__qualname__): cls for cls in _ALLOWED_CLASSES
+}
+# How pickle rebuilds array columns
+_ALLOWED_GLOBALS[("array", "_array_reconstructor")] = array_module._array_reconstructor  # type: ignore[attr-defined]
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> object:
+        try:
+            return _ALLOWED_GLOBALS[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f"Snapshot refers to {module}.{name}") from None
+
+
+def dumps(controller: Controller, level: int = 6) -> bytes:
+    """Encode a controller as a snapshot."""
+    body = pickle.dumps(controller, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION) + zlib.compress(body, level)
+
+
+def sign(data: bytes, key: bytes) -> bytes:
+    """Snapshot with an HMAC-SHA256 signature appended, for handing to clients."""
+    return data + hmac.new(key, data, hashlib.sha256).digest()
+
+
+def verify(data: bytes, key: bytes) -> bytes:
+    """
+    The snapshot inside signed `data`. Raises ValueError unless it was signed
+    with `key`, before any of it is decompressed or unpickled.
+    """
+    body, signature = data[:-_SIGNATURE_SIZE], data[-_SIGNATURE_SIZE:]
+    expected = hmac.new(key, body, hashlib.sha256).digest()
+    if len(data) <= _SIGNATURE_SIZE or not hmac.compare_digest(signature, expected):
+        raise ValueError("Snapshot is unsigned or was not issued by this server")
+    return body
+
+
+def loads(data: bytes) -> Controller:
+    """Decode a snapshot. Raises ValueError if it is not a snapshot this version can read."""
+    if len(data) < _HEADER.size:
+        raise ValueError("Snapshot is truncated")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a lift simulation snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}")
+
+    try:
+        decompressor = zlib.decompressobj()
+        body = decompressor.decompress(data[_HEADER.size:], MAX_SNAPSHOT_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError("Snapshot is too large")
+        controller = _SnapshotUnpickler(io.BytesIO(body)).load()
+    except (zlib.error, pickle.UnpicklingError, EOFError, AttributeError, TypeError) as e:
+        raise ValueError(f"Corrupt snapshot: {e}") from e
+
+    if not isinstance(controller, Controller):
+        raise ValueError("Snapshot does not hold a simulation controller")
+    return controller
@@ -0,0 +1,67 @@
+"""
+Spill Store - SQLite file holding serialized idle sessions until they are
+accessed again. Contents only make sense to the process that wrote them, so
+the store starts empty and its default file is removed on close.
+"""
+import os
+import sqlite3
+import tempfile
+
+from app.core.config import SESSION_SPILL_PATH
+
+
+class SpillStore:
+    """Session ID -> snapshot bytes, kept in one SQLite table."""
+
+    def __init__(self, path: str = SESSION_SPILL_PATH) -> None:
+        self._owned: bool = not path
+        if not path:
+            fd, path = tempfile.mkstemp(prefix="lift-sessions-", suffix=".sqlite3")
+            os.close(fd)
+        self.path: str = path
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # Losing the file on a crash only loses sessions the restart would orphan anyway
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("DROP TABLE IF EXISTS sessions")
+        self._db.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.nbytes: int = 0
+        self._sizes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sizes
+
+    def put(self, session_id: str, data: bytes) -> None:
+        """Store (or replace) a session's snapshot."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data) VALUES (?, ?)", (session_id, data)
+        )
+        self.nbytes += len(data) - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = len(data)
+
+    def take(self, session_id: str) -> bytes | None:
+        """Remove and return a session's snapshot, or None if it is not stored."""
+        row = self._db.execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.delete(session_id)
+        return bytes(row[0])
+
+    def delete(self, session_id: str) -> None:
+        """Drop a session's snapshot if stored."""
+        if session_id in self._sizes:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.nbytes -= self._sizes.pop(session_id)
+
+    def close(self) -> None:
+        """Close the database, removing it if it was a temp file."""
+        self._db.close()
+        if self._owned:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
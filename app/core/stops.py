@@ -0,0 +1,93 @@
+"""
+Stop Index - pending stops keyed by floor, with floors kept in sorted order.
+Answers min/max/next-above/next-below queries without rescanning all stops.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterator, MutableMapping
+
+
+class StopIndex(MutableMapping[int, list[tuple]]):
+    """Floor -> actions mapping that iterates in floor order and supports range queries."""
+
+    def __init__(self) -> None:
+        self._actions: dict[int, list[tuple]] = {}
+        self._floors: list[int] = []
+
+    # === Mapping protocol ===
+
+    def __getitem__(self, floor: int) -> list[tuple]:
+        return self._actions[floor]
+
+    def __setitem__(self, floor: int, actions: list[tuple]) -> None:
+        if floor not in self._actions:
+            insort(self._floors, floor)
+        self._actions[floor] = actions
+
+    def __delitem__(self, floor: int) -> None:
+        del self._actions[floor]
+        del self._floors[bisect_left(self._floors, floor)]
+
+    def __contains__(self, floor: object) -> bool:
+        return floor in self._actions
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._floors)
+
+    def __len__(self) -> int:
+        return len(self._floors)
+
+    def __bool__(self) -> bool:
+        return bool(self._floors)
+
+    def __repr__(self) -> str:
+        return f"StopIndex({self.to_dict()!r})"
+
+    def setdefault(self, floor: int, default: list[tuple] | None = None) -> list[tuple]:
+        if floor not in self._actions:
+            self[floor] = [] if default is None else default
+        return self._actions[floor]
+
+    def extend(self, actions_by_floor: dict[int, list[tuple]]) -> None:
+        """Append actions to many floors at once, merging new floors in one sort."""
+        new_floors = [floor for floor in actions_by_floor if floor not in self._actions]
+        for floor, actions in actions_by_floor.items():
+            self._actions.setdefault(floor, []).extend(actions)
+        if new_floors:
+            # Timsort merges the two sorted runs in linear time
+            self._floors.extend(sorted(new_floors))
+            self._floors.sort()
+
+    def copy(self) -> "StopIndex":
+        """Copy with its own action lists; the action tuples themselves are shared."""
+        clone = StopIndex()
+        clone._actions = {floor: list(actions) for floor, actions in self._actions.items()}
+        clone._floors = list(self._floors)
+        return clone
+
+    def to_dict(self) -> dict[int, list[tuple]]:
+        """Plain dict of floor -> actions in floor order."""
+        return {floor: self._actions[floor] for floor in self._floors}
+
+    # === Queries ===
+
+    def min(self) -> int:
+        """Lowest floor with a stop. Raises ValueError if there are no stops."""
+        if not self._floors:
+            raise ValueError("StopIndex.min() on empty index")
+        return self._floors[0]
+
+    def max(self) -> int:
+        """Highest floor with a stop. Raises ValueError if there are no stops."""
+        if not self._floors:
+            raise ValueError("StopIndex.max() on empty index")
+        return self._floors[-1]
+
+    def next_above(self, level: int, inclusive: bool = False) -> int | None:
+        """Lowest stop above `level` (or at it, if inclusive)."""
+        index = bisect_left(self._floors, level) if inclusive else bisect_right(self._floors, level)
+        return self._floors[index] if index < len(self._floors) else None
+
+    def next_below(self, level: int, inclusive: bool = False) -> int | None:
+        """Highest stop below `level` (or at it, if inclusive)."""
+        index = bisect_right(self._floors, level) if inclusive else bisect_left(self._floors, level)
+        return self._floors[index - 1] if index > 0 else None
@@ -0,0 +1,140 @@
+"""
+Traffic Generator - seeded, lazily generated passenger arrivals.
+Yields (tick, from_level, to_level) tuples in tick order using constant
+memory, so arbitrarily long runs can be fed straight into a controller.
+"""
+import random
+from bisect import bisect
+from collections.abc import Iterable, Iterator
+from itertools import accumulate
+
+from app.core.building import BuildingController
+from app.core.config import MIN_FLOOR
+from app.core.lift import LiftController
+from app.core.multi_lift import MultiBuildingController
+
+# Share of arrivals that are (lobby -> upper floor, upper floor -> lobby, inter-floor)
+TRAFFIC_PROFILES: dict[str, tuple[float, float, float]] = {
+    "inter_floor": (0.0, 0.0, 1.0),
+    "up_peak": (0.85, 0.05, 0.10),
+    "down_peak": (0.05, 0.85, 0.10),
+    "lunch": (0.40, 0.40, 0.20),
+}
+
+Arrival = tuple[int, int, int]
+Controller = LiftController | BuildingController | MultiBuildingController
+
+
+class TrafficGenerator:
+    """
+    Poisson arrival process over a building.
+    `rate` is the mean number of arrivals per tick; `floor_weights` (one per
+    floor, lobby included) bias which floors passengers come from and go to.
+    Iterating twice with the same seed yields the same arrivals.
+    """
+
+    def __init__(
+        self,
+        max_floors: int,
+        rate: float = 0.3,
+        profile: str = "inter_floor",
+        floor_weights: list[float] | None = None,
+        seed: int | None = None,
+        lobby: int = MIN_FLOOR,
+        start_tick: int = 0,
+    ) -> None:
+        if profile not in TRAFFIC_PROFILES:
+            raise ValueError(f"Unknown traffic profile: {profile}")
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.floors: list[int] = list(range(MIN_FLOOR, max_floors + 1))
+        weights = floor_weights if floor_weights is not None else [1.0] * len(self.floors)
+        if len(weights) != len(self.floors):
+            raise ValueError("floor_weights needs one weight per floor")
+        upper_weights = [0.0 if floor == lobby else w for floor, w in zip(
+            self.floors, weights, strict=True
+        )]
+        if sum(upper_weights) <= 0:
+            raise ValueError("floor_weights must give some non-lobby floor a positive weight")
+        # Inter-floor trips redraw the destination until it differs from the origin
+        if sum(1 for w in weights if w > 0) < 2:
+            raise ValueError("floor_weights must give at least two floors a positive weight")
+
+        self.max_floors: int = max_floors
+        self.rate: float = rate
+        self.profile: str = profile
+        self.seed: int | None = seed
+        self.lobby: int = lobby
+        self.start_tick: int = start_tick
+        self._cum_weights: list[float] = list(accumulate(weights))
+        self._upper_cum_weights: list[float] = list(accumulate(upper_weights))
+
+    def __iter__(self) -> Iterator[Arrival]:
+        """Endless stream of arrivals in non-decreasing tick order."""
+        rng = random.Random(self.seed)
+        up_share, down_share, _ = TRAFFIC_PROFILES[self.profile]
+        clock = float(self.start_tick)
+
+        while True:
+            # Exponential gaps between arrivals make a Poisson process in time
+            clock += rng.expovariate(self.rate)
+            kind = rng.random()
+            if kind < up_share:
+                from_level, to_level = self.lobby, self._pick(rng, self._upper_cum_weights)
+            elif kind < up_share + down_share:
+                from_level, to_level = self._pick(rng, self._upper_cum_weights), self.lobby
+            else:
+                from_level = self._pick(rng, self._cum_weights)
+                to_level = self._pick(rng, self._cum_weights)
+                while to_level == from_level:
+                    to_level = self._pick(rng, self._cum_weights)
+            yield int(clock), from_level, to_level
+
+    def until(self, end_tick: int) -> Iterator[Arrival]:
+        """Arrivals with tick < end_tick."""
+        for arrival in self:
+            if arrival[0] >= end_tick:
+                return
+            yield arrival
+
+    def _pick(self, rng: random.Random, cum_weights: list[float]) -> int:
+        index = bisect(cum_weights, rng.random() * cum_weights[-1])
+        return self.floors[min(index, len(self.floors) - 1)]
+
+
+class TrafficFeed:
+    """
+    Releases arrivals into a controller as its global_tick advances.
+    An arrival at tick T is added once the controller reaches tick T, i.e.
+    just before the step that takes it to T + 1.
+    """
+
+    def __init__(self, arrivals: Iterable[Arrival], id_prefix: str = "P") -> None:
+        self._arrivals: Iterator[Arrival] = iter(arrivals)
+        self._next: Arrival | None = next(self._arrivals, None)
+        self.id_prefix: str = id_prefix
+        self.added: int = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next is None
+
+    def release(self, controller: Controller) -> int:
+        """Add every arrival due at the controller's current tick. Returns how many."""
+        released = 0
+        while self._next is not None and self._next[0] <= controller.global_tick:
+            _, from_level, to_level = self._next
+            controller.add_request(f"{self.id_prefix}{self.added}", from_level, to_level)
+            self.added += 1
+            released += 1
+            self._next = next(self._arrivals, None)
+        return released
+
+    def run(self, controller: Controller, ticks: int) -> int:
+        """Step `controller` headlessly for `ticks` ticks, feeding arrivals as they fall due."""
+        released = 0
+        for _ in range(ticks):
+            released += self.release(controller)
+            controller.step()
+        return released
@@ -4,12 +4,16 @@ FastAPI application entry point.
 import asyncio
 import os
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api import endpoints, websocket
-from app.core.config import CORS_ORIGINS
+from app.core import metrics
+from app.core.config import CORS_ORIGINS, SESSION_CLEANUP_INTERVAL_S
+from app.core.league import LeagueBusyError
+from app.core.scheduler import tick_scheduler
 from app.core.sessions import session_manager
 
 app = FastAPI(
@@ -30,6 +34,95 @@ app.add_middleware(
 app.include_router(endpoints.router, prefix="/api")
 app.add_websocket_route("/ws/{session_id}", websocket.websocket_endpoint)
 
+
+@app.exception_handler(LeagueBusyError)
+async def league_busy_handler(request: Request, exc: LeagueBusyError) -> JSONResponse:
+    """Requests changing a league during a parallel fast-forward conflict with it."""
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+# === Metrics ===
+# Gauges are read from live objects at scrape time; timers live in app/core/metrics.py
+
+
+def _pending_passengers() -> dict[str, int]:
+    totals = {"waiting": 0, "riding": 0, "scheduled": 0}
+    for controller in session_manager.resident_controllers():
+        for state, count in controller.pending_passengers().items():
+            totals[state] += count
+    return totals
+
+
+metrics.registry.gauge(
+    "lift_sessions",
+    "Live sessions by type, in memory or spilled",
+    session_manager.count_by_type,
+    "type",
+)
+metrics.registry.gauge(
+    "lift_sessions_spilled",
+    "Sessions currently spilled to disk",
+    lambda: len(session_manager.sessions) - len(session_manager.resident_controllers()),
+)
+metrics.registry.gauge(
+    "lift_session_memory_bytes",
+    "Approximate memory held by in-memory sessions (history, requests and stops)",
+    lambda: sum(c.memory_bytes() for c in session_manager.resident_controllers()),
+)
+metrics.registry.gauge(
+    "lift_session_events_total",
+    "Sessions expired, evicted, spilled and rehydrated",
+    lambda: {
+        "expired": session_manager.expired,
+        "evicted": session_manager.evicted,
+        "spilled": session_manager.spilled,
+        "rehydrated": session_manager.rehydrated,
+    },
+    "event",
+    kind="counter",
+)
+metrics.registry.gauge(
+    "lift_pending_passengers",
+    "Passengers in in-memory sessions not yet delivered",
+    _pending_passengers,
+    "state",
+)
+metrics.registry.gauge(
+    "lift_websocket_connections",
+    "Open WebSocket connections",
+    lambda: websocket.manager.get_stats()["connections"],
+)
+metrics.registry.gauge(
+    "lift_websocket_queued_frames",
+    "Frames queued for WebSocket viewers and not yet sent",
+    lambda: websocket.manager.get_stats()["queued_frames"],
+)
+metrics.registry.gauge(
+    "lift_websocket_frames_total",
+    "WebSocket frames sent, coalesced into snapshots, or dropped on disconnect",
+    lambda: {
+        outcome: websocket.manager.get_stats()[f"frames_{outcome}"]
+        for outcome in ("sent", "coalesced", "dropped")
+    },
+    "outcome",
+    kind="counter",
+)
+metrics.registry.gauge(
+    "lift_autoplay_sessions", "Sessions ticked by the server", lambda: len(tick_scheduler.jobs)
+)
+metrics.registry.gauge(
+    "lift_scheduler_lag_seconds",
+    "How far the autoplay scheduler's last pass ran behind",
+    lambda: tick_scheduler.lag_ms / 1000,
+)
+
+
+@app.get("/metrics")
+def metrics_endpoint() -> Response:
+    """Prometheus text-format metrics for this process."""
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # Serve React frontend (built)
 frontend_path = "frontend-react/dist"
 if os.path.exists(frontend_path):
@@ -40,12 +133,22 @@ if os.path.exists(frontend_path):
 async def startup_event() -> None:
     """Start background tasks."""
     asyncio.create_task(session_cleanup_task())
+    asyncio.create_task(tick_scheduler.run(websocket.autoplay_tick))
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """Remove the spilled-session store."""
+    session_manager.close()
 
 
 async def session_cleanup_task() -> None:
-    """Periodically clean up expired sessions."""
+    """Periodically clean up expired sessions and spill idle ones to disk."""
     while True:
-        await asyncio.sleep(60 * 5)
+        await asyncio.sleep(SESSION_CLEANUP_INTERVAL_S)
+        # Sessions with viewers are in use even when nobody sends anything
+        for session_id in list(websocket.manager.active_connections):
+            session_manager.touch(session_id)
         session_manager.cleanup_sessions()
 
 
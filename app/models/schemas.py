@@ -1,5 +1,7 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.config import MAX_LIFTS
 
 
 class PassengerRequest(BaseModel):
@@ -7,14 +9,48 @@ class PassengerRequest(BaseModel):
     from_level: int
     to_level: int
 
+class BulkPassengerRequest(PassengerRequest):
+    tick: int | None = None  # Arrival tick; None or past ticks are added immediately
+
 class CreateSessionRequest(BaseModel):
     algorithm: str | None = "scan"
     max_floors: int | None = 10
+    num_lifts: int | None = Field(2, ge=1, le=MAX_LIFTS)
+    zones: list[tuple[int, int]] | None = None  # (lowest, highest) floor per lift
+    dispatch: str | None = "nearest"
+    reassign_every: int = Field(0, ge=0)  # Ticks between re-solving waiting calls, 0 disables
 
 class CreateComparisonRequest(BaseModel):
     algorithm1: str | None = "scan"
     algorithm2: str | None = "scan"
     max_floors: int | None = 10
+    num_lifts: int | None = Field(2, ge=1, le=MAX_LIFTS)
+    zones: list[tuple[int, int]] | None = None
+    dispatch1: str | None = "nearest"
+    dispatch2: str | None = "nearest"
+    reassign_every: int = Field(0, ge=0)
+
+class CreateLeagueRequest(BaseModel):
+    algorithms: list[str] | None = None  # Defaults to every registered algorithm
+    dispatchers: list[str] | None = None  # One building per algorithm and dispatcher
+    max_floors: int | None = 10
+    num_lifts: int | None = Field(2, ge=1, le=MAX_LIFTS)
+    zones: list[tuple[int, int]] | None = None
+    reassign_every: int = Field(0, ge=0)
+
+class ForkRequest(BaseModel):
+    # Unset fields keep the parent's setting; single sessions use algorithm/dispatch,
+    # comparison sessions the numbered fields
+    algorithm: str | None = None
+    dispatch: str | None = None
+    algorithm1: str | None = None
+    algorithm2: str | None = None
+    dispatch1: str | None = None
+    dispatch2: str | None = None
+
+class AutoplayRequest(BaseModel):
+    enabled: bool = True
+    interval_ms: int | None = None  # Defaults to DEFAULT_TICK_INTERVAL_MS
 
 class StopInfo(BaseModel):
     passenger_id: str
@@ -37,8 +73,7 @@ class LiftStats(BaseModel):
 
 class BuildingState(BaseModel):
     algorithm: str
-    lift_a: dict  # Simplified for now, or could use LiftState if we had one
-    lift_b: dict
+    lifts: list[dict]  # Simplified for now, or could use LiftState if we had one
     active_passengers: list[PassengerStatus]
     global_tick: int
     stats: dict
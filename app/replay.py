@@ -0,0 +1,279 @@
+"""
+Replay runner - re-runs a session's command log headless at full speed.
+The recorded run replays the session as it happened and checks every
+checkpoint in the log; what-if runs replay the same commands with another
+algorithm or dispatch strategy, across a process pool. Each what-if run
+reports the first tick where it diverges from the recorded run.
+Only imports the simulation core, never the API layer.
+
+Example:
+    lift-replay logs/<session_id>.log --algorithms scan sstf nearest --detail
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core import snapshot
+from app.core.algorithms import ALGORITHM_REGISTRY
+from app.core.building import BuildingController
+from app.core.commands import ADD, ADD_BATCH, SCHEDULE, read_log
+from app.core.dispatch import DISPATCH_REGISTRY
+from app.core.league import LeagueController
+from app.core.lift import PERCENTILE_KEYS
+from app.core.multi_lift import MultiBuildingController
+
+Controller = BuildingController | MultiBuildingController | LeagueController
+
+
+class ReplayRun:
+    """
+    One replay of a log. `trace` holds the digest of the traced building
+    after every tick from `start_tick` + 1 on, so runs can be compared tick
+    by tick. For comparison and league sessions that is the first building,
+    whose lifts what-if runs replay.
+    """
+
+    def __init__(self, controller: Controller) -> None:
+        self.controller: Controller = controller
+        self.start_tick: int = controller.global_tick
+        self.trace: array = array("I")
+        self.checkpoints: int = 0
+        # Ticks whose checkpoint digest did not match the recording
+        self.mismatches: list[int] = []
+
+    @property
+    def traced(self) -> BuildingController:
+        return _buildings(self.controller)[0]
+
+    def advance(self, tick: int) -> None:
+        """Step to `tick`, tracing every tick on the way."""
+        controller, traced, trace = self.controller, self.traced, self.trace
+        while controller.global_tick < tick:
+            controller.step()
+            trace.append(traced.digest())
+
+
+def load_controller(
+    header: dict, algorithm: str | None = None, dispatch: str | None = None
+) -> Controller:
+    """
+    Starting state of a log, or a single building with another algorithm or
+    dispatch strategy. Comparison and league sessions sent their commands to
+    every building, so what-ifs replay them into a fork of the first one.
+    """
+    controller = snapshot.loads(header["base"])
+    if not isinstance(controller, Controller):
+        raise ValueError("Command log does not start from a building")
+    if algorithm is None and dispatch is None:
+        return controller
+    return _buildings(controller)[0].fork(algorithm, dispatch)
+
+
+def _buildings(controller: Controller) -> list[BuildingController]:
+    if isinstance(controller, MultiBuildingController):
+        return [controller.building1, controller.building2]
+    if isinstance(controller, LeagueController):
+        return controller.buildings
+    return [controller]
+
+
+def replay(
+    header: dict,
+    records: list[list],
+    algorithm: str | None = None,
+    dispatch: str | None = None,
+    until: int | None = None,
+    extra_ticks: int = 0,
+) -> ReplayRun:
+    """
+    Replay `records` on the log's starting state, up to the last recorded
+    tick plus `extra_ticks`, or only up to tick `until`. Checkpoints are only
+    checked when replaying the recorded configuration.
+    Raises ValueError if records go back in time.
+    """
+    run = ReplayRun(load_controller(header, algorithm, dispatch))
+    controller = run.controller
+    verify = algorithm is None and dispatch is None
+    end = run.start_tick
+
+    for record in records:
+        tick, kind = record[0], record[1]
+        if until is not None and tick > until:
+            break
+        if tick < controller.global_tick:
+            raise ValueError(f"Command log goes back from tick {controller.global_tick} to {tick}")
+        run.advance(tick)
+        end = tick
+
+        if kind == ADD:
+            controller.add_request(record[2], record[3], record[4])
+        elif kind == ADD_BATCH:
+            controller.add_requests([tuple(request) for request in record[2]])
+        elif kind == SCHEDULE:
+            controller.schedule_requests([tuple(request) for request in record[2]])
+        elif verify:
+            run.checkpoints += 1
+            if controller.digest() != record[2]:
+                run.mismatches.append(tick)
+
+    run.advance(until if until is not None else end + extra_ticks)
+    return run
+
+
+def first_divergence(trace_a: array, trace_b: array, start_tick: int = 0) -> int | None:
+    """
+    First tick where two traces of runs from `start_tick` differ, or None.
+    Only the ticks both runs reached are compared.
+    """
+    for i, (digest_a, digest_b) in enumerate(zip(trace_a, trace_b, strict=False)):
+        if digest_a != digest_b:
+            return start_tick + i + 1
+    return None
+
+
+def describe_divergence(a: ReplayRun, b: ReplayRun) -> list[dict]:
+    """Lifts of the traced buildings that differ, as they stand now in both runs."""
+    differences = []
+    building_a, building_b = a.traced, b.traced
+    lifts = zip(building_a.lift_names, building_a.lifts, building_b.lifts, strict=True)
+    for name, lift_a, lift_b in lifts:
+        a_state = _lift_state(lift_a)
+        b_state = _lift_state(lift_b)
+        if a_state != b_state:
+            differences.append({"lift": name, "a": a_state, "b": b_state})
+    return differences
+
+
+def _lift_state(lift) -> dict:
+    return {
+        "level": lift.current_level,
+        "direction": lift.direction,
+        "passengers": list(lift.passengers),
+        "requests": len(lift.active_requests),
+    }
+
+
+def replay_one(spec: dict) -> dict:
+    """Replay the log at spec["path"] as described by `spec`; the result keeps the trace."""
+    started = time.perf_counter()
+    header, records = read_log(spec["path"])
+    run = replay(
+        header,
+        records,
+        spec.get("algorithm"),
+        spec.get("dispatch"),
+        extra_ticks=spec.get("extra_ticks", 0),
+    )
+    buildings = _buildings(run.controller)
+    elapsed = round(time.perf_counter() - started, 4)
+    rows = []
+    for number, building in enumerate(buildings, 1):
+        stats = building.get_stats()
+        rows.append({
+            "run": spec["run"],
+            "building": number,
+            "algorithm": building.algorithm_name,
+            "dispatch": building.dispatch_name,
+            "ticks": building.global_tick,
+            "passengers": building.total_passengers,
+            "completed": stats["completed"],
+            "avg_wait": stats["avg_wait"],
+            "avg_ride": stats["avg_ride"],
+            "avg_total": stats["avg_total"],
+            **{key: stats[key] for key in PERCENTILE_KEYS},
+            "checkpoints": run.checkpoints,
+            "mismatches": len(run.mismatches),
+            "diverges_at": None,
+            "elapsed_s": elapsed,
+        })
+    return {"spec": spec, "rows": rows, "start_tick": run.start_tick, "trace": run.trace}
+
+
+def replay_many(
+    path: str,
+    what_ifs: list[tuple[str | None, str | None]],
+    workers: int = 1,
+    extra_ticks: int = 0,
+) -> list[dict]:
+    """
+    Replay the recorded run plus one run per (algorithm, dispatch) what-if,
+    None keeping the recorded one, inline or across a process pool. Results
+    come back in that order, with what-if rows marked with the tick they
+    diverge from the recording.
+    """
+    specs: list[dict] = [{"run": "recorded", "path": path, "extra_ticks": extra_ticks}]
+    for algorithm, dispatch in what_ifs:
+        specs.append({
+            "run": "/".join(name for name in (algorithm, dispatch) if name),
+            "path": path,
+            "algorithm": algorithm,
+            "dispatch": dispatch,
+            "extra_ticks": extra_ticks,
+        })
+
+    if workers <= 1 or len(specs) == 1:
+        results = [replay_one(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(specs))) as pool:
+            results = list(pool.map(replay_one, specs))
+
+    recorded = results[0]
+    for result in results[1:]:
+        diverges_at = first_divergence(recorded["trace"], result["trace"], result["start_tick"])
+        for row in result["rows"]:
+            row["diverges_at"] = diverges_at
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Console entry point. Exits with 1 if the recorded run misses a checkpoint."""
+    parser = argparse.ArgumentParser(description="Replay a lift session's command log.")
+    parser.add_argument("log", help="command log written under SESSION_LOG_DIR")
+    parser.add_argument("--algorithms", nargs="+", default=[], help="what-if algorithms")
+    parser.add_argument("--dispatch", nargs="+", choices=list(DISPATCH_REGISTRY), default=[])
+    parser.add_argument("--extra-ticks", type=int, default=0, help="ticks to run past the log")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--detail", action="store_true", help="show the lifts that differ where runs diverge"
+    )
+    args = parser.parse_args(argv)
+
+    unknown = sorted(set(args.algorithms) - set(ALGORITHM_REGISTRY))
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+    what_ifs: list[tuple[str | None, str | None]] = [
+        (algorithm, dispatch)
+        for algorithm in args.algorithms or [None]
+        for dispatch in args.dispatch or [None]
+        if algorithm or dispatch
+    ]
+
+    try:
+        results = replay_many(args.log, what_ifs, args.workers, args.extra_ticks)
+    except (OSError, ValueError) as e:
+        print(f"lift-replay: {e}", file=sys.stderr)
+        return 2
+
+    header, records = read_log(args.log) if args.detail else ({}, [])
+    for result in results:
+        for row in result["rows"]:
+            if args.detail and row["diverges_at"] is not None and row["building"] == 1:
+                row["divergence"] = _divergence_detail(header, records, result["spec"], row)
+            print(json.dumps(row))
+    return 1 if results[0]["rows"][0]["mismatches"] else 0
+
+
+def _divergence_detail(header: dict, records: list[list], spec: dict, row: dict) -> list[dict]:
+    """Re-run both runs to the diverging tick, which is cheap since replays are exact."""
+    tick = row["diverges_at"]
+    recorded = replay(header, records, until=tick)
+    what_if = replay(header, records, spec["algorithm"], spec["dispatch"], until=tick)
+    return describe_divergence(recorded, what_if)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Parameter sweep runner - runs a grid of headless simulations across a process pool.
+Results stream to CSV or JSONL as runs finish; an interrupted sweep can be resumed.
+Only imports the simulation core, never the API layer.
+
+Example:
+    lift-sweep --algorithms scan sstf nearest --floors 10 20 --seeds 0-9 -o sweep.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+from app.core.algorithms import ALGORITHM_REGISTRY
+from app.core.building import BuildingController
+from app.core.config import MAX_LIFTS
+from app.core.dispatch import DEFAULT_DISPATCH, DISPATCH_REGISTRY
+from app.core.lift import PERCENTILE_KEYS
+from app.core.traffic import TRAFFIC_PROFILES, TrafficFeed, TrafficGenerator
+
+# Every spec field that affects a run's result; together they identify the run
+KEY_FIELDS: list[str] = [
+    "algorithm",
+    "max_floors",
+    "seed",
+    "lifts",
+    "dispatch",
+    "reassign_every",
+    "profile",
+    "arrival_rate",
+    "ticks",
+    "drain_ticks",
+]
+RESULT_FIELDS: list[str] = [
+    *KEY_FIELDS,
+    "ticks_run",
+    "passengers",
+    "completed",
+    "avg_wait",
+    "avg_ride",
+    "avg_total",
+    *PERCENTILE_KEYS,
+    "reassigned",
+    "elapsed_s",
+]
+
+
+def run_one(spec: dict) -> dict:
+    """Run one simulation described by `spec` and return its result row."""
+    started = time.perf_counter()
+    building = BuildingController(
+        algorithm_name=spec["algorithm"],
+        max_floors=spec["max_floors"],
+        history_size=0,
+        num_lifts=spec["lifts"],
+        dispatch=spec["dispatch"],
+        reassign_every=spec["reassign_every"],
+    )
+    traffic = TrafficGenerator(
+        spec["max_floors"],
+        rate=spec["arrival_rate"],
+        profile=spec["profile"],
+        seed=spec["seed"],
+    )
+    passengers = TrafficFeed(traffic.until(spec["ticks"])).run(building, spec["ticks"])
+
+    # Let passengers still in the system finish, bounded so starved runs terminate
+    for _ in range(spec["drain_ticks"]):
+        if building.get_completed() == passengers:
+            break
+        building.step()
+
+    stats = building.get_stats()
+    return {
+        **{field: spec[field] for field in KEY_FIELDS},
+        "ticks_run": building.global_tick,
+        "passengers": passengers,
+        "completed": stats["completed"],
+        "avg_wait": stats["avg_wait"],
+        "avg_ride": stats["avg_ride"],
+        "avg_total": stats["avg_total"],
+        **{key: stats[key] for key in PERCENTILE_KEYS},
+        "reassigned": building.reassigner.moved,
+        "elapsed_s": round(time.perf_counter() - started, 4),
+    }
+
+
+def build_grid(
+    algorithms: Iterable[str],
+    floors: Iterable[int],
+    seeds: Iterable[int],
+    lifts: Iterable[int],
+    ticks: int,
+    arrival_rate: float,
+    drain_ticks: int,
+    profile: str = "inter_floor",
+    dispatchers: Iterable[str] = (DEFAULT_DISPATCH,),
+    reassign_intervals: Iterable[int] = (0,),
+) -> list[dict]:
+    """Expand the parameter grid into run specs."""
+    return [
+        {
+            "algorithm": algorithm,
+            "max_floors": max_floors,
+            "seed": seed,
+            "lifts": lift_count,
+            "dispatch": dispatch,
+            "reassign_every": reassign_every,
+            "ticks": ticks,
+            "profile": profile,
+            "arrival_rate": arrival_rate,
+            "drain_ticks": drain_ticks,
+        }
+        for algorithm, max_floors, seed, lift_count, dispatch, reassign_every in product(
+            algorithms, floors, seeds, lifts, dispatchers, reassign_intervals
+        )
+    ]
+
+
+def run_key(row: dict) -> tuple:
+    """
+    Identity of a run within a sweep, normalised so CSV strings match spec
+    numbers. Rows written before dispatch and reassign_every were sweep fields
+    ran with the defaults. Rows written before drain_ticks was recorded, when
+    `ticks` held the ticks actually run, never match and are run again.
+    """
+    if row.get("drain_ticks") in (None, ""):
+        return (None,)
+    return (
+        str(row["algorithm"]),
+        int(row["max_floors"]),
+        int(row["seed"]),
+        int(row["lifts"]),
+        str(row.get("dispatch") or DEFAULT_DISPATCH),
+        int(row.get("reassign_every") or 0),
+        str(row["profile"]),
+        float(row["arrival_rate"]),
+        int(row["ticks"]),
+        int(row["drain_ticks"]),
+    )
+
+
+def read_completed(path: str) -> set[tuple]:
+    """Keys of runs already present in an output file."""
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, newline="") as f:
+        if _is_jsonl(path):
+            rows: Iterable[dict] = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        return {run_key(row) for row in rows}
+
+
+def run_sweep(
+    specs: list[dict], output: str, workers: int = 1, resume: bool = False
+) -> Iterator[dict]:
+    """
+    Run every spec not already in `output`, appending each result as it finishes.
+    Yields result rows in completion order.
+    """
+    jsonl = _is_jsonl(output)
+    appending = resume and os.path.exists(output)
+    write_header = not appending and not jsonl
+    # Keep an existing CSV's columns, which may predate newer result fields
+    fieldnames = _csv_header(output) if appending and not jsonl else None
+    if fieldnames is not None and not set(KEY_FIELDS) <= set(fieldnames):
+        raise ValueError(
+            f"{output} lacks columns that identify runs "
+            f"({', '.join(sorted(set(KEY_FIELDS) - set(fieldnames)))}); write a new file"
+        )
+    done = read_completed(output) if resume else set()
+    pending = [spec for spec in specs if run_key(spec) not in done]
+
+    with open(output, "a" if resume else "w", newline="") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=fieldnames or RESULT_FIELDS, extrasaction="ignore"
+        )
+        if write_header:
+            writer.writeheader()
+
+        for row in _execute(pending, workers):
+            if jsonl:
+                f.write(json.dumps(row) + "\n")
+            else:
+                writer.writerow(row)
+            f.flush()
+            yield row
+
+
+def _execute(specs: list[dict], workers: int) -> Iterator[dict]:
+    """Run specs inline or across a process pool, yielding results as they complete."""
+    if workers <= 1:
+        for spec in specs:
+            yield run_one(spec)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_one, spec) for spec in specs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _csv_header(path: str) -> list[str] | None:
+    with open(path, newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def _is_jsonl(path: str) -> bool:
+    return path.endswith((".jsonl", ".ndjson"))
+
+
+def _int_list(values: list[str]) -> list[int]:
+    """Parse ints and inclusive ranges like `0-9`."""
+    result: list[int] = []
+    for value in values:
+        low, sep, high = value.partition("-")
+        result.extend(range(int(low), int(high) + 1) if sep else [int(value)])
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Console entry point."""
+    parser = argparse.ArgumentParser(description="Run a lift simulation parameter sweep.")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHM_REGISTRY))
+    parser.add_argument("--floors", nargs="+", default=["10"], help="max_floors values")
+    parser.add_argument("--seeds", nargs="+", default=["0"], help="seeds or ranges, e.g. 0-9")
+    parser.add_argument("--lifts", nargs="+", default=["2"], help="lifts per building")
+    parser.add_argument(
+        "--dispatch", nargs="+", choices=list(DISPATCH_REGISTRY), default=[DEFAULT_DISPATCH]
+    )
+    parser.add_argument(
+        "--reassign-every", nargs="+", default=["0"], help="ticks between reassignments, 0 = off"
+    )
+    parser.add_argument("--ticks", type=int, default=1000, help="ticks with arrivals")
+    parser.add_argument("--drain-ticks", type=int, default=1000, help="max ticks to finish")
+    parser.add_argument("--arrival-rate", type=float, default=0.3, help="passengers per tick")
+    parser.add_argument("--profile", choices=list(TRAFFIC_PROFILES), default="inter_floor")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--resume", action="store_true", help="skip runs already in output")
+    parser.add_argument("-o", "--output", default="sweep.csv", help=".csv or .jsonl file")
+    args = parser.parse_args(argv)
+
+    unknown = sorted(set(args.algorithms) - set(ALGORITHM_REGISTRY))
+    if unknown:
+        parser.error(f"unknown algorithms: {', '.join(unknown)}")
+    lifts = _int_list(args.lifts)
+    if not all(1 <= count <= MAX_LIFTS for count in lifts):
+        parser.error(f"lift counts must be between 1 and {MAX_LIFTS}")
+
+    specs = build_grid(
+        args.algorithms,
+        _int_list(args.floors),
+        _int_list(args.seeds),
+        lifts,
+        ticks=args.ticks,
+        arrival_rate=args.arrival_rate,
+        drain_ticks=args.drain_ticks,
+        profile=args.profile,
+        dispatchers=args.dispatch,
+        reassign_intervals=_int_list(args.reassign_every),
+    )
+    try:
+        for count, row in enumerate(
+            run_sweep(specs, args.output, args.workers, args.resume), 1
+        ):
+            print(
+                f"[{count}] {row['algorithm']}/{row['dispatch']} floors={row['max_floors']} "
+                f"lifts={row['lifts']} seed={row['seed']} "
+                f"avg_total={row['avg_total']:.2f}",
+                file=sys.stderr,
+            )
+    except ValueError as e:
+        print(f"lift-sweep: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+Benchmark suite - scaling curves for the simulation core and API hot paths.
+Run with `python -m benchmarks`; see benchmarks/__main__.py for options.
+"""
@@ -0,0 +1,98 @@
+"""
+Benchmark runner - times every registered benchmark, writes the results as
+JSON and compares them against a stored baseline.
+
+Example:
+    python -m benchmarks --quick --filter "lift.*" -o results.json
+    python -m benchmarks --threshold 0.1 --threshold-for "ws.*=0.3"
+"""
+import argparse
+import os
+import sys
+
+from benchmarks import bench_api, bench_core  # noqa: F401  (registers benchmarks)
+from benchmarks.harness import (
+    BENCHMARKS,
+    DEFAULT_THRESHOLD,
+    compare,
+    format_comparison,
+    load_results,
+    print_result,
+    run_benchmarks,
+    save_results,
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def _threshold_override(value: str) -> tuple[str, float]:
+    pattern, sep, threshold = value.partition("=")
+    try:
+        if not sep or not pattern:
+            raise ValueError
+        return pattern, float(threshold)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=THRESHOLD, got {value!r}") from None
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Exits with 1 if any case regressed past its threshold."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Run the lift simulation benchmarks."
+    )
+    parser.add_argument(
+        "--filter", nargs="+", default=[], metavar="PATTERN", help="benchmark names to run"
+    )
+    parser.add_argument("--quick", action="store_true", help="two smallest sizes per parameter")
+    parser.add_argument("--repeats", type=int, default=5, help="timed rounds per case")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare with")
+    parser.add_argument("--no-compare", action="store_true", help="skip the baseline comparison")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="overwrite the baseline with these results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed increase in time per op, e.g. 0.15 for 15%%",
+    )
+    parser.add_argument(
+        "--threshold-for",
+        type=_threshold_override,
+        action="append",
+        default=[],
+        metavar="NAME=THRESHOLD",
+        help="per-benchmark threshold, NAME may be a glob",
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in BENCHMARKS.values():
+            print(f"{bench.name:<28} {bench.unit:<6} {bench.params}")
+        return 0
+
+    results = run_benchmarks(args.filter, args.quick, args.repeats, progress=print_result)
+    if args.output:
+        save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        return 0
+    if args.no_compare or not os.path.exists(args.baseline):
+        return 0
+
+    try:
+        baseline = load_results(args.baseline)
+    except (OSError, ValueError) as e:
+        print(f"benchmarks: {e}", file=sys.stderr)
+        return 2
+    rows = compare(results, baseline, args.threshold, dict(args.threshold_for))
+    # Cases filtered out of this run are not missing
+    rows = [row for row in rows if row["status"] != "missing" or not (args.filter or args.quick)]
+    print(format_comparison(rows))
+    return 1 if any(row["status"] == "regressed" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+API hot path benchmarks - state encoding, GET /state, WebSocket publishing
+and autoplay ticks as lifts, viewers and sessions grow.
+"""
+import asyncio
+import random
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.api import websocket
+from app.api.protocol import JSON_FORMAT, MSGPACK_FORMAT, available_formats, encoded_state
+from app.api.websocket import ConnectionManager, Subscriber
+from app.core.building import BuildingController
+from app.core.sessions import SessionManager
+from app.main import app
+from benchmarks.harness import benchmark
+
+
+class NullSocket:
+    """Accepts frames and drops them, so only the server side is measured."""
+
+    async def send_text(self, text: str) -> None:
+        pass
+
+    async def send_bytes(self, data: bytes) -> None:
+        pass
+
+
+def _load(controller, passengers: int, max_floors: int = 20) -> None:
+    rng = random.Random(0)
+    controller.add_requests([
+        (f"P{i}", rng.randint(0, max_floors), rng.randint(0, max_floors))
+        for i in range(passengers)
+    ])
+
+
+def _isolated_sessions(max_sessions: int):
+    """
+    Swap the WebSocket layer onto a private session store and connection
+    manager, returning a function that puts the originals back.
+    """
+    saved = websocket.session_manager, websocket.manager
+    websocket.session_manager = SessionManager(max_sessions=max_sessions, spill_after_s=0)
+    websocket.manager = ConnectionManager()
+
+    def restore():
+        websocket.session_manager, websocket.manager = saved
+
+    return websocket.session_manager, websocket.manager, restore
+
+
+def _watch(connections: ConnectionManager, session_id: str, viewers: int) -> None:
+    """Attach `viewers` subscribers; must run inside the event loop."""
+    stream = connections._ensure_stream(session_id)
+    assert stream is not None
+    sockets = connections.active_connections.setdefault(session_id, {})
+    for _ in range(viewers):
+        socket = NullSocket()
+        sockets[socket] = Subscriber(  # type: ignore[index]
+            socket, stream, lambda sub: connections._reap(session_id, sub)  # type: ignore[arg-type]
+        )
+
+
+# === State ===
+
+@benchmark(
+    "api.encode_state",
+    {"lifts": [2, 8, 32], "format": [f for f in (JSON_FORMAT, MSGPACK_FORMAT)
+                                     if f in available_formats()]},
+    100,
+)
+def encode_state(lifts, format):
+    building = BuildingController(max_floors=20, num_lifts=lifts)
+    _load(building, 20 * lifts)
+
+    def encode():
+        # A new version forces the state to be rebuilt and re-encoded, as after every tick
+        building.version += 1
+        encoded_state(building, "single").encode(format)
+
+    yield encode
+
+
+@benchmark("api.get_state", {"lifts": [2, 8, 32]}, 100)
+def get_state(lifts):
+    with TestClient(app) as client:
+        session_id = client.post("/api/create-session", json={"num_lifts": lifts}).json()[
+            "session_id"
+        ]
+        lines = "".join(
+            f'{{"passenger_id": "P{i}", "from_level": {i % 10}, "to_level": {(i * 7) % 10}}}\n'
+            for i in range(20 * lifts)
+        )
+        client.post(
+            f"/api/{session_id}/add-passengers",
+            content=lines.encode(),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        client.post(f"/api/{session_id}/move", params={"ticks": 5})
+
+        def fetch():
+            client.post(f"/api/{session_id}/move")
+            client.get(f"/api/{session_id}/state")
+
+        yield fetch
+
+
+# === WebSocket ===
+
+@benchmark("ws.publish", {"viewers": [1, 10, 100]}, 50)
+def ws_publish(viewers):
+    """One tick of a watched session: step, diff, encode and queue for every viewer."""
+    sessions, connections, restore = _isolated_sessions(10)
+    loop = asyncio.new_event_loop()
+    try:
+        session_id = sessions.create_session(num_lifts=4, max_floors=20)
+        _load(sessions.get_controller(session_id), 80)
+
+        async def setup():
+            _watch(connections, session_id, viewers)
+            await asyncio.sleep(0)
+
+        async def tick():
+            sessions.get_controller(session_id).step()
+            await connections.publish(session_id)
+            # Let every writer send its frame
+            await asyncio.sleep(0)
+
+        loop.run_until_complete(setup())
+        yield lambda: loop.run_until_complete(tick())
+    finally:
+        for subscribers in connections.active_connections.values():
+            for subscriber in subscribers.values():
+                subscriber.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        restore()
+
+
+@benchmark("sessions.autoplay_tick", {"sessions": [10, 100, 1000]}, 10, "ops/s")
+def autoplay_tick(sessions):
+    """Session-ticks per second of the autoplay loop, one viewer per session."""
+    store, connections, restore = _isolated_sessions(sessions)
+    loop = asyncio.new_event_loop()
+    try:
+        session_ids = [store.create_session(max_floors=20) for _ in range(sessions)]
+        for session_id in session_ids:
+            _load(store.get_controller(session_id), 10)
+
+        async def setup():
+            for session_id in session_ids:
+                _watch(connections, session_id, 1)
+            await asyncio.sleep(0)
+
+        async def tick():
+            await websocket.autoplay_tick(session_ids)
+            await asyncio.sleep(0)
+
+        loop.run_until_complete(setup())
+        yield (lambda: loop.run_until_complete(tick())), sessions
+    finally:
+        for subscribers in connections.active_connections.values():
+            for subscriber in subscribers.values():
+                subscriber.close()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+        restore()
+
+
+# === Sessions ===
+
+@benchmark("sessions.get_controller", {"sessions": [100, 1000]}, 1000)
+def get_controller(sessions):
+    store = SessionManager(max_sessions=sessions, spill_after_s=0)
+    session_ids = [store.create_session() for _ in range(sessions)]
+    rng = random.Random(0)
+    lookups = [rng.choice(session_ids) for _ in range(1000)] + [str(uuid4())]
+    position = iter(range(10**9))
+
+    def lookup():
+        store.get_controller(lookups[next(position) % len(lookups)])
+
+    yield lookup
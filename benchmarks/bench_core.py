@@ -0,0 +1,91 @@
+"""
+Simulation core benchmarks - lift and building hot paths as floors, pending
+passengers and lift counts grow.
+"""
+import random
+from itertools import count
+
+from app.core.building import BuildingController
+from app.core.lift import LiftController
+from benchmarks.harness import benchmark
+
+
+def _requests(rng: random.Random, n: int, max_floors: int, prefix: str = "P") -> list:
+    return [
+        (f"{prefix}{i}", rng.randint(0, max_floors), rng.randint(0, max_floors)) for i in range(n)
+    ]
+
+
+def _lift(floors: int, pending: int) -> LiftController:
+    lift = LiftController(max_floors=floors)
+    lift.add_requests(_requests(random.Random(0), pending, floors))
+    return lift
+
+
+def _building(lifts: int, pending: int, floors: int = 50, dispatch: str = "nearest"):
+    building = BuildingController(max_floors=floors, num_lifts=lifts, dispatch=dispatch)
+    building.add_requests(_requests(random.Random(0), pending, floors))
+    return building
+
+
+# === Lift ===
+
+# 50 ticks serve few of the pending passengers, so every call sees about `pending`
+@benchmark("lift.step", {"floors": [10, 50, 200], "pending": [10, 100, 1000]}, 50, "ops/s")
+def lift_step(floors, pending):
+    yield _lift(floors, pending).step
+
+
+@benchmark("lift.move", {"pending": [10, 100, 1000]}, 50, "ops/s")
+def lift_move(pending):
+    yield _lift(50, pending).move
+
+
+@benchmark("lift.add_request", {"pending": [0, 100, 1000, 10000]}, 500)
+def lift_add_request(pending):
+    lift = _lift(50, pending)
+    rng = random.Random(1)
+    ids = count()
+
+    def add():
+        lift.add_request(f"N{next(ids)}", rng.randint(0, 50), rng.randint(0, 50))
+
+    yield add
+
+
+@benchmark("lift.update_direction", {"floors": [10, 50, 200], "pending": [10, 1000]}, 1000)
+def lift_update_direction(floors, pending):
+    lift = _lift(floors, pending)
+    lift.current_level = floors // 2
+    yield lift._update_direction
+
+
+# === Building ===
+
+@benchmark("building.step", {"lifts": [2, 8, 32], "pending": [100, 1000]}, 30, "ops/s")
+def building_step(lifts, pending):
+    yield _building(lifts, pending).step
+
+
+@benchmark("building.add_request", {"lifts": [2, 8, 32], "dispatch": ["nearest", "eta"]}, 300)
+def building_add_request(lifts, dispatch):
+    building = _building(lifts, 20 * lifts, dispatch=dispatch)
+    rng = random.Random(1)
+    ids = count()
+
+    def add():
+        building.add_request(f"N{next(ids)}", rng.randint(0, 50), rng.randint(0, 50))
+
+    yield add
+
+
+@benchmark("building.get_state", {"lifts": [2, 8, 32], "pending": [100, 1000]}, 100)
+def building_get_state(lifts, pending):
+    building = _building(lifts, pending)
+
+    def rebuild():
+        # A new version forces a rebuild, as after every tick
+        building.version += 1
+        building.get_state()
+
+    yield rebuild
@@ -0,0 +1,220 @@
+"""
+Benchmark harness - registry, timing, result files and baseline comparison.
+A benchmark is a generator function taking one value per parameter: it sets
+up fresh state, yields a zero-argument operation (or an (operation, ops)
+pair when one call performs `ops` units of work, e.g. one tick of many
+sessions) and cleans up when closed. Every combination of parameter values
+is timed separately, giving a scaling curve per benchmark.
+"""
+import fnmatch
+import gc
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable, Iterator
+from itertools import product
+
+Factory = Callable[..., Iterator]
+
+# Default allowed increase in time per op before a case counts as a regression
+DEFAULT_THRESHOLD: float = 0.15
+RESULTS_VERSION: int = 1
+
+
+class Benchmark:
+    """A registered benchmark and the parameter grid it is timed over."""
+
+    def __init__(
+        self, name: str, factory: Factory, params: dict[str, list], number: int, unit: str
+    ) -> None:
+        self.name: str = name
+        self.factory: Factory = factory
+        self.params: dict[str, list] = params
+        # Calls per timed repeat; kept small where calls change the state they measure
+        self.number: int = number
+        # "ops/s" for throughput (higher is better), "us" for cost per op (lower is better)
+        self.unit: str = unit
+
+    def cases(self, quick: bool = False) -> list[dict]:
+        """Parameter combinations, only the two smallest values of each when quick."""
+        names = list(self.params)
+        values = [self.params[name][:2] if quick else self.params[name] for name in names]
+        return [dict(zip(names, combo, strict=True)) for combo in product(*values)]
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(
+    name: str, params: dict[str, list] | None = None, number: int = 100, unit: str = "us"
+) -> Callable[[Factory], Factory]:
+    """Register a benchmark factory under `name`."""
+    if unit not in ("us", "ops/s"):
+        raise ValueError(f"Unknown unit {unit!r}")
+
+    def register(factory: Factory) -> Factory:
+        BENCHMARKS[name] = Benchmark(name, factory, params or {}, number, unit)
+        return factory
+
+    return register
+
+
+def case_id(name: str, params: dict) -> str:
+    """Stable identity of one benchmark case, e.g. lift.step[floors=50,pending=100]."""
+    if not params:
+        return name
+    return f"{name}[{','.join(f'{key}={value}' for key, value in sorted(params.items()))}]"
+
+
+def time_case(bench: Benchmark, params: dict, repeats: int) -> dict:
+    """
+    Time one case: `repeats` rounds of `number` calls, each round on fresh
+    state. The fastest round is reported, as the one least disturbed by noise.
+    """
+    best = float("inf")
+    ops_per_call = 1
+    for _ in range(repeats):
+        setup = bench.factory(**params)
+        try:
+            prepared = next(setup)
+            op, ops_per_call = prepared if isinstance(prepared, tuple) else (prepared, 1)
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(bench.number):
+                op()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            setup.close()
+
+    per_op = best / (bench.number * ops_per_call)
+    return {
+        "id": case_id(bench.name, params),
+        "name": bench.name,
+        "params": params,
+        "unit": bench.unit,
+        "value": 1 / per_op if bench.unit == "ops/s" else per_op * 1e6,
+        "per_op_us": per_op * 1e6,
+        "calls": bench.number,
+        "repeats": repeats,
+    }
+
+
+def run_benchmarks(
+    patterns: list[str] | None = None,
+    quick: bool = False,
+    repeats: int = 5,
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """Run every registered benchmark whose name matches one of `patterns`."""
+    results = []
+    for bench in BENCHMARKS.values():
+        if patterns and not any(fnmatch.fnmatch(bench.name, pattern) for pattern in patterns):
+            continue
+        for params in bench.cases(quick):
+            result = time_case(bench, params, repeats)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "quick": quick,
+        "results": results,
+    }
+
+
+def load_results(path: str) -> dict:
+    """Read a results file. Raises ValueError for files this version cannot compare."""
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} is not a version {RESULTS_VERSION} benchmark results file")
+    return data
+
+
+def save_results(data: dict, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def threshold_for(name: str, default: float, overrides: dict[str, float]) -> float:
+    """Threshold of the last override pattern matching `name`, else `default`."""
+    threshold = default
+    for pattern, value in overrides.items():
+        if fnmatch.fnmatch(name, pattern):
+            threshold = value
+    return threshold
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    overrides: dict[str, float] | None = None,
+) -> list[dict]:
+    """
+    Compare two results files case by case. `slowdown` is the relative
+    increase in time per op, whatever the unit (-0.2 means 20% less time);
+    a case regresses when it exceeds its threshold and improves when below
+    minus it. Cases only in `current` are "new"; cases only in the baseline
+    are "missing".
+    """
+    overrides = overrides or {}
+    base = {result["id"]: result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = base.pop(result["id"], None)
+        if before is None:
+            rows.append({"id": result["id"], "status": "new", "value": result["value"]})
+            continue
+
+        # Time per op is comparable across units and never zero
+        slowdown = result["per_op_us"] / before["per_op_us"] - 1
+        limit = threshold_for(result["name"], threshold, overrides)
+        if slowdown > limit:
+            status = "regressed"
+        elif slowdown < -limit:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({
+            "id": result["id"],
+            "status": status,
+            "unit": result["unit"],
+            "baseline": before["value"],
+            "value": result["value"],
+            "slowdown": slowdown,
+            "threshold": limit,
+        })
+    rows.extend({"id": case, "status": "missing"} for case in base)
+    return rows
+
+
+def format_comparison(rows: list[dict]) -> str:
+    """Plain-text table of a comparison, one case per line."""
+    lines = []
+    width = max((len(row["id"]) for row in rows), default=0)
+    for row in rows:
+        if "slowdown" in row:
+            detail = (
+                f"{row['baseline']:>12.2f} -> {row['value']:>12.2f} {row['unit']:<5} "
+                f"{row['slowdown']:+7.1%} time (limit {row['threshold']:.0%})"
+            )
+        elif "value" in row:
+            detail = f"{row['value']:>12.2f}"
+        else:
+            detail = ""
+        lines.append(f"{row['status']:<9} {row['id']:<{width}} {detail}".rstrip())
+    return "\n".join(lines)
+
+
+def print_result(result: dict) -> None:
+    print(f"{result['id']:<60} {result['value']:>14.2f} {result['unit']}", file=sys.stderr)
@@ -38,7 +38,6 @@ function App() {
             algorithm1={simulation.algorithm1}
             algorithm2={simulation.algorithm2}
             onReconnect={simulation.reconnect}
-            onRefreshState={simulation.refreshState}
             addLog={simulation.addLog}
           />
 
@@ -19,11 +19,11 @@ export async function createSession(algorithm = 'scan', max_floors = 10) {
     return response.json();
 }
 
-export async function createComparisonSession(algo1 = 'scan', algo2 = 'scan', max_floors = 10) {
+export async function createComparisonSession(algo1 = 'scan', algo2 = 'scan', max_floors = 10, num_lifts = 2) {
     const response = await fetch(`${API_URL}/api/create-comparison`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ algorithm1: algo1, algorithm2: algo2, max_floors })
+        body: JSON.stringify({ algorithm1: algo1, algorithm2: algo2, max_floors, num_lifts })
     });
     return response.json();
 }
@@ -42,11 +42,29 @@ export async function addPassenger(sessionId, passengerId, fromLevel, toLevel) {
     return response.json();
 }
 
+export async function addPassengers(sessionId, passengers) {
+    const response = await fetch(`${API_URL}/api/${sessionId}/add-passengers`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(passengers)
+    });
+    return response.json();
+}
+
 export async function moveLift(sessionId) {
     const response = await fetch(`${API_URL}/api/${sessionId}/move`, { method: 'POST' });
     return response.json();
 }
 
+export async function setAutoplay(sessionId, enabled, intervalMs) {
+    const response = await fetch(`${API_URL}/api/${sessionId}/autoplay`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ enabled, interval_ms: intervalMs })
+    });
+    return response.json();
+}
+
 export function createWebSocket(sessionId, onMessage, onOpen, onClose, onError) {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const wsUrl = API_URL.replace(/^http/, 'ws') || `${protocol}//${window.location.host}`;
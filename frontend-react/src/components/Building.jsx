@@ -1,11 +1,13 @@
 import { calculateLiftPosition } from '../utils/liftPosition';
 import './Building.css';
 
+// Lift colours cycle through .lift-0 ... .lift-5 (and matching badge classes)
+const LIFT_COLOR_COUNT = 6;
+
 export default function Building({ building, label }) {
     if (!building) return <div className="building-placeholder">Loading...</div>;
 
-    const liftA = building.lift_a || {};
-    const liftB = building.lift_b || {};
+    const lifts = building.lifts || [];
     const maxFloors = building.max_floors ?? 10;
 
     // Dynamic height calculation
@@ -13,43 +15,28 @@ export default function Building({ building, label }) {
     const liftHeight = floorHeight - 4;
     const fontSize = Math.max(8, Math.min(12, floorHeight * 0.4));
     const badgeFontSize = Math.max(6, Math.min(10, floorHeight * 0.35));
+    const shaftWidth = Math.max(14, Math.min(32, 192 / Math.max(1, lifts.length)));
 
     const floors = [];
     for (let i = maxFloors; i >= 0; i--) {
-        const stopsA = liftA.stops?.[i] || [];
-        const stopsB = liftB.stops?.[i] || [];
-
         floors.push(
             <div key={i} className="floor" style={{ height: `${floorHeight}px`, fontSize: `${fontSize}px` }}>
                 <div className="floor-number">{i}</div>
                 <div className="floor-content">
-                    {stopsA.map(s => (
-                        <span
-                            key={s.passenger_id}
-                            className={`badge ${s.type === 'pickup' ? 'badge-a' : 'badge-exit'}`}
-                            style={{ fontSize: `${badgeFontSize}px`, padding: floorHeight < 20 ? '0 2px' : '2px 5px' }}
-                        >
-                            {s.passenger_id.replace(/_[AB]$/, '')}
-                        </span>
-                    ))}
-                    {stopsB.map(s => (
+                    {lifts.flatMap((lift, index) => (lift.stops?.[i] || []).map(s => (
                         <span
                             key={s.passenger_id}
-                            className={`badge ${s.type === 'pickup' ? 'badge-b' : 'badge-exit'}`}
+                            className={`badge ${s.type === 'pickup' ? `badge-${index % LIFT_COLOR_COUNT}` : 'badge-exit'}`}
                             style={{ fontSize: `${badgeFontSize}px`, padding: floorHeight < 20 ? '0 2px' : '2px 5px' }}
                         >
-                            {s.passenger_id.replace(/_[AB]$/, '')}
+                            {s.passenger_id.replace(/_[A-Z]+$/, '')}
                         </span>
-                    ))}
+                    )))}
                 </div>
             </div>
         );
     }
 
-    // Use utility function for position calculation
-    const liftABottom = calculateLiftPosition(liftA.level || 0, floorHeight);
-    const liftBBottom = calculateLiftPosition(liftB.level || 0, floorHeight);
-
     return (
         <div className="building">
             <div className="building-header">
@@ -57,22 +44,25 @@ export default function Building({ building, label }) {
                 <span className="building-algo">{building.algorithm?.toUpperCase() || 'SCAN'}</span>
             </div>
             <div className="building-body">
-                <div className="shaft">
+                {lifts.map((lift, index) => (
                     <div
-                        className="lift lift-a"
-                        style={{ bottom: `${liftABottom}px`, height: `${liftHeight}px` }}
+                        key={lift.name ?? index}
+                        className="shaft"
+                        style={{ width: `${shaftWidth}px` }}
+                        title={`Lift ${lift.name ?? index + 1}`}
                     >
-                        {liftA.passengers?.length || 0}
-                    </div>
-                </div>
-                <div className="shaft">
-                    <div
-                        className="lift lift-b"
-                        style={{ bottom: `${liftBBottom}px`, height: `${liftHeight}px` }}
-                    >
-                        {liftB.passengers?.length || 0}
+                        <div
+                            className={`lift lift-${index % LIFT_COLOR_COUNT}`}
+                            style={{
+                                // Use utility function for position calculation
+                                bottom: `${calculateLiftPosition(lift.level || 0, floorHeight)}px`,
+                                height: `${liftHeight}px`
+                            }}
+                        >
+                            {lift.passengers?.length || 0}
+                        </div>
                     </div>
-                </div>
+                ))}
                 <div className="floors">
                     {floors}
                 </div>
@@ -1,5 +1,5 @@
 import { useState, useEffect, useRef } from 'react';
-import { addPassenger, moveLift } from '../api';
+import { addPassenger, setAutoplay } from '../api';
 import './Controls.css';
 
 export default function Controls({
@@ -10,12 +10,12 @@ export default function Controls({
     algorithm1,
     algorithm2,
     onReconnect,
-    onRefreshState,
     addLog
 }) {
     const [selectedAlgo1, setSelectedAlgo1] = useState(algorithm1);
     const [selectedAlgo2, setSelectedAlgo2] = useState(algorithm2);
     const [numLevels, setNumLevels] = useState(config?.max_floors ?? 10);
+    const [numLifts, setNumLifts] = useState(config?.num_lifts ?? 2);
     const [spawnRate, setSpawnRate] = useState(0.5); // Passengers per second
     const [realisticMode, setRealisticMode] = useState(true);
 
@@ -26,7 +26,7 @@ export default function Controls({
     // Use useRef for passenger counter (React-safe)
     const passengerNumRef = useRef(1);
     const autoModeRef = useRef(null);
-    const autoMoveRef = useRef(null);
+    const autoplayOnRef = useRef(false);
 
 
     const generatePassengerId = () => {
@@ -64,43 +64,42 @@ export default function Controls({
                     await addPassenger(sessionId, pid, from, to);
                     addLog(`Added ${pid}: ${from}→${to}`);
                     setPassengersAdded(prev => prev + 1);
-                    onRefreshState();
                 } catch (err) {
                     addLog(`Error: ${err.message}`);
                 }
             }, passengerInterval);
 
-            autoMoveRef.current = setInterval(async () => {
-                try {
-                    await moveLift(sessionId);
-                    onRefreshState();
-                } catch (err) {
-                    addLog(`Move error: ${err.message}`);
-                }
-            }, moveInterval);
+            // Ticks run on the server; state arrives over the WebSocket
+            autoplayOnRef.current = true;
+            setAutoplay(sessionId, true, moveInterval)
+                .catch(err => addLog(`Move error: ${err.message}`));
 
             addLog(`Auto mode started (${speed}x)`);
         } else {
             if (autoModeRef.current) clearInterval(autoModeRef.current);
-            if (autoMoveRef.current) clearInterval(autoMoveRef.current);
+            if (autoplayOnRef.current && sessionId) {
+                autoplayOnRef.current = false;
+                setAutoplay(sessionId, false)
+                    .catch(err => addLog(`Move error: ${err.message}`));
+            }
         }
 
         return () => {
             if (autoModeRef.current) clearInterval(autoModeRef.current);
-            if (autoMoveRef.current) clearInterval(autoMoveRef.current);
         };
-    }, [autoMode, speed, sessionId, addLog, onRefreshState, numLevels, spawnRate, realisticMode]);
+    }, [autoMode, speed, sessionId, addLog, numLevels, spawnRate, realisticMode]);
 
     const handleReconnect = () => {
         setAutoMode(false);
         passengerNumRef.current = 1;
         setPassengersAdded(0);
-        onReconnect(selectedAlgo1, selectedAlgo2, numLevels);
+        onReconnect(selectedAlgo1, selectedAlgo2, numLevels, numLifts);
     };
 
     const hasChanges = selectedAlgo1 !== algorithm1 ||
         selectedAlgo2 !== algorithm2 ||
-        numLevels !== (config?.max_floors ?? 10);
+        numLevels !== (config?.max_floors ?? 10) ||
+        numLifts !== (config?.num_lifts ?? 2);
 
     return (
         <div className="controls">
@@ -119,6 +118,17 @@ export default function Controls({
                     />
                 </div>
 
+                <div className="control-group">
+                    <label>Lifts per Building: {numLifts}</label>
+                    <input
+                        type="range"
+                        min="1"
+                        max="12"
+                        value={numLifts}
+                        onChange={e => setNumLifts(parseInt(e.target.value))}
+                    />
+                </div>
+
                 <div className="control-group">
                     <label>Passenger Rate: {spawnRate}/s</label>
                     <input
@@ -1,17 +1,19 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { createComparisonSession, getState, getAlgorithms, getConfig, createWebSocket } from './api';
+import { applyDelta } from './utils/stateDelta';
 
 export function useLiftSimulation() {
     const [sessionId, setSessionId] = useState(null);
     const [state, setState] = useState(null);
     const [algorithms, setAlgorithms] = useState([]);
-    const [config, setConfig] = useState({ max_floors: 10, min_floor: 0 });
+    const [config, setConfig] = useState({ max_floors: 10, min_floor: 0, num_lifts: 2 });
     const [algorithm1, setAlgorithm1] = useState('scan');
     const [algorithm2, setAlgorithm2] = useState('scan');
     const [isConnected, setIsConnected] = useState(false);
     const [logs, setLogs] = useState([]);
     const wsRef = useRef(null);
     const sessionIdRef = useRef(null);
+    const seqRef = useRef(null);
 
     const addLog = useCallback((message) => {
         const time = new Date().toLocaleTimeString();
@@ -51,13 +53,29 @@ export function useLiftSimulation() {
         }
     }, []);
 
-    const connect = useCallback(async (algo1 = 'scan', algo2 = 'scan', max_floors = 10) => {
+    // Snapshots replace state; deltas apply on top of the matching sequence number
+    const handleMessage = useCallback((message) => {
+        if (message.type === 'snapshot') {
+            seqRef.current = message.seq;
+            setState(message.data);
+        } else if (message.type === 'delta') {
+            if (message.base_seq !== seqRef.current) {
+                seqRef.current = null;
+                wsRef.current?.send('resync');
+                return;
+            }
+            seqRef.current = message.seq;
+            setState(prev => applyDelta(prev, message.changes));
+        }
+    }, []);
+
+    const connect = useCallback(async (algo1 = 'scan', algo2 = 'scan', max_floors = 10, num_lifts = 2) => {
         try {
             if (wsRef.current) {
                 wsRef.current.close();
             }
 
-            const data = await createComparisonSession(algo1, algo2, max_floors);
+            const data = await createComparisonSession(algo1, algo2, max_floors, num_lifts);
             setSessionId(data.session_id);
             sessionIdRef.current = data.session_id;
             setAlgorithm1(algo1);
@@ -65,11 +83,15 @@ export function useLiftSimulation() {
             if (data.max_floors) {
                 setConfig(prev => ({ ...prev, max_floors: data.max_floors }));
             }
+            if (data.num_lifts) {
+                setConfig(prev => ({ ...prev, num_lifts: data.num_lifts }));
+            }
             addLog(`Session created: ${data.session_id}`);
 
+            seqRef.current = null;
             wsRef.current = createWebSocket(
                 data.session_id,
-                () => refreshState(data.session_id),
+                handleMessage,
                 () => {
                     addLog('Connected');
                     setIsConnected(true);
@@ -80,15 +102,13 @@ export function useLiftSimulation() {
                 },
                 () => addLog('WebSocket error')
             );
-
-            refreshState(data.session_id);
         } catch (error) {
             addLog(`Failed to connect: ${error.message}`);
         }
-    }, [addLog, refreshState]);
+    }, [addLog, handleMessage]);
 
-    const reconnect = useCallback((algo1, algo2, max_floors) => {
-        connect(algo1, algo2, max_floors);
+    const reconnect = useCallback((algo1, algo2, max_floors, num_lifts) => {
+        connect(algo1, algo2, max_floors, num_lifts);
     }, [connect]);
 
     return {
@@ -0,0 +1,68 @@
+/**
+ * Apply server state deltas (see app/api/websocket.py) to the last snapshot.
+ */
+
+// Lists of passenger records the server diffs by passenger_id
+const PASSENGER_LIST_KEYS = new Set(['active_passengers']);
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+/**
+ * Apply upserted and removed passenger records to a passenger list.
+ * @param {Array} passengers - Current passenger records
+ * @param {{upsert: Array, removed: Array}} changes - Passenger changes
+ * @returns {Array} New passenger list
+ */
+function applyPassengerChanges(passengers, { upsert = [], removed = [] }) {
+    const removedIds = new Set(removed);
+    const updates = new Map(upsert.map(p => [p.passenger_id, p]));
+    const result = [];
+    for (const p of passengers) {
+        if (removedIds.has(p.passenger_id)) continue;
+        result.push(updates.get(p.passenger_id) || p);
+        updates.delete(p.passenger_id);
+    }
+    return result.concat([...updates.values()]);
+}
+
+/**
+ * Patch list items by position, e.g. {"1": {level: 4}} against the lifts list.
+ * @param {Array} items - Current items
+ * @param {object} changes - Changes keyed by position
+ * @returns {Array} New item list
+ */
+function applyItemChanges(items, changes) {
+    const result = [...items];
+    for (const [position, itemChanges] of Object.entries(changes)) {
+        result[Number(position)] = applyDelta(result[Number(position)], itemChanges);
+    }
+    return result;
+}
+
+/**
+ * Return a new state with a merge-patch style delta applied.
+ * Keys set to null are removed; nested objects are patched recursively and
+ * an object patch against a list patches the list by position.
+ * @param {object} state - Previous state
+ * @param {object} changes - Delta from the server
+ * @returns {object} Updated state (unchanged branches are shared)
+ */
+export function applyDelta(state, changes) {
+    const result = { ...(state || {}) };
+    for (const [key, value] of Object.entries(changes)) {
+        if (value === null) {
+            delete result[key];
+        } else if (PASSENGER_LIST_KEYS.has(key) && Array.isArray(result[key])) {
+            result[key] = applyPassengerChanges(result[key], value);
+        } else if (isPlainObject(value) && Array.isArray(result[key])) {
+            result[key] = applyItemChanges(result[key], value);
+        } else if (isPlainObject(value) && isPlainObject(result[key])) {
+            result[key] = applyDelta(result[key], value);
+        } else {
+            result[key] = value;
+        }
+    }
+    return result;
+}
@@ -8,6 +8,9 @@ from app.core.lift import LiftController
 from app.core.building import BuildingController
 from app.core.algorithms import get_available_algorithms, ALGORITHM_REGISTRY
 from app.core.config import MAX_FLOORS, MIN_FLOOR
+from app.core.stops import StopIndex
+from app.main import app
+from fastapi.testclient import TestClient
 
 
 class TestAlgorithmNoInfiniteWait:
@@ -164,6 +167,84 @@ class TestBuildingController:
         assert building.lift_b.get_load() == 0
 
 
+    def test_add_requests_matches_sequential_dispatch(self):
+        """Batch dispatch should assign and simulate exactly like single requests."""
+        rng = random.Random(21)
+        requests = [
+            (f"P{i:03d}", rng.randint(MIN_FLOOR, MAX_FLOORS), rng.randint(MIN_FLOOR, MAX_FLOORS))
+            for i in range(40)
+        ]
+        single = BuildingController(algorithm_name="scan")
+        batched = BuildingController(algorithm_name="scan")
+        single.lift_b.current_level = batched.lift_b.current_level = 6
+
+        for request in requests:
+            single.add_request(*request)
+        batched.add_requests(requests)
+
+        assert single.get_state() == batched.get_state()
+        assert single.run(80) == batched.run(80)
+
+    def test_scheduled_requests_arrive_on_their_tick(self):
+        """Scheduled requests should behave like add_request at that tick."""
+        scheduled = BuildingController(algorithm_name="scan")
+        scheduled.schedule_requests([(5, "P001", 3, 8), (0, "P002", 0, 4)])
+
+        manual = BuildingController(algorithm_name="scan")
+        manual.add_request("P002", 0, 4)
+        manual.run(5)
+        manual.add_request("P001", 3, 8)
+
+        scheduled.run(5)
+        assert scheduled.get_state() == manual.get_state()
+        assert not scheduled.scheduled
+
+    def test_bulk_endpoint_counts_added_and_scheduled_apart(self):
+        """Passengers due now and those queued for later are counted once each."""
+        client = TestClient(app)
+        session_id = client.post("/api/create-session").json()["session_id"]
+        response = client.post(f"/api/{session_id}/add-passengers", json=[
+            {"passenger_id": "P1", "from_level": 0, "to_level": 4},
+            {"passenger_id": "P2", "from_level": 2, "to_level": 5, "tick": 0},
+            {"passenger_id": "P3", "from_level": 3, "to_level": 1, "tick": 7},
+        ]).json()
+        assert (response["added"], response["scheduled"]) == (2, 1)
+
+    def test_state_memoized_until_change(self):
+        """get_state should reuse one snapshot until the next step or request."""
+        building = BuildingController(algorithm_name="scan")
+        first = building.get_state()
+        assert building.get_state() is first
+
+        building.add_request("P001", 0, 5)
+        second = building.get_state()
+        assert second is not first
+        assert [p["passenger_id"] for p in second["active_passengers"]] == ["P001_A"]
+
+        building.step()
+        assert building.get_state() is not second
+        assert building.get_state()["global_tick"] == 1
+
+    def test_stats_pooled_across_lifts(self):
+        """Building averages should pool both lifts' running sums."""
+        building = BuildingController(algorithm_name="scan")
+        for i in range(12):
+            building.add_request(f"P{i:03d}", i % 6, 10 - i % 6)
+        building.run(60)
+
+        lifts = (building.lift_a, building.lift_b)
+        completed = sum(lift.stats_counts["completed"] for lift in lifts)
+        picked_up = sum(lift.stats_counts["picked_up"] for lift in lifts)
+        stats = building.get_state()["stats"]
+        assert stats["completed"] == completed == 12
+        assert stats["avg_wait"] == pytest.approx(
+            sum(lift.stats_sums["wait_time"] for lift in lifts) / picked_up
+        )
+        assert stats["avg_total"] == pytest.approx(
+            sum(lift.stats_sums["total_time"] for lift in lifts) / completed
+        )
+
+
 class TestAlgorithmBehavior:
     """Test that each algorithm exhibits expected behavior."""
 
@@ -220,6 +301,29 @@ class TestLiftControllerIntegration:
         # get_load counts both, get_passenger_count only counts inside
         assert controller.get_passenger_count() == 2
 
+    def test_fulfillable_stops_track_full_rescan(self):
+        """Incremental fulfillable view should equal a full filter of stops every tick."""
+        rng = random.Random(11)
+        controller = LiftController(algorithm_name="scan")
+
+        for tick in range(300):
+            if tick % 3 == 0:
+                from_level = rng.randint(MIN_FLOOR, MAX_FLOORS)
+                to_level = rng.randint(MIN_FLOOR, MAX_FLOORS)
+                controller.add_request(f"P{tick:03d}", from_level, to_level)
+            controller.move()
+
+            expected = {
+                level: sorted(
+                    a for a in actions
+                    if a[0] == "pickup" or a[1] in controller.passengers
+                )
+                for level, actions in controller.stops.items()
+            }
+            expected = {level: actions for level, actions in expected.items() if actions}
+            actual = {level: sorted(actions) for level, actions in controller.fulfillable.items()}
+            assert actual == expected
+
     def test_get_distance_to_method(self):
         """get_distance_to should return correct distance."""
         controller = LiftController(algorithm_name="scan")
@@ -228,3 +332,79 @@ class TestLiftControllerIntegration:
         assert controller.get_distance_to(5) == 0
         assert controller.get_distance_to(0) == 5
         assert controller.get_distance_to(10) == 5
+
+
+class TestFastForward:
+    """Headless run() must match repeated move() calls."""
+
+    @pytest.fixture(params=list(ALGORITHM_REGISTRY.keys()))
+    def algorithm_name(self, request):
+        return request.param
+
+    def _load(self, controller):
+        rng = random.Random(7)
+        for i in range(30):
+            from_level = rng.randint(MIN_FLOOR, MAX_FLOORS)
+            to_level = rng.randint(MIN_FLOOR, MAX_FLOORS)
+            controller.add_request(f"P{i:03d}", from_level, to_level)
+
+    def test_lift_run_matches_moves(self, algorithm_name):
+        stepped = LiftController(algorithm_name=algorithm_name)
+        headless = LiftController(algorithm_name=algorithm_name)
+        self._load(stepped)
+        self._load(headless)
+
+        for _ in range(60):
+            expected = stepped.move()
+        result = headless.run(60)
+
+        for key in ("level", "direction", "passengers", "global_tick", "stats"):
+            assert result[key] == expected[key]
+        assert result["active_passengers"] == expected["active_passengers"]
+        assert result["run"]["ticks"] == 60
+
+    def test_building_run_matches_moves(self, algorithm_name):
+        stepped = BuildingController(algorithm_name=algorithm_name)
+        headless = BuildingController(algorithm_name=algorithm_name)
+        self._load(stepped)
+        self._load(headless)
+
+        for _ in range(60):
+            expected = stepped.move()
+        result = headless.run(60)
+        del result["run"]
+
+        assert result == expected
+
+
+class TestStopIndexDirection:
+    """Indexed pick_direction must agree with the dict-based pick_next_direction."""
+
+    @pytest.mark.parametrize("algorithm_name", list(ALGORITHM_REGISTRY.keys()))
+    def test_indexed_matches_dict(self, algorithm_name):
+        algorithm = ALGORITHM_REGISTRY[algorithm_name]()
+        rng = random.Random(3)
+        for _ in range(500):
+            index = StopIndex()
+            for floor in rng.sample(range(MAX_FLOORS + 1), rng.randint(0, 4)):
+                index[floor] = [("pickup", "P", 0)]
+            level = rng.randint(MIN_FLOOR, MAX_FLOORS)
+            direction = rng.choice(["up", "down", "idle"])
+
+            expected = algorithm.pick_next_direction(level, direction, index.to_dict())
+            assert algorithm.pick_direction(level, direction, index) == expected
+
+    def test_stop_index_queries(self):
+        index = StopIndex()
+        for floor in (7, 2, 5):
+            index.setdefault(floor, []).append(("pickup", "P", 0))
+
+        assert list(index) == [2, 5, 7]
+        assert (index.min(), index.max()) == (2, 7)
+        assert index.next_above(5) == 7
+        assert index.next_above(5, inclusive=True) == 5
+        assert index.next_below(5) == 2
+        assert index.next_below(1) is None
+
+        del index[5]
+        assert list(index) == [2, 7]
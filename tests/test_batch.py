@@ -0,0 +1,82 @@
+"""
+Tests for the NumPy batch engine against the reference controllers.
+"""
+import random
+
+import pytest
+
+from app.core.batch import BATCH_ALGORITHMS, BatchEngine
+from app.core.building import BuildingController
+from app.core.lift import LiftController
+
+
+def _random_requests(rng, num_buildings, max_floors, count):
+    requests = []
+    for _ in range(count):
+        building = rng.randrange(num_buildings)
+        requests.append((building, rng.randint(0, max_floors[building]),
+                         rng.randint(0, max_floors[building])))
+    return requests
+
+
+class TestBatchEngineMatchesReference:
+    """Batch kernels must reproduce LiftController / BuildingController tick for tick."""
+
+    def test_matches_building_controller(self):
+        rng = random.Random(5)
+        algorithms = [BATCH_ALGORITHMS[i % 3] for i in range(9)]
+        max_floors = [rng.randint(4, 20) for _ in algorithms]
+        engine = BatchEngine(algorithms, max_floors=max_floors, num_lifts=2)
+        reference = [
+            BuildingController(algorithm_name=name, max_floors=floors)
+            for name, floors in zip(algorithms, max_floors, strict=True)
+        ]
+
+        for tick in range(300):
+            if tick < 200:
+                requests = _random_requests(rng, len(algorithms), max_floors, rng.randint(0, 6))
+                if requests:
+                    engine.add_requests(*zip(*requests, strict=True))
+                for i, (building, from_level, to_level) in enumerate(requests):
+                    reference[building].add_request(f"P{tick}_{i}", from_level, to_level)
+
+            engine.step()
+            for building in reference:
+                building.step()
+
+            for b, building in enumerate(reference):
+                lifts = engine.get_lift_state(b)
+                for lift, controller in zip(lifts, (building.lift_a, building.lift_b), strict=True):
+                    assert lift["level"] == controller.current_level
+                    assert lift["direction"] == controller.direction
+                    assert lift["passenger_count"] == controller.get_passenger_count()
+
+        stats = engine.get_stats()
+        for b, building in enumerate(reference):
+            expected = building.get_state()["stats"]
+            assert stats["completed"][b] == expected["completed"]
+            assert stats["avg_wait"][b] == pytest.approx(expected["avg_wait"])
+            assert stats["avg_total"][b] == pytest.approx(expected["avg_total"])
+
+    @pytest.mark.parametrize("algorithm_name", BATCH_ALGORITHMS)
+    def test_single_lift_matches_lift_controller(self, algorithm_name):
+        rng = random.Random(9)
+        engine = BatchEngine([algorithm_name], max_floors=15, num_lifts=1)
+        controller = LiftController(algorithm_name=algorithm_name, max_floors=15)
+
+        for tick in range(400):
+            if rng.random() < 0.3:
+                from_level, to_level = rng.randint(0, 15), rng.randint(0, 15)
+                engine.add_requests([0], [from_level], [to_level])
+                controller.add_request(f"P{tick}", from_level, to_level)
+            engine.step()
+            controller.step()
+
+            (lift,) = engine.get_lift_state(0)
+            assert (lift["level"], lift["direction"]) == (
+                controller.current_level, controller.direction
+            )
+
+    def test_rejects_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            BatchEngine(["no_such_algorithm"])
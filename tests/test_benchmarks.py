@@ -0,0 +1,131 @@
+"""
+Tests for the benchmark harness: case grids, timing and baseline comparison.
+"""
+import pytest
+
+from benchmarks import __main__ as cli
+from benchmarks import harness
+from benchmarks.harness import (
+    BENCHMARKS,
+    Benchmark,
+    benchmark,
+    case_id,
+    compare,
+    load_results,
+    run_benchmarks,
+    save_results,
+    threshold_for,
+    time_case,
+)
+
+
+def _results(**per_op_us):
+    return {
+        "version": 1,
+        "results": [
+            {"id": name, "name": name.split("[")[0], "unit": "us", "value": value,
+             "per_op_us": value}
+            for name, value in per_op_us.items()
+        ],
+    }
+
+
+class TestHarness:
+    """Cases expand the parameter grid; timing runs fresh state each round."""
+
+    def test_cases_and_ids(self):
+        bench = Benchmark("x", lambda **_: iter(()), {"a": [1, 2, 3], "b": ["p", "q"]}, 1, "us")
+        assert len(bench.cases()) == 6
+        assert bench.cases(quick=True) == [
+            {"a": 1, "b": "p"}, {"a": 1, "b": "q"}, {"a": 2, "b": "p"}, {"a": 2, "b": "q"}
+        ]
+        assert case_id("x", {"b": "p", "a": 1}) == "x[a=1,b=p]"
+        assert case_id("x", {}) == "x"
+
+    def test_time_case_uses_fresh_state_and_counts_ops(self):
+        closed = []
+
+        def factory(n):
+            calls = []
+            try:
+                yield (lambda: calls.append(1)), n
+            finally:
+                closed.append(len(calls))
+
+        result = time_case(Benchmark("t", factory, {}, 7, "ops/s"), {"n": 4}, repeats=3)
+        assert closed == [7, 7, 7]
+        assert result["value"] == pytest.approx(1e6 / result["per_op_us"])
+
+    def test_run_filters_by_name(self, monkeypatch):
+        monkeypatch.setattr(harness, "BENCHMARKS", {})
+
+        @benchmark("keep.me", {"n": [1, 2, 3]}, number=2)
+        def keep(n):
+            yield lambda: None
+
+        @benchmark("skip.me", number=2)
+        def skip():
+            yield lambda: None
+
+        data = run_benchmarks(["keep.*"], quick=True, repeats=1)
+        assert [r["id"] for r in data["results"]] == ["keep.me[n=1]", "keep.me[n=2]"]
+        assert set(harness.BENCHMARKS) == {"keep.me", "skip.me"}
+
+    def test_rejects_unknown_unit(self):
+        with pytest.raises(ValueError):
+            benchmark("bad", unit="ms")
+
+    def test_results_round_trip(self, tmp_path):
+        path = tmp_path / "results.json"
+        save_results(_results(a=1.0), str(path))
+        assert load_results(str(path))["results"][0]["id"] == "a"
+        path.write_text('{"version": 99}')
+        with pytest.raises(ValueError):
+            load_results(str(path))
+
+
+class TestCompare:
+    """Regressions are judged on time per op against per-name thresholds."""
+
+    def test_statuses(self):
+        baseline = _results(same=10.0, slower=10.0, faster=10.0, gone=1.0)
+        current = _results(same=11.0, slower=12.0, faster=5.0, added=1.0)
+        rows = {row["id"]: row for row in compare(current, baseline, threshold=0.15)}
+        assert {name: row["status"] for name, row in rows.items()} == {
+            "same": "ok", "slower": "regressed", "faster": "improved",
+            "added": "new", "gone": "missing",
+        }
+        assert rows["slower"]["slowdown"] == pytest.approx(0.2)
+
+    def test_throughput_uses_time_per_op(self):
+        baseline = {"version": 1, "results": [
+            {"id": "t", "name": "t", "unit": "ops/s", "value": 1000.0, "per_op_us": 1000.0}
+        ]}
+        current = {"version": 1, "results": [
+            {"id": "t", "name": "t", "unit": "ops/s", "value": 500.0, "per_op_us": 2000.0}
+        ]}
+        assert compare(current, baseline)[0]["status"] == "regressed"
+
+    def test_threshold_overrides(self):
+        overrides = {"ws.*": 0.5, "ws.publish": 0.3}
+        assert threshold_for("ws.publish", 0.1, overrides) == 0.3
+        assert threshold_for("ws.other", 0.1, overrides) == 0.5
+        assert threshold_for("lift.step", 0.1, overrides) == 0.1
+
+        rows = compare(_results(ws=14.0), _results(ws=10.0), 0.15, {"ws": 0.5})
+        assert rows[0]["status"] == "ok"
+
+    def test_cli_exits_nonzero_on_regression(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(
+            "benchmarks.__main__.run_benchmarks", lambda *args, **kwargs: _results(a=20.0)
+        )
+        baseline = tmp_path / "baseline.json"
+        save_results(_results(a=10.0), str(baseline))
+        assert cli.main(["--baseline", str(baseline)]) == 1
+        assert cli.main(["--baseline", str(baseline), "--threshold-for", "a=2"]) == 0
+        assert "regressed" in capsys.readouterr().out
+
+
+def test_suite_registers_core_and_api_benchmarks():
+    names = set(BENCHMARKS)
+    assert {"lift.step", "building.step", "api.encode_state", "sessions.autoplay_tick"} <= names
@@ -0,0 +1,178 @@
+"""
+Tests for session sharding: the hash ring, shard-owned session IDs and the
+router in front of real shard processes.
+"""
+import json
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.cluster import (
+    ShardRouter,
+    merge_metrics,
+    shard_env,
+    socket_path,
+    start_shards,
+    stop_shards,
+    wait_for_shards,
+)
+from app.core.ring import HashRing
+from app.core.sessions import SessionManager
+from app.core.spill import SpillStore
+
+
+class TestHashRing:
+    """Owners are stable, balanced and mostly unchanged when shards are added."""
+
+    def test_owner_is_deterministic_and_balanced(self):
+        keys = [str(uuid.UUID(int=i)) for i in range(8000)]
+        ring, other = HashRing(4), HashRing(4)
+        owners = [ring.owner(key) for key in keys]
+        assert owners == [other.owner(key) for key in keys]
+
+        counts = [owners.count(shard) for shard in range(4)]
+        assert min(counts) > 0.75 * len(keys) / 4
+        assert max(counts) < 1.25 * len(keys) / 4
+
+    def test_adding_shard_moves_few_keys(self):
+        keys = [str(uuid.UUID(int=i)) for i in range(8000)]
+        before, after = HashRing(4), HashRing(5)
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+
+        # Only keys taken over by the new shard move, about a fifth of them
+        assert all(after.owner(key) == 4 for key in moved)
+        assert len(moved) < 0.3 * len(keys)
+
+    def test_shard_issues_ids_it_owns(self):
+        manager = SessionManager(shard_index=2, shard_count=3)
+        ids = [manager.create_session() for _ in range(20)]
+        assert {manager.ring.owner(session_id) for session_id in ids} == {2}
+
+    def test_routes_session_paths_to_owner(self):
+        router = ShardRouter(["a", "b", "c"])
+        session_id = str(uuid.uuid4())
+        owner = router.ring.owner(session_id)
+
+        assert router.shard_for(f"/api/{session_id}/state", {}) == owner
+        assert router.shard_for(f"/ws/{session_id}", {}) == owner
+        assert router.shard_for(f"/api/{session_id}/state", {"x-lift-shard": "1"}) == 1
+        assert {router.shard_for("/api/create-session", {}) for _ in range(3)} == {0, 1, 2}
+
+    def test_merged_metrics_label_each_shard(self):
+        shard = (
+            "# HELP t_seconds test\n# TYPE t_seconds histogram\n"
+            't_seconds_bucket{op="a",le="+Inf"} 2\nt_seconds_count{op="a"} 2\n'
+            "# HELP t_items test\n# TYPE t_items gauge\nt_items 3\n"
+        )
+        assert merge_metrics([shard, shard.replace("3", "4")]).splitlines() == [
+            "# HELP t_seconds test",
+            "# TYPE t_seconds histogram",
+            't_seconds_bucket{op="a",le="+Inf",shard="0"} 2',
+            't_seconds_count{op="a",shard="0"} 2',
+            't_seconds_bucket{op="a",le="+Inf",shard="1"} 2',
+            't_seconds_count{op="a",shard="1"} 2',
+            "# HELP t_items test",
+            "# TYPE t_items gauge",
+            't_items{shard="0"} 3',
+            't_items{shard="1"} 4',
+        ]
+
+    def test_shards_get_their_own_spill_file(self, monkeypatch):
+        monkeypatch.setenv("SESSION_SPILL_PATH", "/data/sessions.sqlite3")
+        paths = [shard_env(index, 2)["SESSION_SPILL_PATH"] for index in range(2)]
+        assert paths == ["/data/sessions.sqlite3.shard0", "/data/sessions.sqlite3.shard1"]
+
+        monkeypatch.delenv("SESSION_SPILL_PATH")
+        assert "SESSION_SPILL_PATH" not in shard_env(0, 2)
+
+
+@pytest.fixture(scope="module")
+def cluster(tmp_path_factory):
+    socket_dir = str(tmp_path_factory.mktemp("shards"))
+    processes = start_shards(2, socket_dir)
+    try:
+        wait_for_shards(processes, socket_dir)
+        router = ShardRouter([socket_path(socket_dir, index) for index in range(2)])
+        with TestClient(router) as client:
+            yield client
+    finally:
+        stop_shards(processes)
+
+
+class TestRouter:
+    """REST and WebSocket traffic reaches the shard that owns the session."""
+
+    def test_sessions_spread_across_shards(self, cluster):
+        ids = [cluster.post("/api/create-session").json()["session_id"] for _ in range(4)]
+        cluster_ring = HashRing(2)
+        for shard in range(2):
+            stats = cluster.get("/api/sessions", headers={"x-lift-shard": str(shard)}).json()
+            assert stats["shard"] == shard and stats["shards"] == 2
+            owned = {entry["session_id"] for entry in stats["largest"]}
+            assert owned == {i for i in ids if cluster_ring.owner(i) == shard}
+
+    def test_rest_round_trip(self, cluster):
+        session_id = cluster.post("/api/create-session", json={"num_lifts": 3}).json()["session_id"]
+        response = cluster.post(
+            f"/api/{session_id}/add-passengers",
+            content=b'{"passenger_id": "P1", "from_level": 0, "to_level": 4}\n',
+            headers={"content-type": "application/x-ndjson"},
+        )
+        assert response.json()["added"] == 1
+        cluster.post(f"/api/{session_id}/move", params={"ticks": 10})
+
+        state = cluster.get(f"/api/{session_id}/state").json()
+        assert len(state["lifts"]) == 3
+        assert state["stats"]["completed"] == 1
+        assert cluster.get("/api/not-a-session/state").status_code == 404
+
+    def test_websocket_through_router(self, cluster):
+        session_id = cluster.post("/api/create-session").json()["session_id"]
+        with cluster.websocket_connect(f"/ws/{session_id}") as websocket:
+            snapshot = json.loads(websocket.receive_text())
+            assert snapshot["type"] == "snapshot"
+            websocket.send_text("move")
+            delta = json.loads(websocket.receive_text())
+            assert delta["seq"] == snapshot["seq"] + 1
+
+    def test_metrics_gathered_from_every_shard(self, cluster):
+        session_id = cluster.post("/api/create-session").json()["session_id"]
+        cluster.post(f"/api/{session_id}/move")
+        owner = HashRing(2).owner(session_id)
+
+        text = cluster.get("/metrics").text
+        assert text.count("# TYPE lift_sessions gauge") == 1
+        assert 'lift_sessions_spilled{shard="0"}' in text
+        assert 'lift_sessions_spilled{shard="1"}' in text
+        assert f'lift_move_seconds_count{{source="api",shard="{owner}"}}' in text
+
+        pinned = cluster.get("/metrics", headers={"x-lift-shard": "0"}).text
+        assert "shard=" not in pinned
+
+    def test_unknown_session_websocket_refused(self, cluster):
+        with pytest.raises(WebSocketDisconnect), cluster.websocket_connect("/ws/missing") as ws:
+            ws.receive_text()
+
+
+class TestSharedSpillPath:
+    """An explicit spill path must not make shards wipe each other's sessions."""
+
+    def test_second_shard_keeps_first_shards_spilled_sessions(self, tmp_path, monkeypatch):
+        spill_path = str(tmp_path / "sessions.sqlite3")
+        monkeypatch.setenv("SESSION_SPILL_PATH", spill_path)
+        first = SpillStore(shard_env(0, 2)["SESSION_SPILL_PATH"])
+        first.put("s0", b"snapshot")
+
+        # Opening a store resets its table, as each shard does on startup
+        second = SpillStore(shard_env(1, 2)["SESSION_SPILL_PATH"])
+        second.put("s1", b"other")
+        try:
+            assert first.take("s0") == b"snapshot"
+            assert second.take("s1") == b"other"
+            assert not os.path.exists(spill_path)
+        finally:
+            first.close()
+            second.close()
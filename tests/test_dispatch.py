@@ -0,0 +1,176 @@
+"""
+Tests for N-lift dispatch: the lift index, zones, lift naming and ETA routing.
+"""
+import random
+
+import pytest
+
+from app.core.building import BuildingController
+from app.core.dispatch import EtaDispatcher, LiftIndex, RoutePlan, lift_name
+
+
+def _brute_force_best(lifts, floor):
+    return min((abs(level - floor), load, i) for i, (level, load) in lifts.items())
+
+
+class TestLiftIndex:
+    """The index should always agree with comparing every lift."""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        index = LiftIndex()
+        lifts = {}
+        for i in range(24):
+            lifts[i] = (rng.randint(0, 40), rng.randint(0, 5))
+            index.update(i, *lifts[i])
+
+        for _ in range(2000):
+            i = rng.randrange(24)
+            if rng.random() < 0.5:
+                lifts[i] = (rng.randint(0, 40), lifts[i][1])
+            else:
+                lifts[i] = (lifts[i][0], max(0, lifts[i][1] + rng.choice((-1, 1))))
+            index.update(i, *lifts[i])
+
+            floor = rng.randint(-2, 42)
+            assert index.best(floor) == _brute_force_best(lifts, floor)
+
+    def test_empty_index_raises(self):
+        with pytest.raises(ValueError):
+            LiftIndex().best(0)
+
+    def test_lift_names(self):
+        assert [lift_name(i) for i in (0, 1, 25, 26, 27)] == ["A", "B", "Z", "AA", "AB"]
+
+
+class TestNLiftBuilding:
+    """Buildings with any number of lifts, optionally zoned."""
+
+    def test_two_lift_suffixes_unchanged(self):
+        building = BuildingController(algorithm_name="scan")
+        building.add_request("P1", 0, 5)
+        building.add_request("P2", 0, 5)
+        assert set(building.lift_a.active_requests) == {"P1_A"}
+        assert set(building.lift_b.active_requests) == {"P2_B"}
+
+    def test_single_lift_has_no_lift_b(self):
+        building = BuildingController(algorithm_name="scan", num_lifts=1)
+        assert building.lift_a is building.lifts[0]
+        with pytest.raises(AttributeError, match="at least 2 lifts"):
+            _ = building.lift_b
+
+    @pytest.mark.parametrize("algorithm_name", ["scan", "sstf", "nearest"])
+    def test_many_lifts_deliver_everyone(self, algorithm_name):
+        rng = random.Random(11)
+        building = BuildingController(algorithm_name=algorithm_name, max_floors=30, num_lifts=12)
+        for i in range(300):
+            building.add_request(f"P{i}", rng.randint(0, 30), rng.randint(0, 30))
+            building.step()
+        building.run(400)
+
+        assert building.get_completed() == 300
+        assert len(building.get_state()["lifts"]) == 12
+        assert {lift["name"] for lift in building.get_state()["lifts"]} == set("ABCDEFGHIJKL")
+
+    def test_batch_matches_sequential_with_many_lifts(self):
+        rng = random.Random(5)
+        requests = [(f"P{i}", rng.randint(0, 20), rng.randint(0, 20)) for i in range(200)]
+        single = BuildingController(algorithm_name="sstf", max_floors=20, num_lifts=8)
+        batched = BuildingController(algorithm_name="sstf", max_floors=20, num_lifts=8)
+        for building in (single, batched):
+            for i, lift in enumerate(building.lifts):
+                lift.current_level = (i * 3) % 21
+
+        for request in requests:
+            single.add_request(*request)
+        batched.add_requests(requests)
+        assert single.get_state() == batched.get_state()
+
+    def test_zones_route_hall_calls(self):
+        building = BuildingController(
+            algorithm_name="scan", max_floors=20, num_lifts=4,
+            zones=[(0, 10), (0, 10), (0, 20), (11, 20)],
+        )
+        building.add_request("LOW", 15, 0)
+        building.add_request("HIGH", 20, 0)
+
+        # Lifts 2 and 3 are the only ones serving floors above 10
+        assert set(building.lifts[2].active_requests) == {"LOW_C"}
+        assert set(building.lifts[3].active_requests) == {"HIGH_D"}
+        assert building.get_state()["lifts"][3]["zone"] == [11, 20]
+
+    @pytest.mark.parametrize("zones", [
+        [(0, 10)],
+        [(0, 4), (6, 10)],
+        [(0, 10), (0, 12)],
+    ])
+    def test_invalid_zones_rejected(self, zones):
+        with pytest.raises(ValueError):
+            BuildingController(max_floors=10, num_lifts=2 if len(zones) == 2 else 3, zones=zones)
+
+
+class TestEtaDispatch:
+    """Route plans and the ETA dispatcher built on them."""
+
+    @pytest.mark.parametrize("algorithm_name", ["scan", "sstf", "nearest"])
+    def test_route_plan_matches_stepping(self, algorithm_name):
+        rng = random.Random(7)
+        building = BuildingController(algorithm_name=algorithm_name, max_floors=15, num_lifts=1)
+        for i in range(12):
+            building.add_request(f"P{i}", rng.randint(0, 15), rng.randint(0, 15))
+        lift = building.lifts[0]
+        plan = RoutePlan(lift, [], (lift.stops_version, 0))
+
+        for tick in range(len(plan.levels)):
+            assert lift.current_level == plan.level_at(lift.global_tick), tick
+            building.step()
+        assert building.get_completed() == 12
+
+    def test_prefers_lift_heading_to_call(self):
+        building = BuildingController(
+            algorithm_name="scan", max_floors=20, num_lifts=2, dispatch="eta"
+        )
+        # A is one floor from 10 but heading to 0; B is further away but heading up past 10
+        building.lifts[0].current_level = 9
+        building.lifts[0].add_request("DOWN_A", 0, 1)
+        building.lifts[1].current_level = 5
+        building.lifts[1].add_request("UP_B", 5, 20)
+        building.step()
+
+        building.add_request("CALL", 10, 12)
+        assert "CALL_B" in building.lifts[1].active_requests
+
+    def test_plan_reused_until_stops_change(self):
+        building = BuildingController(algorithm_name="scan", max_floors=20, dispatch="eta")
+        dispatcher = building.dispatcher
+        assert isinstance(dispatcher, EtaDispatcher)
+        building.lifts[0].add_request("P1_A", 15, 2)
+        building.lifts[0].add_request("P2_A", 18, 3)
+        dispatcher.eta(0, 4)
+        plan = dispatcher.plans[0]
+
+        building.step()
+        building.step()
+        dispatcher.eta(0, 4)
+        assert dispatcher.plans[0] is plan
+
+        building.lifts[0].add_request("P3_A", 1, 2)
+        dispatcher.eta(0, 4)
+        assert dispatcher.plans[0] is not plan
+
+    def test_batch_matches_sequential(self):
+        rng = random.Random(9)
+        requests = [(f"P{i}", rng.randint(0, 20), rng.randint(0, 20)) for i in range(150)]
+        single = BuildingController(max_floors=20, num_lifts=6, dispatch="eta")
+        batched = BuildingController(max_floors=20, num_lifts=6, dispatch="eta")
+        for building in (single, batched):
+            for i, lift in enumerate(building.lifts):
+                lift.current_level = (i * 4) % 21
+
+        for request in requests:
+            single.add_request(*request)
+        batched.add_requests(requests)
+        assert single.get_state() == batched.get_state()
+
+    def test_unknown_dispatch_falls_back_to_nearest(self):
+        assert BuildingController(dispatch="bogus").get_state()["dispatch"] == "nearest"
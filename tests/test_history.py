@@ -0,0 +1,60 @@
+"""
+Tests for the bounded columnar tick history.
+"""
+from app.core.history import EVENT_DROPOFF, EVENT_PICKUP, TickHistory
+from app.core.lift import LiftController
+
+
+class TestTickHistory:
+    """Ring buffer behaviour and queries."""
+
+    def test_ring_buffer_keeps_latest(self):
+        history = TickHistory(capacity=5)
+        for tick in range(1, 13):
+            history.record(tick, tick % 4, "up", 1)
+
+        result = history.query()
+        assert result["tick"] == [8, 9, 10, 11, 12]
+        assert result["retained"] == 5
+        assert result["dropped"] == 7
+
+    def test_disabled_history_records_nothing(self):
+        history = TickHistory(capacity=0)
+        history.record(1, 0, "idle", 0)
+
+        assert len(history) == 0
+        assert history.query()["tick"] == []
+
+    def test_range_query(self):
+        history = TickHistory(capacity=100)
+        for tick in range(1, 51):
+            history.record(tick, 0, "idle", 0)
+
+        result = history.query(start=10, end=14)
+        assert result["tick"] == [10, 11, 12, 13, 14]
+
+    def test_downsample_merges_events(self):
+        history = TickHistory(capacity=100)
+        for tick in range(1, 11):
+            events = EVENT_DROPOFF if tick == 4 else 0
+            history.record(tick, tick, "up", 0, events)
+
+        result = history.query(max_points=3)
+        assert result["stride"] == 4
+        assert result["tick"] == [1, 5, 9]
+        assert result["events"] == [EVENT_DROPOFF, 0, 0]
+
+
+class TestLiftHistory:
+    """LiftController records one sample per tick, including headless runs."""
+
+    def test_lift_records_ticks_and_events(self):
+        controller = LiftController(algorithm_name="scan", history_size=50)
+        controller.add_request("P001", 0, 2)
+        controller.run(5)
+
+        result = controller.get_history()
+        assert result["tick"] == [1, 2, 3, 4, 5]
+        assert result["events"][0] == EVENT_PICKUP
+        assert result["events"][2] == EVENT_DROPOFF
+        assert result["passengers"][:3] == [1, 1, 0]
@@ -0,0 +1,166 @@
+"""
+Tests for K-way league sessions: one request stream fanned out to every
+building, parallel runs matching serial ones and the leaderboard.
+"""
+import asyncio
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.protocol import api_state, diff_state
+from app.core import league, snapshot
+from app.core.algorithms import ALGORITHM_REGISTRY
+from app.core.config import MAX_LEAGUE_BUILDINGS
+from app.core.league import LeagueBusyError, LeagueController
+from app.core.sessions import session_manager
+from app.main import app
+
+
+def _league(**kwargs):
+    controller = LeagueController(max_floors=15, num_lifts=3, **kwargs)
+    rng = random.Random(0)
+    controller.schedule_requests(
+        [(rng.randint(0, 200), f"P{i}", rng.randint(0, 15), rng.randint(0, 15)) for i in range(300)]
+    )
+    return controller
+
+
+class TestLeague:
+    """Every building sees the same requests; results rank consistently."""
+
+    def test_defaults_to_every_algorithm(self):
+        controller = LeagueController(dispatchers=["nearest", "eta"])
+        pairings = [(b.algorithm_name, b.dispatch_name) for b in controller.buildings]
+        assert pairings == [
+            (algorithm, dispatch)
+            for algorithm in ALGORITHM_REGISTRY
+            for dispatch in ("nearest", "eta")
+        ]
+
+    def test_rejects_unknown_names_and_oversized_leagues(self):
+        with pytest.raises(ValueError, match="look"):
+            LeagueController(algorithms=["scan", "look"])
+        with pytest.raises(ValueError, match="at most"):
+            LeagueController(algorithms=["scan"] * (MAX_LEAGUE_BUILDINGS + 1))
+
+    def test_requests_fan_out_to_every_building(self):
+        controller = _league()
+        controller.add_requests([("A", 0, 5), ("B", 3, 1)])
+        controller.run(300)
+        assert {b.total_passengers for b in controller.buildings} == {302}
+        assert {b.get_completed() for b in controller.buildings} == {302}
+
+    def test_parallel_run_matches_serial(self, monkeypatch):
+        serial = _league(dispatchers=["nearest", "eta"])
+        parallel = _league(dispatchers=["nearest", "eta"])
+        serial.run(250)
+
+        monkeypatch.setattr(league, "LEAGUE_WORKERS", 2)
+        monkeypatch.setattr(league, "LEAGUE_PARALLEL_MIN_WORK", 1)
+        result = parallel.run(250)
+
+        assert parallel.digest() == serial.digest()
+        assert result["leaderboard"] == serial.get_state()["leaderboard"]
+        assert parallel.global_tick == 250
+        # Buildings coming back from workers keep working locally
+        parallel.add_request("late", 0, 9)
+        parallel.step()
+        assert parallel.buildings[0].total_passengers == 301
+
+    def test_async_run_frees_event_loop_and_locks_league(self, monkeypatch):
+        serial = _league()
+        parallel = _league()
+        expected = serial.run(250)
+        monkeypatch.setattr(league, "LEAGUE_WORKERS", 2)
+        monkeypatch.setattr(league, "LEAGUE_PARALLEL_MIN_WORK", 1)
+
+        async def scenario():
+            ticks = 0
+
+            async def other_session():
+                nonlocal ticks
+                while parallel.running:
+                    ticks += 1
+                    with pytest.raises(LeagueBusyError):
+                        parallel.add_request("late", 0, 9)
+                    await asyncio.sleep(0.001)
+
+            result, _ = await asyncio.gather(parallel.run_async(250), other_session())
+            return result, ticks
+
+        result, ticks = asyncio.run(scenario())
+        assert ticks > 1
+        assert not parallel.running and parallel.global_tick == 250
+        assert parallel.digest() == serial.digest()
+        assert result["run"] == expected["run"]
+        assert result["leaderboard"] == expected["leaderboard"]
+        parallel.add_request("late", 0, 9)
+
+    def test_leaderboard_ranks_by_total_time(self):
+        controller = _league()
+        controller.run(260)
+        board = controller.get_state()["leaderboard"]
+        assert [entry["rank"] for entry in board] == [1, 2, 3]
+        totals = [entry["avg_total"] for entry in board]
+        assert totals == sorted(totals)
+
+        idle = LeagueController()
+        assert [entry["completed"] for entry in idle.leaderboard()] == [0, 0, 0]
+
+    def test_snapshot_and_fork_continue_identically(self):
+        original = _league()
+        original.run(80)
+        restored = snapshot.loads(snapshot.dumps(original))
+        fork = original.fork()
+
+        for controller in (original, restored, fork):
+            controller.run(80)
+        assert restored.get_state() == original.get_state() == fork.get_state()
+
+
+class TestLeagueApi:
+    """League sessions are created, advanced and diffed through the API."""
+
+    def test_create_and_move(self):
+        client = TestClient(app)
+        created = client.post(
+            "/api/create-league", json={"algorithms": ["scan", "sstf"], "num_lifts": 3}
+        ).json()
+        assert created["type"] == "league"
+        assert [b["algorithm"] for b in created["buildings"]] == ["scan", "sstf"]
+
+        session_id = created["session_id"]
+        client.post(
+            f"/api/{session_id}/add-passenger",
+            json={"passenger_id": "P1", "from_level": 0, "to_level": 4},
+        )
+        client.post(f"/api/{session_id}/move", params={"ticks": 10})
+        state = client.get(f"/api/{session_id}/state").json()
+        assert state["type"] == "league" and len(state["buildings"]) == 2
+        assert [entry["completed"] for entry in state["leaderboard"]] == [1, 1]
+
+        assert client.post("/api/create-league", json={"algorithms": ["nope"]}).status_code == 422
+
+    def test_changes_during_parallel_run_conflict(self):
+        client = TestClient(app)
+        session_id = client.post("/api/create-league").json()["session_id"]
+        session_manager.get_controller(session_id).running = True
+
+        response = client.post(
+            f"/api/{session_id}/add-passenger",
+            json={"passenger_id": "P1", "from_level": 0, "to_level": 4},
+        )
+        assert response.status_code == 409
+        assert client.post(f"/api/{session_id}/move").status_code == 409
+        assert client.get(f"/api/{session_id}/state").status_code == 200
+
+    def test_deltas_diff_buildings_by_position(self):
+        controller = LeagueController(algorithms=["scan", "sstf"])
+        before = api_state(controller, "league")
+        controller.add_request("P1", 0, 3)
+        controller.step()
+
+        changes = diff_state(before, api_state(controller, "league"))
+        assert set(changes["buildings"]) == {"0", "1"}
+        assert changes["global_tick"] == 1
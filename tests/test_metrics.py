@@ -0,0 +1,91 @@
+"""
+Tests for the /metrics endpoint: histogram buckets, scrape-time gauges and
+the Prometheus text format.
+"""
+from fastapi.testclient import TestClient
+
+from app.core.building import BuildingController
+from app.core.league import LeagueController
+from app.core.metrics import DISPATCH_SECONDS, MOVE_SECONDS, Gauge, Histogram, Registry
+from app.main import app
+
+
+def _samples(text: str) -> dict[str, float]:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestRegistry:
+    """Metrics render in the exposition format with cumulative buckets."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("t_seconds", "test", "op", buckets=(0.001, 0.01))
+        histogram.observe(0.0005, "a")
+        histogram.observe(0.001, "a")
+        histogram.observe(0.005, "a", count=3)
+        histogram.observe(1.0, "a")
+
+        samples = _samples("\n".join(histogram.render()))
+        assert samples['t_seconds_bucket{op="a",le="0.001"}'] == 2
+        assert samples['t_seconds_bucket{op="a",le="0.01"}'] == 5
+        assert samples['t_seconds_bucket{op="a",le="+Inf"}'] == 6
+        assert samples['t_seconds_count{op="a"}'] == 6
+        assert samples['t_seconds_sum{op="a"}'] == 0.0005 + 0.001 + 0.015 + 1.0
+
+    def test_gauges_read_live_values(self):
+        values = {"x": 1}
+        registry = Registry()
+        registry.gauge("t_items", "test", lambda: dict(values), "kind")
+        registry.register(Gauge("t_total", "test", lambda: 7, kind="counter"))
+        values["y"] = 2
+
+        text = registry.render()
+        assert "# TYPE t_total counter" in text
+        assert _samples(text) == {'t_items{kind="x"}': 1, 't_items{kind="y"}': 2, "t_total": 7}
+
+    def test_label_values_are_escaped(self):
+        histogram = Histogram("t_seconds", "test", "op", buckets=())
+        histogram.observe(0.1, 'a"b\\')
+        assert 't_seconds_count{op="a\\"b\\\\"} 1' in histogram.render()
+
+
+class TestInstrumentation:
+    """Hot paths feed the timers; gauges count what sessions hold."""
+
+    def test_dispatch_batches_count_every_call(self):
+        before = DISPATCH_SECONDS.count("eta")
+        building = BuildingController(num_lifts=3, dispatch="eta")
+        building.add_requests([(f"P{i}", i % 10, (i + 3) % 10) for i in range(40)])
+        building.add_request("Q", 0, 4)
+        assert DISPATCH_SECONDS.count("eta") == before + 41
+
+    def test_pending_passengers(self):
+        league = LeagueController(algorithms=["scan", "sstf"])
+        league.add_requests([("A", 0, 5), ("B", 4, 1)])
+        league.schedule_requests([(10, "C", 2, 3)])
+        assert league.pending_passengers() == {"waiting": 4, "riding": 0, "scheduled": 2}
+        league.run(40)
+        assert league.pending_passengers() == {"waiting": 0, "riding": 0, "scheduled": 0}
+
+    def test_metrics_endpoint(self):
+        client = TestClient(app)
+        moves = MOVE_SECONDS.count("fast_forward")
+        session_id = client.post("/api/create-session", json={}).json()["session_id"]
+        client.post(
+            f"/api/{session_id}/add-passenger",
+            json={"passenger_id": "P1", "from_level": 3, "to_level": 8},
+        )
+        client.post(f"/api/{session_id}/move", params={"ticks": 2})
+
+        response = client.get("/metrics")
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        samples = _samples(response.text)
+        assert samples['lift_move_seconds_count{source="fast_forward"}'] == moves + 1
+        assert samples['lift_sessions{type="single"}'] >= 1
+        assert samples['lift_pending_passengers{state="waiting"}'] >= 1
+        assert samples["lift_websocket_connections"] == 0
+        assert samples['lift_session_events_total{event="evicted"}'] >= 0
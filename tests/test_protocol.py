@@ -0,0 +1,117 @@
+"""
+Tests for the WebSocket state delta protocol.
+"""
+import json
+import random
+
+import pytest
+
+from app.api.protocol import (
+    PASSENGER_LIST_KEYS,
+    Snapshot,
+    api_state,
+    diff_state,
+    encode,
+    encoded_state,
+)
+from app.core.multi_lift import MultiBuildingController
+
+
+def apply_delta(state, changes):
+    """Python mirror of frontend-react/src/utils/stateDelta.js."""
+    result = dict(state)
+    for key, value in changes.items():
+        if value is None:
+            result.pop(key, None)
+        elif key in PASSENGER_LIST_KEYS and isinstance(result.get(key), list):
+            removed = set(value["removed"])
+            updates = {p["passenger_id"]: p for p in value["upsert"]}
+            merged = []
+            for passenger in result[key]:
+                if passenger["passenger_id"] not in removed:
+                    merged.append(updates.pop(passenger["passenger_id"], passenger))
+            result[key] = merged + list(updates.values())
+        elif isinstance(value, dict) and isinstance(result.get(key), list):
+            items = list(result[key])
+            for position, item_changes in value.items():
+                items[int(position)] = apply_delta(items[int(position)], item_changes)
+            result[key] = items
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_delta(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def _by_passenger(state):
+    """Normalise passenger list order, which deltas do not preserve."""
+    for building in ("building1", "building2"):
+        state[building]["active_passengers"].sort(key=lambda p: p["passenger_id"])
+    return state
+
+
+class TestStateDeltas:
+    """Applying every delta to the first snapshot reproduces the latest state."""
+
+    def test_deltas_replay_to_current_state(self):
+        rng = random.Random(13)
+        controller = MultiBuildingController(algorithm1="scan", algorithm2="sstf")
+        sent = api_state(controller, "comparison")
+        client = api_state(controller, "comparison")
+
+        for tick in range(150):
+            if rng.random() < 0.5:
+                controller.add_request(f"P{tick}", rng.randint(0, 10), rng.randint(0, 10))
+            controller.step()
+
+            current = api_state(controller, "comparison")
+            client = apply_delta(client, diff_state(sent, current))
+            sent = current
+            assert _by_passenger(client) == _by_passenger(api_state(controller, "comparison"))
+
+    def test_unchanged_state_has_empty_delta(self):
+        controller = MultiBuildingController()
+        controller.add_request("P1", 0, 4)
+        assert diff_state(api_state(controller, "comparison"), api_state(controller, "comparison")) == {}
+
+    def test_removed_keys_become_none(self):
+        assert diff_state({"stops": {3: [1], 5: [2]}}, {"stops": {5: [2]}}) == {"stops": {3: None}}
+
+
+class TestEncodedState:
+    """State is encoded once per controller version and shared between callers."""
+
+    def test_cached_until_controller_changes(self):
+        controller = MultiBuildingController()
+        first = encoded_state(controller, "comparison")
+        assert encoded_state(controller, "comparison") is first
+        assert first.encode() is first.encode()
+
+        controller.add_request("P1", 0, 4)
+        second = encoded_state(controller, "comparison")
+        assert second is not first
+        controller.step()
+        assert encoded_state(controller, "comparison") is not second
+
+    def test_json_matches_state(self):
+        controller = MultiBuildingController()
+        controller.add_request("P1", 0, 4)
+        controller.step()
+        state = json.loads(encoded_state(controller, "comparison").encode())
+        assert state == json.loads(json.dumps(api_state(controller, "comparison")))
+
+    def test_snapshot_splices_encoded_state(self):
+        controller = MultiBuildingController()
+        controller.add_request("P1", 0, 4)
+        state = encoded_state(controller, "comparison")
+        snapshot = Snapshot(state, seq=7)
+        assert json.loads(snapshot.encode()) == json.loads(encode(snapshot.message))
+
+    def test_msgpack_snapshot_splices_encoded_state(self):
+        msgpack = pytest.importorskip("msgpack")
+        controller = MultiBuildingController()
+        controller.add_request("P1", 0, 4)
+        snapshot = Snapshot(encoded_state(controller, "comparison"), seq=3)
+        assert msgpack.unpackb(snapshot.encode("msgpack"), strict_map_key=False) == (
+            msgpack.unpackb(encode(snapshot.message, "msgpack"), strict_map_key=False)
+        )
@@ -0,0 +1,138 @@
+"""
+Tests for moving waiting hall calls between lifts.
+"""
+import random
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from app.core.building import BuildingController
+from app.core.lift import LiftController
+from app.core.reassign import Reassigner, min_cost_assignment
+
+
+class TestRemoveRequest:
+    """Withdrawing requests that have not been picked up."""
+
+    def test_removes_stops_of_waiting_request(self):
+        lift = LiftController()
+        lift.add_request("P1", 3, 7)
+        lift.add_request("P2", 3, 5)
+        version = lift.stops_version
+
+        request = lift.remove_request("P1")
+        assert request["from_level"] == 3 and request["to_level"] == 7
+        assert lift.stops.to_dict() == {3: [("pickup", "P2", 5)], 5: [("dropoff", "P2")]}
+        assert lift.fulfillable.to_dict() == {3: [("pickup", "P2", 5)]}
+        assert set(lift.active_requests) == set(lift.waiting) == {"P2"}
+        assert lift.stops_version > version
+
+    def test_picked_up_request_stays(self):
+        lift = LiftController()
+        lift.add_request("P1", 0, 4)
+        lift.step()
+
+        assert lift.remove_request("P1") is None
+        assert lift.remove_request("UNKNOWN") is None
+        assert "P1" in lift.active_requests and not lift.waiting
+
+
+class TestReassigner:
+    """Batch re-solving of waiting calls across a building's lifts."""
+
+    def test_transfer_keeps_wait_start_and_renames(self):
+        building = BuildingController(max_floors=10)
+        building.lifts[0].add_request("P1_A", 8, 0)
+        building.step()
+        building.step()
+
+        assert building.transfer_request("P1_A", 0, 1)
+        request = building.lifts[1].active_requests["P1_B"]
+        assert request["created_at"] == 0
+        assert not building.lifts[0].active_requests
+        assert not building.transfer_request("P1_A", 0, 1)
+
+    def test_moves_call_to_lift_that_is_now_closer(self):
+        building = BuildingController(algorithm_name="scan", max_floors=20, num_lifts=2)
+        # A is heading up to 20, so it only reaches 2 on the way back down
+        building.lifts[0].current_level = 5
+        building.lifts[0].direction = "up"
+        building.lifts[0].add_request("FAR_A", 20, 20)
+        building.lifts[0].add_request("CALL_A", 2, 0)
+        building.step()
+
+        assert building.reassigner.solve() == 1
+        assert "CALL_B" in building.lifts[1].active_requests
+        # Nothing left to improve, so a second pass changes nothing
+        assert building.reassigner.solve() == 0
+
+    def test_respects_zones(self):
+        building = BuildingController(
+            algorithm_name="scan", max_floors=20, num_lifts=2, zones=[(0, 20), (10, 20)]
+        )
+        building.lifts[0].current_level = 5
+        building.lifts[0].direction = "up"
+        building.lifts[0].add_request("FAR_A", 20, 20)
+        building.lifts[0].add_request("CALL_A", 2, 0)
+        building.step()
+
+        assert building.reassigner.solve() == 0
+        assert "CALL_A" in building.lifts[0].active_requests
+
+    def test_batch_is_bounded(self):
+        building = BuildingController(max_floors=20, num_lifts=3)
+        building.lifts[0].add_request("FAR_A", 20, 20)
+        building.step()
+        for i in range(40):
+            building.lifts[0].add_request(f"P{i}_A", 1, 0)
+
+        reassigner = Reassigner(building, max_calls=8)
+        assert reassigner.solve() <= 8
+        assert [i for i, _ in reassigner._oldest_waiting()] == [0] * 8
+
+    def test_transferred_calls_rank_by_wait_start(self):
+        building = BuildingController(max_floors=20, num_lifts=2)
+        building.lifts[1].add_request("NEW1_B", 3, 0, created_at=5)
+        building.lifts[1].add_request("NEW2_B", 4, 0, created_at=6)
+        # Queued after newer calls, as a transfer leaves it
+        building.lifts[1].add_request("OLD_B", 5, 0, created_at=0)
+
+        oldest = Reassigner(building, max_calls=2)._oldest_waiting()
+        assert [request["passenger_id"] for _, request in oldest] == ["OLD_B", "NEW1_B"]
+
+
+class TestMinCostAssignment:
+    """The batch solve finds the cheapest assignment, not a greedy one."""
+
+    def test_beats_greedy(self):
+        # Greedy takes the cheapest cell (0, 0) first and is left with 100
+        assert min_cost_assignment(np.array([[1.0, 2.0], [2.0, 100.0]])).tolist() == [1, 0]
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(8)
+        for rows, cols in [(1, 1), (3, 3), (3, 5), (5, 7), (6, 6)]:
+            for _ in range(20):
+                cost = rng.integers(0, 30, size=(rows, cols)).astype(np.float64)
+                assigned = min_cost_assignment(cost)
+                assert len(set(assigned.tolist())) == rows
+                best = min(
+                    cost[np.arange(rows), list(cols_used)].sum()
+                    for cols_used in permutations(range(cols), rows)
+                )
+                assert cost[np.arange(rows), assigned].sum() == best
+
+    @pytest.mark.parametrize("dispatch", ["nearest", "eta"])
+    def test_periodic_reassignment_delivers_everyone(self, dispatch):
+        rng = random.Random(4)
+        building = BuildingController(
+            algorithm_name="sstf", max_floors=20, num_lifts=4, dispatch=dispatch, reassign_every=3
+        )
+        for i in range(300):
+            building.add_request(f"P{i}", rng.randint(0, 20), rng.randint(0, 20))
+            building.step()
+        building.run(500)
+
+        assert building.get_completed() == 300
+        assert building.reassigner.solves == building.global_tick // 3
+        assert building.total_passengers == 300
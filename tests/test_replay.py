@@ -0,0 +1,155 @@
+"""
+Tests for session command logs and offline replay: recorded sessions replay
+exactly, what-if runs report where they diverge.
+"""
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import endpoints
+from app.core.commands import read_log
+from app.core.sessions import SessionManager
+from app.main import app
+from app.replay import first_divergence, main, replay, replay_many
+
+
+def _drive(manager, session_id, rng, ticks):
+    """Mix every kind of command, fetching the controller each tick like the API does."""
+    for i in range(ticks):
+        controller = manager.get_controller(session_id)
+        roll = rng.random()
+        if roll < 0.4:
+            controller.add_request(f"P{i}", rng.randint(0, 12), rng.randint(0, 12))
+        elif roll < 0.5:
+            controller.add_requests(
+                [(f"B{i}-{j}", rng.randint(0, 12), rng.randint(0, 12)) for j in range(3)]
+            )
+        elif roll < 0.6:
+            tick = controller.global_tick + rng.randint(-2, 5)
+            controller.schedule_requests([(tick, f"S{i}", rng.randint(0, 12), 0)])
+        controller.step()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SessionManager(log_dir=str(tmp_path / "logs"), spill_after_s=0)
+    yield manager
+    manager.close()
+
+
+class TestCommandLog:
+    """Logs capture every request path and replay to the same state."""
+
+    def test_replay_reproduces_session(self, manager):
+        session_id = manager.create_session(
+            algorithm_name="sstf", max_floors=12, num_lifts=3, dispatch="eta", reassign_every=4
+        )
+        _drive(manager, session_id, random.Random(1), 150)
+        controller = manager.get_controller(session_id)
+        path = manager.checkpoint_log(session_id)
+
+        header, records = read_log(path)
+        run = replay(header, records)
+        assert run.checkpoints == 1 and run.mismatches == []
+        assert run.controller.get_state() == controller.get_state()
+
+    def test_spilled_session_keeps_logging(self, manager):
+        session_id = manager.create_comparison_session("scan", "sstf", max_floors=12)
+        _drive(manager, session_id, random.Random(2), 60)
+        manager.spill_idle(float("inf"))
+        _drive(manager, session_id, random.Random(3), 60)
+        state = manager.get_controller(session_id).get_state()
+
+        header, records = read_log(manager.checkpoint_log(session_id))
+        run = replay(header, records)
+        assert run.checkpoints == 2 and run.mismatches == []
+        assert run.controller.get_state() == state
+
+    def test_fork_logs_from_its_starting_state(self, manager):
+        parent = manager.create_session(max_floors=12)
+        _drive(manager, parent, random.Random(4), 40)
+        child = manager.fork_session(parent, algorithm="sstf")
+        _drive(manager, child, random.Random(5), 40)
+
+        header, records = read_log(manager.checkpoint_log(child))
+        run = replay(header, records)
+        assert run.start_tick == 40 and run.mismatches == []
+        assert run.controller.get_state() == manager.get_controller(child).get_state()
+
+    def test_league_session_replays(self, manager):
+        session_id = manager.create_league_session(max_floors=12)
+        _drive(manager, session_id, random.Random(8), 60)
+        header, records = read_log(manager.checkpoint_log(session_id))
+
+        run = replay(header, records)
+        assert run.mismatches == []
+        assert run.controller.get_state() == manager.get_controller(session_id).get_state()
+
+    def test_replay_flags_checkpoint_mismatch(self, manager):
+        session_id = manager.create_session()
+        _drive(manager, session_id, random.Random(7), 30)
+        header, records = read_log(manager.checkpoint_log(session_id))
+        records[-1][2] ^= 1
+
+        assert replay(header, records).mismatches == [30]
+
+    def test_no_log_without_directory(self):
+        manager = SessionManager()
+        session_id = manager.create_session()
+        assert manager.get_controller(session_id).command_log is None
+        assert manager.checkpoint_log(session_id) is None
+
+    def test_download_endpoint(self, manager, monkeypatch):
+        monkeypatch.setattr(endpoints, "session_manager", manager)
+        client = TestClient(app)
+        session_id = client.post("/api/create-session").json()["session_id"]
+        client.post(
+            f"/api/{session_id}/add-passenger",
+            json={"passenger_id": "P1", "from_level": 0, "to_level": 3},
+        )
+        client.post(f"/api/{session_id}/move", params={"ticks": 5})
+
+        lines = client.get(f"/api/{session_id}/command-log").text.splitlines()
+        assert json.loads(lines[1]) == [0, "a", "P1", 0, 3]
+        assert json.loads(lines[-1])[:2] == [5, "c"]
+        assert client.get("/api/missing/command-log").status_code == 404
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "other.log"
+        path.write_text('{"format": "something-else"}\n')
+        with pytest.raises(ValueError):
+            read_log(str(path))
+
+
+class TestReplay:
+    """What-if runs are deterministic and report their first divergence."""
+
+    @pytest.fixture
+    def log_path(self, manager):
+        session_id = manager.create_session(max_floors=12, num_lifts=3)
+        _drive(manager, session_id, random.Random(6), 120)
+        return manager.checkpoint_log(session_id)
+
+    def test_identical_inputs_identical_runs(self, log_path):
+        header, records = read_log(log_path)
+        first = replay(header, records, algorithm="sstf", extra_ticks=50)
+        second = replay(header, records, algorithm="sstf", extra_ticks=50)
+        assert first.trace == second.trace
+        assert first_divergence(first.trace, second.trace) is None
+
+    def test_parallel_what_ifs_report_divergence(self, log_path):
+        results = replay_many(log_path, [("sstf", None), ("scan", None)], workers=2)
+        recorded, sstf, scan = (result["rows"][0] for result in results)
+        assert recorded["mismatches"] == 0 and recorded["diverges_at"] is None
+        # The recorded session ran scan, so only the sstf run departs from it
+        assert scan["diverges_at"] is None
+        assert sstf["diverges_at"] is not None and sstf["algorithm"] == "sstf"
+        assert recorded["completed"] == scan["completed"]
+
+    def test_cli_prints_rows_with_detail(self, log_path, capsys):
+        assert main([log_path, "--algorithms", "sstf", "--workers", "1", "--detail"]) == 0
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [row["run"] for row in rows] == ["recorded", "sstf"]
+        assert rows[1]["divergence"]
@@ -0,0 +1,77 @@
+"""
+Tests for the autoplay timing-wheel scheduler.
+"""
+import asyncio
+import time
+
+from app.core.scheduler import TickScheduler
+
+
+def _due_ticks(scheduler, key, slots):
+    return [step for step in range(1, slots + 1) if key in scheduler.advance()]
+
+
+class TestTimingWheel:
+    """Jobs fall due at their interval, including intervals longer than the wheel."""
+
+    def test_short_interval(self):
+        scheduler = TickScheduler(resolution_ms=10, slots=8)
+        assert scheduler.schedule("a", 30) == 30
+        assert _due_ticks(scheduler, "a", 12) == [3, 6, 9, 12]
+
+    def test_interval_longer_than_wheel(self):
+        scheduler = TickScheduler(resolution_ms=10, slots=8)
+        scheduler.schedule("a", 200)
+        assert _due_ticks(scheduler, "a", 60) == [20, 40, 60]
+
+    def test_unschedule_and_reschedule(self):
+        scheduler = TickScheduler(resolution_ms=10, slots=8)
+        scheduler.schedule("a", 20)
+        scheduler.unschedule("a")
+        assert _due_ticks(scheduler, "a", 10) == []
+
+        scheduler.schedule("a", 50)
+        assert scheduler.get_interval_ms("a") == 50
+        assert _due_ticks(scheduler, "a", 10) == [5, 10]
+
+    def test_run_batches_due_jobs_and_drops_expired(self):
+        scheduler = TickScheduler(resolution_ms=5, slots=16)
+        scheduler.schedule("live", 5)
+        scheduler.schedule("gone", 5)
+        calls = []
+
+        async def handler(keys):
+            calls.append(sorted(keys))
+            return ["gone"]
+
+        async def drive():
+            task = asyncio.create_task(scheduler.run(handler))
+            await asyncio.sleep(0.1)
+            task.cancel()
+
+        asyncio.run(drive())
+        assert calls[0] == ["gone", "live"]
+        assert all(call == ["live"] for call in calls[1:])
+        assert scheduler.get_stats()["jobs"] == 1
+
+    def test_overload_reports_lag_and_still_yields(self):
+        scheduler = TickScheduler(resolution_ms=10, slots=16)
+        scheduler.schedule("slow", 10)
+
+        async def handler(keys):
+            # Blocks the loop without awaiting, as a heavy step would
+            time.sleep(0.05)
+            return []
+
+        async def drive():
+            task = asyncio.create_task(scheduler.run(handler))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            return task
+
+        task = asyncio.run(drive())
+        assert task.cancelled()
+        stats = scheduler.get_stats()
+        assert stats["overruns"] > 0 and stats["skipped_ticks"] > 0
+        assert stats["max_lag_ms"] >= 30
+        assert stats["lag_ms"] > scheduler.resolution_ms
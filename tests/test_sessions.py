@@ -0,0 +1,297 @@
+"""
+Tests for the session store: expiry, LRU eviction, memory accounting,
+snapshots, forks and spilling idle sessions to disk.
+"""
+import asyncio
+import os
+import pickle
+import random
+import struct
+import time
+import tracemalloc
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import websocket
+from app.core import snapshot
+from app.core.building import BuildingController
+from app.core.multi_lift import MultiBuildingController
+from app.core.sessions import SessionManager
+from app.core.spill import SpillStore
+from app.main import app
+
+
+class TestSessionManager:
+    """Expiry and eviction only ever touch the least recently used end."""
+
+    def test_evicts_least_recently_used(self):
+        manager = SessionManager(max_sessions=3)
+        first, _, third = (manager.create_session() for _ in range(3))
+        manager.get_controller(first)
+
+        fourth = manager.create_comparison_session()
+        assert list(manager.sessions) == [third, first, fourth]
+        assert manager.get_session_type(fourth) == "comparison"
+        assert manager.evicted == 1
+
+    def test_untouched_reads_do_not_refresh(self):
+        manager = SessionManager(max_sessions=2)
+        first = manager.create_session()
+        second = manager.create_session()
+        manager.get_controller(first, touch=False)
+
+        manager.create_session()
+        assert first not in manager.sessions and second in manager.sessions
+
+    def test_cleanup_stops_at_first_live_session(self):
+        manager = SessionManager(session_timeout_s=60)
+        old = [manager.create_session() for _ in range(3)]
+        now = time.monotonic()
+        for session_id in old:
+            manager.sessions[session_id]["last_activity"] = now - 120
+        live = manager.create_session()
+        manager.get_controller(old[1])
+
+        assert manager.cleanup_sessions(now) == 2
+        assert list(manager.sessions) == [live, old[1]]
+        assert manager.cleanup_sessions(now) == 0
+        assert manager.expired == 2
+
+    def test_autoplay_and_viewers_keep_sessions_alive(self, monkeypatch):
+        manager = SessionManager(session_timeout_s=60)
+        monkeypatch.setattr(websocket, "session_manager", manager)
+        playing, watched, idle = (manager.create_session() for _ in range(3))
+        now = time.monotonic()
+        for session_id in (playing, watched, idle):
+            manager.sessions[session_id]["last_activity"] = now - 120
+
+        assert asyncio.run(websocket.autoplay_tick([playing])) == []
+        manager.touch(watched)
+        manager.touch("missing")
+
+        assert manager.cleanup_sessions(time.monotonic()) == 1
+        assert idle not in manager.sessions
+        assert {playing, watched} <= set(manager.sessions)
+
+    def test_stats_report_largest_sessions(self):
+        manager = SessionManager()
+        small = manager.create_session(max_floors=5)
+        large = manager.create_comparison_session(num_lifts=4)
+
+        stats = manager.get_stats(top=1)
+        assert stats["sessions"] == 2
+        assert stats["largest"][0]["session_id"] == large
+        assert stats["memory_bytes"] == manager.get_memory(small) + manager.get_memory(large)
+        assert manager.get_memory("missing") is None
+
+
+class TestMemoryEstimate:
+    """Estimates should track what the lifts actually allocate."""
+
+    def test_estimate_tracks_allocations(self):
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            building = BuildingController(max_floors=20, num_lifts=4, history_size=1000)
+            for i in range(5000):
+                building.add_request(f"P{i}", i % 21, (i * 7) % 21)
+            for _ in range(30):
+                building.step()
+            allocated = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        assert 0.5 * allocated < building.memory_bytes() < 2 * allocated
+
+
+def _drive(controller, rng, ticks):
+    for i in range(ticks):
+        if rng.random() < 0.7:
+            controller.add_request(f"P{i}", rng.randint(0, 15), rng.randint(0, 15))
+        controller.step()
+
+
+class TestSnapshot:
+    """Restored controllers carry on exactly like the originals."""
+
+    @pytest.mark.parametrize("dispatch", ["nearest", "eta"])
+    def test_restored_building_continues_identically(self, dispatch):
+        original = BuildingController(
+            algorithm_name="sstf", max_floors=15, num_lifts=3, dispatch=dispatch, reassign_every=4
+        )
+        _drive(original, random.Random(1), 60)
+        restored = snapshot.loads(snapshot.dumps(original))
+        assert restored.get_state() == original.get_state()
+
+        for controller in (original, restored):
+            _drive(controller, random.Random(2), 80)
+        assert restored.get_state() == original.get_state()
+        assert restored.get_history() == original.get_history()
+
+    def test_restored_comparison_matches(self):
+        original = MultiBuildingController("scan", "nearest", max_floors=15)
+        _drive(original, random.Random(3), 50)
+        restored = snapshot.loads(snapshot.dumps(original))
+
+        for controller in (original, restored):
+            _drive(controller, random.Random(4), 50)
+        assert restored.get_state() == original.get_state()
+
+    def test_rejects_foreign_data(self):
+        data = snapshot.dumps(BuildingController())
+        with pytest.raises(ValueError):
+            snapshot.loads(b"nope" + data[4:])
+        with pytest.raises(ValueError):
+            snapshot.loads(struct.pack(">4sH", b"LIFT", 99) + data[6:])
+        with pytest.raises(ValueError):
+            snapshot.loads(data[:3])
+
+    def test_signature_round_trip(self):
+        data = snapshot.dumps(BuildingController())
+        signed = snapshot.sign(data, b"key")
+        assert snapshot.verify(signed, b"key") == data
+        for bad in (data, signed[:-1], snapshot.sign(data, b"other"), b""):
+            with pytest.raises(ValueError, match="unsigned"):
+                snapshot.verify(bad, b"key")
+
+    def test_rejects_foreign_globals(self):
+        body = zlib.compress(pickle.dumps(os.system))
+        with pytest.raises(ValueError, match="posix.system|os.system"):
+            snapshot.loads(struct.pack(">4sH", b"LIFT", snapshot.SNAPSHOT_VERSION) + body)
+
+
+class TestFork:
+    """Forks continue like restored snapshots and never touch their parent."""
+
+    def test_fork_continues_like_restored_snapshot(self):
+        original = BuildingController(
+            algorithm_name="sstf", max_floors=15, num_lifts=3, dispatch="eta", reassign_every=3
+        )
+        _drive(original, random.Random(6), 60)
+        restored = snapshot.loads(snapshot.dumps(original))
+        fork = original.fork()
+        assert fork.get_state() == original.get_state()
+
+        for controller in (fork, restored):
+            _drive(controller, random.Random(7), 80)
+        assert fork.get_state() == restored.get_state()
+        assert fork.get_history() == restored.get_history()
+
+    def test_parent_is_unaffected_by_fork(self):
+        parent = MultiBuildingController("scan", "sstf", max_floors=15, num_lifts=3)
+        _drive(parent, random.Random(8), 40)
+        state = parent.get_state()
+        history = parent.get_history()
+
+        fork = parent.fork(algorithm1="nearest", dispatch2="eta")
+        _drive(fork, random.Random(9), 60)
+        assert parent.get_state() == state
+        assert parent.get_history() == history
+        assert fork.building1.algorithm_name == "nearest"
+        assert fork.building2.dispatch_name == "eta"
+        assert parent.building1.algorithm_name == "scan"
+
+    def test_history_shared_until_written(self):
+        parent = BuildingController(num_lifts=2)
+        _drive(parent, random.Random(10), 20)
+        fork = parent.fork()
+        parent_history, fork_history = parent.lifts[0].history, fork.lifts[0].history
+        assert fork_history.ticks is parent_history.ticks
+
+        fork.step()
+        assert fork_history.ticks is not parent_history.ticks
+        assert len(parent_history) == 20 and len(fork_history) == 21
+
+
+class TestSnapshotEndpoints:
+    """Sessions round-trip through the snapshot, restore and fork routes."""
+
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_snapshot_restore_and_fork(self, client):
+        session_id = client.post("/api/create-session", json={"num_lifts": 3}).json()["session_id"]
+        client.post(
+            f"/api/{session_id}/add-passenger",
+            json={"passenger_id": "P1", "from_level": 0, "to_level": 6},
+        )
+        client.post(f"/api/{session_id}/move", params={"ticks": 3})
+
+        data = client.get(f"/api/{session_id}/snapshot").content
+        restored = client.post("/api/restore", content=data).json()
+        assert restored["type"] == "single" and restored["global_tick"] == 3
+
+        fork = client.post(f"/api/{session_id}/fork", json={"algorithm": "sstf"}).json()
+        assert fork["parent_id"] == session_id and fork["algorithm"] == "sstf"
+        client.post(f"/api/{fork['session_id']}/move", params={"ticks": 10})
+
+        parent_state = client.get(f"/api/{session_id}/state").json()
+        restored_state = client.get(f"/api/{restored['session_id']}/state").json()
+        assert parent_state == restored_state
+        assert client.get(f"/api/{fork['session_id']}/state").json()["global_tick"] == 13
+
+    def test_bad_snapshot_and_missing_session(self, client):
+        assert client.post("/api/restore", content=b"garbage").status_code == 422
+        assert client.get("/api/missing/snapshot").status_code == 404
+        assert client.post("/api/missing/fork").status_code == 404
+
+    def test_restore_requires_server_signature(self, client):
+        session_id = client.post("/api/create-session").json()["session_id"]
+        data = client.get(f"/api/{session_id}/snapshot").content
+        unsigned = snapshot.dumps(BuildingController())
+        tampered = data[:-40] + bytes([data[-40] ^ 1]) + data[-39:]
+        foreign = snapshot.sign(unsigned, b"another server")
+
+        for body in (unsigned, tampered, foreign):
+            response = client.post("/api/restore", content=body)
+            assert response.status_code == 422
+            assert "not issued by this server" in response.json()["detail"]
+        assert client.post("/api/restore", content=data).status_code == 200
+
+
+class TestSpill:
+    """Idle sessions move to disk and come back on access."""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        store = SpillStore(str(tmp_path / "spill.sqlite3"))
+        yield SessionManager(spill_after_s=60, spill_store=store)
+        store.close()
+
+    def test_idle_session_spills_and_rehydrates(self, manager):
+        session_id = manager.create_comparison_session(num_lifts=3)
+        _drive(manager.get_controller(session_id), random.Random(5), 40)
+        state = manager.get_controller(session_id).get_state()
+
+        manager.cleanup_sessions(time.monotonic() + 120)
+        assert manager.is_spilled(session_id)
+        assert manager.get_memory(session_id) == 0
+        assert manager.get_stats()["spilled_bytes"] > 0
+
+        assert manager.get_controller(session_id).get_state() == state
+        stats = manager.get_stats()
+        assert (stats["resident"], stats["spills"], stats["rehydrations"]) == (1, 1, 1)
+        assert stats["spilled_bytes"] == 0
+
+    def test_background_access_keeps_session_resident(self, manager):
+        watched = manager.create_session()
+        idle = manager.create_session()
+        now = time.monotonic()
+        manager._resident[watched] = manager._resident[idle] = now - 120
+        manager.get_controller(watched, touch=False)
+
+        manager.spill_idle(now - 60)
+        assert not manager.is_spilled(watched)
+        assert manager.is_spilled(idle)
+
+    def test_expired_spilled_session_leaves_store(self, manager):
+        session_id = manager.create_session()
+        manager.cleanup_sessions(time.monotonic() + 120)
+        assert session_id in manager.spill_store
+
+        manager.cleanup_sessions(time.monotonic() + 3600)
+        assert session_id not in manager.sessions
+        assert len(manager.spill_store) == 0
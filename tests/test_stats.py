@@ -0,0 +1,128 @@
+"""
+Tests for passenger time statistics: quantile sketches, their merging
+across lifts, and the percentiles reported in states and sweep rows.
+"""
+import math
+import random
+
+from app.core import snapshot
+from app.core.building import BuildingController
+from app.core.config import SKETCH_RELATIVE_ACCURACY
+from app.core.lift import PERCENTILE_KEYS
+from app.core.sketch import QuantileSketch
+from app.sweep import build_grid, run_one
+
+
+def _nearest_rank(values: list[int], q: float) -> int:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)), 1) - 1]
+
+
+class TestQuantileSketch:
+    """Exact for short times, within the relative accuracy for long ones."""
+
+    def test_short_times_are_exact(self):
+        rng = random.Random(0)
+        values = [rng.randint(0, 100) for _ in range(5000)]
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        qs = [0.01, 0.5, 0.95, 0.99, 1.0]
+        assert sketch.quantiles(qs) == [_nearest_rank(values, q) for q in qs]
+
+    def test_long_times_within_accuracy(self):
+        rng = random.Random(1)
+        values = [int(rng.lognormvariate(7, 1.5)) for _ in range(20000)]
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        for q, estimate in zip([0.5, 0.9, 0.99], sketch.quantiles([0.5, 0.9, 0.99]), strict=True):
+            exact = _nearest_rank(values, q)
+            assert abs(estimate - exact) <= SKETCH_RELATIVE_ACCURACY * exact + 1
+
+    def test_memory_depends_on_range_not_count(self):
+        sketch = QuantileSketch()
+        for i in range(200_000):
+            sketch.add(i % 5000)
+        size = len(sketch.buckets)
+        for i in range(200_000):
+            sketch.add(i % 5000)
+        assert len(sketch.buckets) == size < 500
+
+    def test_merge_matches_one_sketch_of_everything(self):
+        rng = random.Random(2)
+        parts = [[rng.randint(0, 3000) for _ in range(n)] for n in (10, 500, 2000)]
+        sketches, combined = [], QuantileSketch()
+        for part in parts:
+            sketch = QuantileSketch()
+            for value in part:
+                sketch.add(value)
+                combined.add(value)
+            sketches.append(sketch)
+
+        merged = QuantileSketch.merged(sketches)
+        assert merged.count == combined.count
+        assert merged.quantiles([0.5, 0.95, 0.99]) == combined.quantiles([0.5, 0.95, 0.99])
+        assert QuantileSketch().quantiles([0.5]) == [0]
+
+
+def _busy_building(**kwargs) -> BuildingController:
+    building = BuildingController(max_floors=20, num_lifts=3, **kwargs)
+    rng = random.Random(3)
+    building.schedule_requests(
+        [(rng.randint(0, 300), f"P{i}", rng.randint(0, 20), rng.randint(0, 20)) for i in range(600)]
+    )
+    building.run(250)
+    return building
+
+
+class TestBuildingStats:
+    """Pooled stats come from every lift's requests."""
+
+    def test_percentiles_match_completed_journeys(self):
+        building = BuildingController(max_floors=15, num_lifts=3, history_size=0)
+        rng = random.Random(4)
+        totals: dict[str, int] = {}
+        for tick in range(400):
+            if tick < 300 and rng.random() < 0.5:
+                building.add_request(f"P{tick}", rng.randint(0, 15), rng.randint(0, 15))
+            building.step()
+            for lift in building.lifts:
+                for request in lift.recent_completed:
+                    totals[request["passenger_id"]] = (
+                        request["completed_at"] - request["created_at"]
+                    )
+        journeys = list(totals.values())
+
+        stats = building.get_state()["stats"]
+        assert stats["completed"] == len(journeys)
+        assert stats["p50_total"] == _nearest_rank(journeys, 0.5)
+        assert stats["p99_total"] == _nearest_rank(journeys, 0.99)
+        assert set(PERCENTILE_KEYS) <= set(stats)
+        assert set(PERCENTILE_KEYS) <= set(building.get_state()["lifts"][0]["stats"])
+
+    def test_average_wait_is_per_pickup(self):
+        building = _busy_building()
+        picked_up = sum(lift.stats_counts["picked_up"] for lift in building.lifts)
+        completed = building.get_completed()
+        assert picked_up > completed
+        wait_sum = sum(lift.stats_sums["wait_time"] for lift in building.lifts)
+        assert building.get_stats()["avg_wait"] == wait_sum / picked_up
+
+    def test_fork_and_snapshot_keep_distributions(self):
+        building = _busy_building(dispatch="eta")
+        fork = building.fork()
+        restored = snapshot.loads(snapshot.dumps(building))
+        assert fork.get_stats() == restored.get_stats() == building.get_stats()
+
+        fork.run(200)
+        restored.run(200)
+        assert fork.get_stats() == restored.get_stats() != building.get_stats()
+        assert building.lifts[0].sketches["total_time"] is not fork.lifts[0].sketches["total_time"]
+
+
+def test_sweep_rows_carry_percentiles():
+    spec = build_grid(["scan"], [10], [0], [2], ticks=200, arrival_rate=0.3, drain_ticks=300)[0]
+    row = run_one(spec)
+    assert all(key in row for key in PERCENTILE_KEYS)
+    assert row["p50_total"] <= row["p95_total"] <= row["p99_total"]
@@ -0,0 +1,78 @@
+"""
+Tests for the parameter sweep runner.
+"""
+import csv
+import json
+import subprocess
+import sys
+
+import pytest
+
+from app.sweep import build_grid, main, run_sweep
+
+
+def _grid():
+    return build_grid(
+        ["scan", "sstf"], [8], [0, 1], [2], ticks=50, arrival_rate=0.3, drain_ticks=200
+    )
+
+
+def _without_timing(rows):
+    rows = sorted(rows, key=lambda row: (row["algorithm"], row["seed"]))
+    return [{k: v for k, v in row.items() if k != "elapsed_s"} for row in rows]
+
+
+class TestSweep:
+    """Sweep output, resume and isolation from the API layer."""
+
+    def test_writes_one_row_per_run(self, tmp_path):
+        output = str(tmp_path / "sweep.csv")
+        rows = list(run_sweep(_grid(), output))
+
+        with open(output, newline="") as f:
+            written = list(csv.DictReader(f))
+        assert len(rows) == len(written) == 4
+        assert {row["algorithm"] for row in written} == {"scan", "sstf"}
+        assert all(int(row["completed"]) == int(row["passengers"]) for row in written)
+
+    def test_resume_skips_finished_runs(self, tmp_path):
+        output = str(tmp_path / "sweep.jsonl")
+        list(run_sweep(_grid()[:1], output))
+
+        resumed = list(run_sweep(_grid(), output, resume=True))
+        assert len(resumed) == 3
+        with open(output) as f:
+            assert len([json.loads(line) for line in f]) == 4
+
+    def test_resume_reruns_changed_settings(self, tmp_path):
+        output = str(tmp_path / "sweep.csv")
+        list(run_sweep(_grid(), output))
+
+        changed = build_grid(
+            ["scan"], [8], [0], [2], ticks=50, arrival_rate=0.5, drain_ticks=200,
+            profile="up_peak",
+        )
+        assert len(list(run_sweep(changed, output, resume=True))) == 1
+        assert list(run_sweep(changed + _grid(), output, resume=True)) == []
+
+        longer = build_grid(["scan"], [8], [0], [2], ticks=60, arrival_rate=0.3, drain_ticks=200)
+        assert len(list(run_sweep(longer, output, resume=True))) == 1
+
+    def test_resume_rejects_files_without_key_columns(self, tmp_path):
+        output = tmp_path / "old.csv"
+        output.write_text("algorithm,max_floors,seed,lifts\nscan,8,0,2\n")
+        with pytest.raises(ValueError, match="drain_ticks"):
+            list(run_sweep(_grid(), str(output), resume=True))
+
+    def test_runs_are_deterministic(self, tmp_path):
+        first = list(run_sweep(_grid(), str(tmp_path / "a.csv")))
+        second = list(run_sweep(_grid(), str(tmp_path / "b.csv"), workers=2))
+        assert _without_timing(first) == _without_timing(second)
+
+    def test_cli_runs(self, tmp_path):
+        output = str(tmp_path / "cli.csv")
+        assert main(["--seeds", "0-1", "--ticks", "20", "--workers", "1", "-o", output]) == 0
+
+    def test_does_not_import_fastapi(self):
+        code = "import sys, app.sweep; sys.exit('fastapi' in sys.modules)"
+        assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,72 @@
+"""
+Tests for the seeded streaming traffic generator.
+"""
+from itertools import islice
+
+import pytest
+
+from app.core.building import BuildingController
+from app.core.traffic import TrafficFeed, TrafficGenerator
+
+
+class TestTrafficGenerator:
+    """Reproducibility, ordering and profile shape."""
+
+    def test_same_seed_same_arrivals(self):
+        first = list(islice(TrafficGenerator(10, seed=1), 200))
+        second = list(islice(TrafficGenerator(10, seed=1), 200))
+        other = list(islice(TrafficGenerator(10, seed=2), 200))
+        assert first == second
+        assert first != other
+
+    def test_arrivals_are_ordered_and_valid(self):
+        arrivals = list(TrafficGenerator(12, rate=2.0, seed=3).until(500))
+        ticks = [tick for tick, _, _ in arrivals]
+        assert ticks == sorted(ticks)
+        assert all(0 <= tick < 500 for tick in ticks)
+        assert all(0 <= a <= 12 and 0 <= b <= 12 and a != b for _, a, b in arrivals)
+        # Poisson mean of 2 per tick over 500 ticks
+        assert 900 < len(arrivals) < 1100
+
+    def test_up_peak_starts_from_lobby(self):
+        arrivals = list(TrafficGenerator(10, rate=1.0, profile="up_peak", seed=4).until(2000))
+        from_lobby = sum(1 for _, from_level, _ in arrivals if from_level == 0)
+        assert from_lobby / len(arrivals) > 0.8
+
+    def test_floor_weights_exclude_floors(self):
+        weights = [1.0] * 6 + [0.0] * 5
+        arrivals = TrafficGenerator(10, rate=1.0, floor_weights=weights, seed=5).until(1000)
+        assert all(a <= 5 and b <= 5 for _, a, b in arrivals)
+
+    def test_rejects_single_weighted_floor(self):
+        one_hot = [0.0, 1.0] + [0.0] * 9
+        with pytest.raises(ValueError, match="two floors"):
+            TrafficGenerator(10, floor_weights=one_hot)
+        # The lobby plus one upper floor is enough for every kind of trip
+        arrivals = TrafficGenerator(10, rate=1.0, floor_weights=[1.0] + one_hot[1:], seed=7)
+        assert {(a, b) for _, a, b in arrivals.until(200)} == {(0, 1), (1, 0)}
+
+    def test_rejects_unknown_profile(self):
+        with pytest.raises(ValueError):
+            TrafficGenerator(10, profile="rush_hour")
+
+
+class TestTrafficFeed:
+    """Feeding arrivals into a controller during headless runs."""
+
+    def test_feed_matches_manual_requests(self):
+        arrivals = list(TrafficGenerator(10, rate=0.5, seed=6).until(200))
+
+        fed = BuildingController(algorithm_name="scan")
+        added = TrafficFeed(arrivals).run(fed, 250)
+
+        manual = BuildingController(algorithm_name="scan")
+        for i, (tick, from_level, to_level) in enumerate(arrivals):
+            while manual.global_tick < tick:
+                manual.step()
+            manual.add_request(f"P{i}", from_level, to_level)
+        while manual.global_tick < 250:
+            manual.step()
+
+        assert added == len(arrivals)
+        assert fed.get_state() == manual.get_state()
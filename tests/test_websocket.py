@@ -0,0 +1,133 @@
+"""
+Tests for per-connection WebSocket send queues.
+"""
+import asyncio
+import json
+
+from app.api.protocol import Payload
+from app.api.websocket import ConnectionManager, StateStream, Subscriber
+
+
+class FakeSocket:
+    """Records frames; `gate` blocks sends until set, `fail` makes them raise."""
+
+    def __init__(self, fail=False):
+        self.frames = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail = fail
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.frames.append(json.loads(text))
+
+
+def _delta(stream, tick):
+    stream.seq += 1
+    stream.state = Payload({"global_tick": tick})
+    return Payload({"type": "delta", "seq": stream.seq, "base_seq": stream.seq - 1,
+                    "tick": tick, "changes": {"global_tick": tick}})
+
+
+def _subscribe(manager, session_id, socket, stream, max_queue=4):
+    manager.streams[session_id] = stream
+    subscriber = Subscriber(socket, stream, lambda sub: manager._reap(session_id, sub), max_queue)
+    manager.active_connections.setdefault(session_id, {})[socket] = subscriber
+    return subscriber
+
+
+class TestSendQueues:
+    """Publishing never waits on a socket; slow viewers get the latest state."""
+
+    def test_stalled_viewer_does_not_block_others(self):
+        async def scenario():
+            manager = ConnectionManager()
+            stream = StateStream(Payload({"global_tick": 0}))
+            stalled, healthy = FakeSocket(), FakeSocket()
+            stalled.gate.clear()
+            _subscribe(manager, "s", stalled, stream)
+            _subscribe(manager, "s", healthy, stream)
+
+            for tick in range(1, 21):
+                await manager.broadcast("s", _delta(stream, tick))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+            first = healthy.frames[0]
+            assert first["type"] == "snapshot"
+            assert [f["seq"] for f in healthy.frames] == list(range(first["seq"], 21))
+            assert stalled.frames == []
+
+            stalled.gate.set()
+            await asyncio.sleep(0.01)
+            # The stalled viewer resumes from one snapshot of the latest state
+            assert stalled.frames[-1] == {"type": "snapshot", "seq": 20,
+                                          "data": {"global_tick": 20}}
+            assert len(stalled.frames) < 20
+            assert manager.get_stats()["frames_coalesced"] > 0
+
+        asyncio.run(scenario())
+
+    def test_frames_arrive_in_sequence_after_coalescing(self):
+        async def scenario():
+            manager = ConnectionManager()
+            stream = StateStream(Payload({"global_tick": 0}))
+            socket = FakeSocket()
+            socket.gate.clear()
+            _subscribe(manager, "s", socket, stream, max_queue=3)
+
+            for tick in range(1, 11):
+                await manager.broadcast("s", _delta(stream, tick))
+            socket.gate.set()
+            await asyncio.sleep(0)
+            for tick in range(11, 16):
+                await manager.broadcast("s", _delta(stream, tick))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+
+            seqs = [f["seq"] for f in socket.frames]
+            assert seqs == sorted(set(seqs))
+            assert seqs[-1] == 15
+            for previous, frame in zip(socket.frames, socket.frames[1:], strict=False):
+                if frame["type"] == "delta":
+                    assert frame["base_seq"] == previous["seq"]
+
+        asyncio.run(scenario())
+
+    def test_failed_socket_is_reaped(self):
+        async def scenario():
+            manager = ConnectionManager()
+            stream = StateStream(Payload({"global_tick": 0}))
+            dead, alive = FakeSocket(fail=True), FakeSocket()
+            _subscribe(manager, "s", dead, stream)
+            _subscribe(manager, "s", alive, stream)
+            await asyncio.sleep(0.01)
+
+            assert dead not in manager.active_connections["s"]
+            await manager.broadcast("s", _delta(stream, 1))
+            await asyncio.sleep(0.01)
+            assert [f["seq"] for f in alive.frames] == [0, 1]
+
+            stats = manager.get_stats()
+            assert stats["reaped_connections"] == 1
+            assert stats["connections"] == 1
+
+        asyncio.run(scenario())
+
+    def test_viewers_share_encoded_frames(self):
+        async def scenario():
+            manager = ConnectionManager()
+            stream = StateStream(Payload({"global_tick": 0}))
+            first, second = FakeSocket(), FakeSocket()
+            _subscribe(manager, "s", first, stream)
+            _subscribe(manager, "s", second, stream)
+            delta = _delta(stream, 1)
+            await manager.broadcast("s", delta)
+            await asyncio.sleep(0.01)
+
+            assert first.frames == second.frames
+            assert delta.frame() is delta.frame()
+
+        asyncio.run(scenario())